@@ -0,0 +1,199 @@
+import math
+import re
+from datetime import date
+
+# Automatic matching of parsed assignment PDFs to syllabus assignments.
+# Pairs are scored by TF-IDF cosine similarity of their titles (plus the PDF
+# file name) and by how close their due dates are, then matched one-to-one by
+# maximizing the total score (Hungarian algorithm). Only candidate pairs with
+# some title overlap are linked, and each connected group of candidates is
+# solved on its own, so courses with hundreds of assignments stay fast.
+
+MATCH_THRESHOLD = 0.5  # matches scoring below this are left for the interactive prompt
+MIN_SCORE = 0.05  # pairs below this are never matched
+TITLE_WEIGHT = 0.75  # share of the score from titles when both due dates are known
+DATE_SCALE_DAYS = 7  # due dates this many days apart score 1/e
+
+STOPWORDS = {
+    "a", "an", "and", "the", "of", "on", "in", "for", "to", "with", "by", "at",
+    "copy", "parsed", "pdf", "final", "draft",
+}
+
+
+def tokenize(text):
+    tokens = []
+    for token in re.findall(r"[a-z0-9]+", str(text).lower()):
+        if token in STOPWORDS:
+            continue
+        # Light stemming so "studies" meets "study" and "reflections" meets "reflection"
+        if len(token) > 4 and token.endswith("ies"):
+            token = token[:-3] + "y"
+        elif len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+            token = token[:-1]
+        tokens.append(token)
+    return tokens
+
+
+def tfidf_vectors(documents):
+    """L2-normalized TF-IDF vectors ({token: weight}) for a list of token lists."""
+    doc_freq = {}
+    for tokens in documents:
+        for token in set(tokens):
+            doc_freq[token] = doc_freq.get(token, 0) + 1
+
+    total = len(documents)
+    vectors = []
+    for tokens in documents:
+        counts = {}
+        for token in tokens:
+            counts[token] = counts.get(token, 0) + 1
+        vector = {token: count * (math.log((1 + total) / (1 + doc_freq[token])) + 1)
+                  for token, count in counts.items()}
+        norm = math.sqrt(sum(weight * weight for weight in vector.values())) or 1.0
+        vectors.append({token: weight / norm for token, weight in vector.items()})
+    return vectors
+
+
+def _parse_date(value):
+    try:
+        return date.fromisoformat(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def pair_score(title_similarity, due_a, due_b):
+    """Combine title similarity with due date proximity, ignoring dates that are unknown."""
+    if due_a is None or due_b is None:
+        return title_similarity
+    closeness = math.exp(-abs((due_a - due_b).days) / DATE_SCALE_DAYS)
+    return TITLE_WEIGHT * title_similarity + (1 - TITLE_WEIGHT) * closeness
+
+
+def hungarian(cost):
+    """Minimum-cost assignment for an n x m cost matrix with n <= m.
+
+    Returns a list giving the column assigned to each row.
+    """
+    n, m = len(cost), len(cost[0])
+    u = [0.0] * (n + 1)
+    v = [0.0] * (m + 1)
+    p = [0] * (m + 1)  # p[j] = row matched to column j, 1-based, 0 = free
+    way = [0] * (m + 1)
+    for i in range(1, n + 1):
+        p[0] = i
+        j0 = 0
+        minv = [math.inf] * (m + 1)
+        used = [False] * (m + 1)
+        while True:
+            used[j0] = True
+            i0 = p[j0]
+            row = cost[i0 - 1]
+            delta = math.inf
+            j1 = 0
+            for j in range(1, m + 1):
+                if used[j]:
+                    continue
+                current = row[j - 1] - u[i0] - v[j]
+                if current < minv[j]:
+                    minv[j] = current
+                    way[j] = j0
+                if minv[j] < delta:
+                    delta = minv[j]
+                    j1 = j
+            for j in range(m + 1):
+                if used[j]:
+                    u[p[j]] += delta
+                    v[j] -= delta
+                else:
+                    minv[j] -= delta
+            j0 = j1
+            if p[j0] == 0:
+                break
+        while j0:
+            j1 = way[j0]
+            p[j0] = p[j1]
+            j0 = j1
+
+    assignment = [0] * n
+    for j in range(1, m + 1):
+        if p[j]:
+            assignment[p[j] - 1] = j - 1
+    return assignment
+
+
+def _components(edges, n_left):
+    # Union-find over left nodes 0..n_left-1 and right nodes n_left..
+    parent = {}
+
+    def find(node):
+        while parent.setdefault(node, node) != node:
+            parent[node] = parent[parent[node]]
+            node = parent[node]
+        return node
+
+    for left, right in edges:
+        parent[find(left)] = find(n_left + right)
+
+    groups = {}
+    for left, right in edges:
+        group = groups.setdefault(find(left), (set(), set()))
+        group[0].add(left)
+        group[1].add(right)
+    return [(sorted(lefts), sorted(rights)) for lefts, rights in groups.values()]
+
+
+def score_pairs(syllabus_items, parsed_items, labels=None):
+    """Scores {(syllabus index, parsed index): score} for pairs with any title overlap."""
+    labels = labels or [""] * len(parsed_items)
+    documents = [tokenize(item.get("title", "")) for item in syllabus_items]
+    documents += [tokenize(f"{item.get('title', '')} {label}") for item, label in zip(parsed_items, labels)]
+    vectors = tfidf_vectors(documents)
+    syllabus_vectors = vectors[:len(syllabus_items)]
+    parsed_vectors = vectors[len(syllabus_items):]
+
+    # Only pairs sharing a token can score, look them up through an inverted index
+    index = {}
+    for i, vector in enumerate(syllabus_vectors):
+        for token in vector:
+            index.setdefault(token, []).append(i)
+
+    syllabus_dates = [_parse_date(item.get("due_date")) for item in syllabus_items]
+    scores = {}
+    for j, (item, vector) in enumerate(zip(parsed_items, parsed_vectors)):
+        due = _parse_date(item.get("due_date"))
+        similarities = {}
+        for token, weight in vector.items():
+            for i in index.get(token, []):
+                similarities[i] = similarities.get(i, 0.0) + weight * syllabus_vectors[i][token]
+        for i, similarity in similarities.items():
+            score = pair_score(similarity, syllabus_dates[i], due)
+            if score >= MIN_SCORE:
+                scores[(i, j)] = score
+    return scores
+
+
+def match_assignments(syllabus_items, parsed_items, labels=None, threshold=MATCH_THRESHOLD):
+    """Match parsed assignments to syllabus assignments one-to-one.
+
+    `labels` are extra text per parsed item, e.g. its file name. Returns
+    (matches, unsure): lists of (syllabus index, parsed index, score) at or
+    above `threshold` and below it. Parsed items without any candidate are
+    in neither list.
+    """
+    scores = score_pairs(syllabus_items, parsed_items, labels)
+    pairs = []
+    for lefts, rights in _components(list(scores), len(syllabus_items)):
+        transpose = len(lefts) > len(rights)
+        rows, cols = (rights, lefts) if transpose else (lefts, rights)
+        cost = []
+        for row in rows:
+            cost.append([1.0 - scores.get((col, row) if transpose else (row, col), 0.0) for col in cols])
+        for row_index, col_index in enumerate(hungarian(cost)):
+            pair = (cols[col_index], rows[row_index]) if transpose else (rows[row_index], cols[col_index])
+            if pair in scores:
+                pairs.append((pair[0], pair[1], scores[pair]))
+
+    pairs.sort(key=lambda pair: pair[1])
+    matches = [pair for pair in pairs if pair[2] >= threshold]
+    unsure = [pair for pair in pairs if pair[2] < threshold]
+    return matches, unsure
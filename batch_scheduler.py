@@ -0,0 +1,160 @@
+import numpy as np
+
+from block_generator import (
+    MAX_BLOCKS_PER_DAY_PER_ITEM,
+    SCHEDULING_ORDERS,
+    STUDY_HOURS_START,
+    STUDY_WINDOWS,
+    format_blocks,
+    get_due_date,
+    get_hours_needed,
+    get_item_key,
+    list_unscheduled,
+)
+from models import as_course_data
+from occurrence_index import LEAD_DAYS, OccurrenceIndex, infer_term, split_days, weekly_hours
+
+# Vectorized version of generate_time_blocks for scheduling a whole cohort.
+# All students share one (students, days, 24) boolean array of free hour slots
+# and one of slots already handed out. Items are scheduled rank by rank: the
+# k-th item of every student that has one is placed in a single pass of array
+# operations over their (students, 15, 24) windows, so the Python loop runs
+# once per rank instead of once per item and day. Class time is laid out from
+# each student's weekly class pattern and term, not day by day.
+WINDOW_DAYS = LEAD_DAYS + 1  # lead time plus the due date itself
+
+# Hours an item may use inside its window: from the study start on the first
+# day up to midnight of the due date
+WINDOW_MASK = np.ones((WINDOW_DAYS, 24), dtype=bool)
+WINDOW_MASK[0, :STUDY_HOURS_START] = False
+WINDOW_MASK[-1, 1:] = False
+
+# Slots after midnight two days before the due date ignore the daily cap
+URGENT_MASK = ((np.arange(WINDOW_DAYS)[:, None] - (WINDOW_DAYS - 3)) * 24 + np.arange(24)) > 0
+
+# Hours of a day inside the study window
+STUDY_MASK = np.zeros(24, dtype=bool)
+STUDY_MASK[[hour for start, end in STUDY_WINDOWS for hour in range(start, end)]] = True
+HOUR_BITS = 1 << np.arange(24, dtype=np.int64)
+
+
+def bitmap_hours(masks):
+    """Integer hour bitmaps as a (..., 24) boolean array."""
+    return (np.asarray(masks, dtype=np.int64)[..., None] & HOUR_BITS) != 0
+
+
+# Free hours of every student as a (students, n_days, 24) boolean mask, day 0
+# being first_days[i] (date ordinals) for student i
+def build_free_masks(students, first_days, n_days, term, busy):
+    n = len(students)
+    weekly = np.zeros((n, 7, 24), dtype=bool)
+    in_term = np.zeros((n, n_days), dtype=bool)
+    ordinals = first_days[:, None] + np.arange(n_days)
+    for i, (data, _) in enumerate(students):
+        student_term = term or infer_term(data)
+        if student_term is None:
+            continue
+        weekly[i] = bitmap_hours(weekly_hours(data.schedule))
+        lo = student_term.start.toordinal() - first_days[i]
+        hi = student_term.end.toordinal() - first_days[i] + 1
+        in_term[i, max(lo, 0):max(hi, 0)] = True
+        for first, last, _ in student_term.exclusions:
+            in_term[i, max(first.toordinal() - first_days[i], 0):max(last.toordinal() - first_days[i] + 1, 0)] = False
+
+    # date.fromordinal(1) is a Monday
+    weekdays = (ordinals - 1) % 7
+    taken = weekly[np.arange(n)[:, None], weekdays] & in_term[:, :, None]
+
+    # Busy time from other calendars is rare and irregular, so it goes day by day
+    for i, intervals in enumerate(busy or ()):
+        if not intervals:
+            continue
+        index = OccurrenceIndex([], busy=intervals)
+        days = {piece_start.date() for start, end in intervals for piece_start, _ in split_days(start, end)}
+        for day in days:
+            row = day.toordinal() - first_days[i]
+            if 0 <= row < n_days:
+                taken[i, row] |= bitmap_hours(index.busy_hours(day))
+    return STUDY_MASK & ~taken
+
+
+def generate_time_blocks_batch(payloads, strategy="edf", per_hour=False, term=None, busy=None):
+    """Schedule many students' merged course data (dicts or CourseData) at once.
+
+    Gives one generate_time_blocks result per payload, in order; `busy` is an
+    optional list with each student's other busy (start, end) datetimes.
+    """
+    order = SCHEDULING_ORDERS["edf" if strategy == "independent" else strategy]
+    students = []
+    for json_data in payloads:
+        data = as_course_data(json_data)
+        items = [item for item in sorted(data.assignments + data.tests, key=order) if get_due_date(item)]
+        students.append((data, items))
+    results = [{"blocks": [], "unscheduled": []} for _ in students]
+    active = [i for i, (_, items) in enumerate(students) if items]
+    if not active:
+        return results
+
+    # Per student day 0 is the first day any item can start work on; per item
+    # the window start and hours needed, by rank in scheduling order
+    n_ranks = max(len(students[i][1]) for i in active)
+    due_days = np.full((len(active), n_ranks), -1, dtype=np.int64)
+    needed = np.zeros((len(active), n_ranks), dtype=np.int64)
+    for row, i in enumerate(active):
+        items = students[i][1]
+        due_days[row, :len(items)] = [get_due_date(item).toordinal() for item in items]
+        needed[row, :len(items)] = [get_hours_needed(item) for item in items]
+    counts = (due_days >= 0).sum(axis=1)
+    first_days = np.where(due_days >= 0, due_days, np.iinfo(np.int64).max).min(axis=1) - LEAD_DAYS
+    starts = due_days - LEAD_DAYS - first_days[:, None]
+    n_days = int((due_days.max(axis=1) - first_days).max()) + 1
+
+    busy_rows = [busy[i] for i in active] if busy is not None else None
+    free = build_free_masks([students[i] for i in active], first_days, n_days, term, busy_rows)
+    occupied = np.zeros_like(free) if strategy != "independent" else None
+
+    offsets = np.arange(WINDOW_DAYS)
+    picked = []
+    for rank in range(n_ranks):
+        rows = np.nonzero(counts > rank)[0]
+        days = starts[rows, rank][:, None] + offsets
+        window = free[rows[:, None], days] & WINDOW_MASK
+        if occupied is not None:
+            window &= ~occupied[rows[:, None], days]
+
+        regular = window & ~URGENT_MASK
+        capped = regular & (np.cumsum(regular, axis=2) <= MAX_BLOCKS_PER_DAY_PER_ITEM)
+        chosen = capped | (window & URGENT_MASK)
+        flat = chosen.reshape(len(rows), -1)
+        chosen = (flat & (np.cumsum(flat, axis=1) <= needed[rows, rank][:, None])).reshape(chosen.shape)
+
+        if occupied is not None:
+            occupied[rows[:, None], days] |= chosen
+        k, day, hour = np.nonzero(chosen)
+        picked.append((rows[k], np.full(len(k), rank), (first_days[rows[k]] + days[k, day]) * 24 + hour))
+
+    # Chosen hours grouped by student and item, each item's in time order
+    student_rows = np.concatenate([rows for rows, _, _ in picked])
+    ranks = np.concatenate([ranks for _, ranks, _ in picked])
+    hours = np.concatenate([hours for _, _, hours in picked])
+    by_item = np.lexsort((ranks, student_rows))
+    hours = hours[by_item].tolist()
+    per_item = np.bincount(student_rows * n_ranks + ranks, minlength=len(active) * n_ranks).tolist()
+
+    position = 0
+    for row, i in enumerate(active):
+        items = students[i][1]
+        blocks_by_key = {}
+        for rank, item in enumerate(items):
+            taken = per_item[row * n_ranks + rank]
+            blocks_by_key.setdefault(get_item_key(item), []).extend(hours[position:position + taken])
+            position += taken
+
+        results[i] = {"blocks": format_blocks(blocks_by_key, per_hour),
+                      "unscheduled": list_unscheduled(items, blocks_by_key)}
+    return results
+
+
+def schedule_student(json_data, strategy="edf", per_hour=False, term=None, busy=()):
+    """Schedule one student's merged course data (dict or CourseData), same output as generate_time_blocks."""
+    return generate_time_blocks_batch([json_data], strategy, per_hour, term, [busy])[0]
@@ -0,0 +1,97 @@
+"""Compare the streaming .ics writer against the icalendar object-tree export.
+
+Usage: python benchmarks/bench_ics_export.py [--blocks 5000]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from icalendar import Calendar
+
+from calendar_generator import build_calendar, export_json_to_ics
+
+
+# Course data with `n_blocks` one-hour study blocks spread over a term
+def make_data(n_blocks):
+    start = date(2025, 1, 6)
+    blocks = []
+    for i in range(n_blocks):
+        day = start + timedelta(days=(i // 15) % 120)
+        blocks.append({
+            "title": f"Work on Assignment {i % 40}: Essay, draft; review",
+            "date": day.isoformat(),
+            "time": f"{9 + i % 15:02d}:00",
+            "type": "assignment",
+            "course": f"Course{i % 6}",
+        })
+    return {
+        "assignments": [{"title": f"Assignment {i}", "due_date": "2025-03-01", "due_time": "N/A",
+                         "course": f"Course{i % 6}"} for i in range(40)],
+        "tests": [{"title": f"Quiz {i}", "date": "2025-02-10", "time": "N/A", "course": f"Course{i % 6}"}
+                  for i in range(12)],
+        "schedule": [{"name": f"Course{i}: Lecture", "days": ["Monday", "Wednesday"], "time": "10:30–11:30",
+                      "location": "Room 101", "course": f"Course{i}"} for i in range(6)],
+        "study_blocks": blocks,
+    }
+
+
+# Time a run, then repeat it under tracemalloc for the peak memory
+def measure(fn):
+    started = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - started
+
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+# Compare events property by property, ignoring DTSTAMP
+def events_of(ics_bytes):
+    events = {}
+    for event in Calendar.from_ical(ics_bytes).walk("VEVENT"):
+        props = {key: event[key].to_ical() for key in event if key != "DTSTAMP"}
+        events[str(event["UID"])] = props
+    return events
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--blocks", type=int, default=5000)
+    args = parser.parse_args()
+
+    data = make_data(args.blocks)
+    with tempfile.TemporaryDirectory() as tmp:
+        tree_path = os.path.join(tmp, "tree.ics")
+        stream_path = os.path.join(tmp, "stream.ics")
+
+        def tree_export():
+            with open(tree_path, "wb") as f:
+                f.write(build_calendar(data).to_ical())
+
+        tree_time, tree_peak = measure(tree_export)
+        stream_time, stream_peak = measure(
+            lambda: export_json_to_ics(data, stream_path, incremental=False))
+
+        with open(tree_path, "rb") as f:
+            tree_events = events_of(f.read())
+        with open(stream_path, "rb") as f:
+            stream_events = events_of(f.read())
+
+    print(f"\n{len(tree_events)} events")
+    print(f"object tree: {tree_time:.3f}s, peak {tree_peak / 1e6:.1f} MB")
+    print(f"streaming:   {stream_time:.3f}s, peak {stream_peak / 1e6:.1f} MB")
+    print("outputs match" if tree_events == stream_events else "OUTPUTS DIFFER")
+    return 0 if tree_events == stream_events else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
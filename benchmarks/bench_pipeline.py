@@ -0,0 +1,315 @@
+"""Benchmark the parse -> schedule -> export pipeline on synthetic data.
+
+Usage: python benchmarks/bench_pipeline.py [--courses 6] [--assignments 12] [--tests 4]
+           [--sessions 3] [--pdfs 8] [--pages 10] [--runs 5] [--llm-latency 0.05]
+           [--save-baseline] [--tolerance 0.3]
+
+Each stage is timed on its own: extract_text_from_pdf, LLM extraction through
+process_pdf (against a mocked client that sleeps --llm-latency seconds per
+request), merge_json, generate_time_blocks and export_json_to_ics. Results are
+compared against benchmarks/baseline.json when it was recorded with the same
+parameters. The baseline stores the commit it was recorded at; record it on a
+tree without known regressions, or it will hide them. The exit code is 1 if
+any stage got slower or bigger than the baseline by more than --tolerance.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date, timedelta
+from types import SimpleNamespace
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import llm_client
+import main as pipeline
+from block_generator import generate_time_blocks
+from calendar_generator import export_json_to_ics
+from pdf_parser import extract_text_from_pdf
+
+BASELINE_PATH = os.path.join(ROOT, "benchmarks", "baseline.json")
+TERM_START = date(2025, 1, 6)
+TERM_DAYS = 90
+WEEKDAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday"]
+LINES_PER_PAGE = 45
+# Slowdowns smaller than this are timer noise, not regressions
+MIN_REGRESSION_SECONDS = 0.002
+
+
+class MockLLMClient:
+    """Stands in for the OpenAI client: waits `latency` seconds and returns a valid assignment."""
+
+    def __init__(self, latency, seed=0):
+        self.latency = latency
+        self.random = random.Random(seed)
+        self.calls = 0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def with_options(self, **options):
+        return self
+
+    def create(self, model, messages, **kwargs):
+        self.calls += 1
+        time.sleep(self.latency)
+        due = TERM_START + timedelta(days=self.random.randrange(TERM_DAYS))
+        content = json.dumps({"assignment": [{
+            "title": f"Assignment {self.calls}",
+            "due_date": due.isoformat(),
+            "due_time": "23:59",
+            "difficulty": self.random.randint(1, 10),
+        }]})
+        prompt_tokens = sum(len(message["content"]) for message in messages) // 4
+        choice = SimpleNamespace(message=SimpleNamespace(content=content), finish_reason="stop")
+        return SimpleNamespace(choices=[choice],
+                               usage=SimpleNamespace(prompt_tokens=prompt_tokens,
+                                                     completion_tokens=len(content) // 4))
+
+
+# Parsed syllabus of one course: `assignments` and `tests` spread over the term,
+# `sessions` weekly classes on different days, and the term's class dates
+def make_course(index, assignments, tests, sessions, rng):
+    course = f"Course{index}"
+
+    def day():
+        return (TERM_START + timedelta(days=rng.randrange(7, TERM_DAYS))).isoformat()
+
+    return {
+        "assignments": [{"title": f"{course} Assignment {i + 1}", "due_date": day(), "due_time": "23:59",
+                         "weight": rng.choice([5, 10, 15, 20]), "difficulty": rng.randint(1, 10)}
+                        for i in range(assignments)],
+        "tests": [{"title": f"{course} Quiz {i + 1}", "date": day(), "time": "N/A",
+                   "weight": rng.choice([10, 20, 30])}
+                  for i in range(tests)],
+        "schedule": [{"name": f"{course} Lecture", "days": [WEEKDAYS[(index + i) % len(WEEKDAYS)]],
+                      "time": f"{9 + 2 * i:02d}:30–{10 + 2 * i:02d}:30", "location": f"Room {100 + i}"}
+                     for i in range(sessions)],
+        "term": {"start": TERM_START.isoformat(), "end": (TERM_START + timedelta(days=TERM_DAYS - 1)).isoformat(),
+                 "exclusions": []},
+    }
+
+
+# Student folder with one parsed syllabus per course, the input of merge_json
+def make_student(student_dir, courses, assignments, tests, sessions, seed=0):
+    rng = random.Random(seed)
+    for index in range(courses):
+        parsed_dir = os.path.join(student_dir, f"Course{index}", "Syllabus", "parsed")
+        os.makedirs(parsed_dir, exist_ok=True)
+        with open(os.path.join(parsed_dir, "syllabus_parsed.json"), "w", encoding="utf-8") as f:
+            json.dump(make_course(index, assignments, tests, sessions, rng), f)
+
+
+# Multi-page text PDF that reads like an assignment handout
+def make_pdf(path, pages, seed=0):
+    import fitz
+
+    rng = random.Random(seed)
+    doc = fitz.open()
+    for page_number in range(pages):
+        lines = []
+        for line in range(LINES_PER_PAGE):
+            due = TERM_START + timedelta(days=rng.randrange(TERM_DAYS))
+            lines.append(f"Section {page_number + 1}.{line + 1}: submit the report by {due.isoformat()}, "
+                         f"worth {rng.randint(1, 20)}% of the grade.")
+        doc.new_page().insert_text((36, 36), "\n".join(lines), fontsize=8)
+    doc.save(path)
+    doc.close()
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+# Time fn over `runs` rounds after one warm-up round; fn returns the per-call
+# latencies of one round and the number of units (pages, courses, items,
+# events) it handled. Peak memory comes from one more round under tracemalloc.
+def measure(fn, runs):
+    with contextlib.redirect_stdout(io.StringIO()):
+        fn()
+    samples = []
+    units = 0
+    elapsed = 0.0
+    for _ in range(runs):
+        started = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            latencies, count = fn()
+        elapsed += time.perf_counter() - started
+        samples.extend(latencies)
+        units += count
+
+    tracemalloc.start()
+    with contextlib.redirect_stdout(io.StringIO()):
+        fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "p50": percentile(samples, 0.5),
+        "p95": percentile(samples, 0.95),
+        "throughput": units / elapsed if elapsed else 0.0,
+        "peak_mb": peak / 1024 / 1024,
+    }
+
+
+def timed(fn, *args, **kwargs):
+    started = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return time.perf_counter() - started, result
+
+
+def run_stages(args, workdir):
+    pdf_paths = []
+    pdf_dir = os.path.join(workdir, "Course0", "Assignments")
+    os.makedirs(pdf_dir, exist_ok=True)
+    for i in range(args.pdfs):
+        path = os.path.join(pdf_dir, f"handout{i}.pdf")
+        make_pdf(path, args.pages, seed=i)
+        pdf_paths.append(path)
+
+    student_dir = os.path.join(workdir, "student")
+    make_student(student_dir, args.courses, args.assignments, args.tests, args.sessions)
+    merged_path = os.path.join(student_dir, "syllabus_matched.json")
+    ics_path = os.path.join(workdir, "course_calendar.ics")
+
+    texts = {}
+
+    def extract_stage():
+        latencies = []
+        for path in pdf_paths:
+            elapsed, texts[path] = timed(extract_text_from_pdf, path)
+            latencies.append(elapsed)
+        return latencies, len(pdf_paths) * args.pages
+
+    def llm_stage():
+        latencies = []
+        for path in pdf_paths:
+            elapsed, status = timed(pipeline.process_pdf, path, "assignment", use_cache=False, text=texts[path])
+            if status == "failed":
+                raise RuntimeError(f"process_pdf failed on {path}")
+            latencies.append(elapsed)
+        return latencies, len(pdf_paths)
+
+    def merge_stage():
+        elapsed, _ = timed(pipeline.merge_json, student_dir, merged_path, use_manifest=False)
+        return [elapsed], args.courses
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        merge_stage()
+    with open(merged_path, "r", encoding="utf-8") as f:
+        merged = json.load(f)
+    n_items = len(merged["assignments"]) + len(merged["tests"])
+    blocks = generate_time_blocks(merged)["blocks"]
+    calendar_data = dict(merged, study_blocks=blocks)
+    n_events = n_items + len(merged["schedule"]) + len(blocks)
+
+    def schedule_stage():
+        elapsed, _ = timed(generate_time_blocks, merged)
+        return [elapsed], n_items
+
+    def export_stage():
+        elapsed, _ = timed(export_json_to_ics, calendar_data, ics_path, incremental=False)
+        return [elapsed], n_events
+
+    return {
+        "extract_text_from_pdf": (measure(extract_stage, args.runs), "pages/s"),
+        "llm_extract (mocked)": (measure(llm_stage, args.runs), "PDFs/s"),
+        "merge_json": (measure(merge_stage, args.runs), "courses/s"),
+        "generate_time_blocks": (measure(schedule_stage, args.runs), "items/s"),
+        "export_json_to_ics": (measure(export_stage, args.runs), "events/s"),
+    }
+
+
+# Short hash of the checked-out commit, marked "+dirty" with uncommitted changes
+def current_commit():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                                text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=ROOT,
+                               capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return commit + "+dirty" if dirty else commit
+
+
+# Stages whose p50 or peak memory grew more than `tolerance` over the baseline
+def find_regressions(results, baseline, tolerance):
+    regressions = []
+    for name, (stats, _) in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        for metric, slack in (("p50", MIN_REGRESSION_SECONDS), ("peak_mb", 0.0)):
+            if stats[metric] > base[metric] * (1 + tolerance) + slack:
+                regressions.append(f"{name}: {metric} {stats[metric]:.4g} vs baseline {base[metric]:.4g}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--courses", type=int, default=6)
+    parser.add_argument("--assignments", type=int, default=12, help="assignments per course")
+    parser.add_argument("--tests", type=int, default=4, help="tests per course")
+    parser.add_argument("--sessions", type=int, default=3, help="weekly class sessions per course")
+    parser.add_argument("--pdfs", type=int, default=8, help="synthetic assignment PDFs")
+    parser.add_argument("--pages", type=int, default=10, help="pages per PDF")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="seconds per mocked LLM request")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true", help="store these results as the baseline")
+    parser.add_argument("--tolerance", type=float, default=0.3, help="allowed slowdown before failing")
+    args = parser.parse_args()
+
+    params = {key: getattr(args, key) for key in
+              ("courses", "assignments", "tests", "sessions", "pdfs", "pages", "llm_latency")}
+
+    llm_client._client = MockLLMClient(args.llm_latency)
+    with tempfile.TemporaryDirectory() as workdir:
+        # process_pdf writes its cache under data/, keep that inside the scratch folder
+        previous_cwd = os.getcwd()
+        os.chdir(workdir)
+        try:
+            results = run_stages(args, workdir)
+        finally:
+            os.chdir(previous_cwd)
+
+    print(f"{'stage':<24} {'p50 ms':>9} {'p95 ms':>9} {'throughput':>18} {'peak MB':>8}")
+    for name, (stats, unit) in results.items():
+        print(f"{name:<24} {stats['p50'] * 1000:9.2f} {stats['p95'] * 1000:9.2f} "
+              f"{stats['throughput']:10.1f} {unit:<7} {stats['peak_mb']:8.2f}")
+
+    if args.save_baseline:
+        # Before opening the file, which may be the tracked baseline.json
+        baseline = {"commit": current_commit(), "params": params,
+                    "stages": {name: stats for name, (stats, _) in results.items()}}
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(baseline, f, indent=2)
+        print(f"\nSaved baseline to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print("\nNo baseline yet, run with --save-baseline to record one")
+        return 0
+    with open(args.baseline, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    if baseline.get("params") != params:
+        print("\nBaseline was recorded with different parameters, not comparing")
+        return 0
+    print(f"\nComparing against the baseline recorded at commit {baseline.get('commit') or 'unknown'}")
+
+    regressions = find_regressions(results, baseline["stages"], args.tolerance)
+    for regression in regressions:
+        print(f"⚠️ Regression in {regression}")
+    if not regressions:
+        print(f"\nNo regressions against the baseline (tolerance {args.tolerance:.0%})")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
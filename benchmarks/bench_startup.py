@@ -0,0 +1,45 @@
+"""Measure how long it takes to start the tool for different one-shot uses.
+
+Usage: python benchmarks/bench_startup.py [--runs 10]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Each scenario runs in a fresh interpreter, the way a CLI launch or cron job would
+SCENARIOS = {
+    "import main": "import main",
+    "import main + allocate": "import main, block_generator",
+    "import main + export": "import main, calendar_generator",
+    "import main + LLM client": "import main; main.get_client()",
+}
+
+
+def time_run(code):
+    started = time.perf_counter()
+    subprocess.run([sys.executable, "-c", code], cwd=ROOT, check=True,
+                   env={**os.environ, "OPENAI_API_KEY": os.environ.get("OPENAI_API_KEY", "unused")})
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10)
+    args = parser.parse_args()
+
+    baseline = statistics.median(time_run("pass") for _ in range(args.runs))
+    print(f"{'bare interpreter':<26} {baseline * 1000:7.1f} ms")
+    for name, code in SCENARIOS.items():
+        times = [time_run(code) for _ in range(args.runs)]
+        print(f"{name:<26} {statistics.median(times) * 1000:7.1f} ms median, "
+              f"{min(times) * 1000:.1f} ms best")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
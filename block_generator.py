@@ -1,6 +1,10 @@
+import hashlib
 import json
-from datetime import datetime, timedelta, time
-from collections import defaultdict
+from datetime import date, datetime, timedelta, time
+
+from instrumentation import span
+from models import as_course_data, iter_records, to_date
+from occurrence_index import LEAD_DAYS, OccurrenceIndex
 
 # Constants
 STUDY_HOURS_START = 9  # 9:00 AM
@@ -8,6 +12,8 @@ STUDY_HOURS_END = 2 + 24  # 2:00 AM next day => 26
 MAX_BLOCKS_PER_DAY_PER_ITEM = 3
 DIFFICULTY_MULTIPLIER = [0.5, 0.6, 0.7, 0.85, 1, 1.10, 1.20, 1.5, 2, 2.5]
 WEIGHT_HOUR_MAP = [(70, 30), (40, 20), (15, 10), (5, 3), (3, 1)]
+BLOCK_PREFIXES = {"test": "Study for ", "assignment": "Work on "}
+HOUR_STRINGS = [f"{hour:02d}:00" for hour in range(24)]
 
 # Get base hours based on weight
 def get_base_hours(weight):
@@ -24,103 +30,299 @@ def get_multiplier(difficulty):
         difficulty = 6
     return DIFFICULTY_MULTIPLIER[min(9, max(0, difficulty - 1))]
 
-# Parse time range string (e.g., '13:30–15:30') to time objects
-def parse_time_range(time_range):
+# Study hours within one calendar day as [start, end) hour ranges: 00:00–02:00 and 09:00–24:00
+STUDY_WINDOWS = [(0, STUDY_HOURS_END - 24), (STUDY_HOURS_START, 24)]
+
+# Hours of work an Assignment or Test needs
+def get_hours_needed(item):
+    weight = 5 if item.weight is None else item.weight
+    if item.is_test:
+        return 15 if weight > 15 else 6
+    base_hours = get_base_hours(weight)
+    multiplier = get_multiplier(6 if item.difficulty is None else item.difficulty)
+    return int(round(base_hours * multiplier))
+
+def get_title(item):
+    return "Untitled" if item.title is None else item.title
+
+# Study hours for an Assignment or Test with a due date, around the class
+# meetings in `occurrences` (an OccurrenceIndex). Hours are absolute hour
+# numbers (date ordinal * 24 + hour of day), in order; format_blocks turns
+# them into block dicts once scheduling is done.
+# `occupied` maps each date ordinal to a bitmap of hours already given to other
+# items; when passed, those hours are skipped and the new hours are marked in it.
+def generate_blocks(item, occurrences, occupied=None):
+    hours_needed = get_hours_needed(item)
+
+    due_date = datetime.combine(get_due_date(item), time())
+    start_day = due_date.date() - timedelta(days=LEAD_DAYS)
+    # Slots less than two days before the due date are exempt from the daily cap
+    urgent_from = due_date - timedelta(days=2)
+
+    hours = []
+    day = start_day
+    while day <= due_date.date() and hours_needed > 0:
+        # Work starts at the study start on the first day and ends at midnight of the due date
+        lo = STUDY_HOURS_START if day == start_day else 0
+        hi = 1 if day == due_date.date() else 24
+        urgent_after = (urgent_from - datetime.combine(day, time())) / timedelta(hours=1)
+
+        ordinal = day.toordinal()
+        taken = occupied.get(ordinal, 0) if occupied is not None else 0
+        blocked = taken | occurrences.busy_hours(day)
+
+        regular, urgent = [], []
+        for start, end in STUDY_WINDOWS:
+            for hour in range(max(start, lo), min(end, hi)):
+                if blocked >> hour & 1:
+                    continue
+                (urgent if hour > urgent_after else regular).append(hour)
+
+        base = ordinal * 24
+        for hour in (regular[:MAX_BLOCKS_PER_DAY_PER_ITEM] + urgent)[:hours_needed]:
+            taken |= 1 << hour
+            hours.append(base + hour)
+            hours_needed -= 1
+        if occupied is not None:
+            occupied[ordinal] = taken
+        day += timedelta(days=1)
+    return hours
+
+# Order in which items claim study time
+SCHEDULING_ORDERS = {
+    # Earliest deadline first, heavier and harder items win ties
+    "edf": lambda x: (
+        x.due_str or "",
+        -(x.weight or 0),
+        -(6 if x.difficulty is None else x.difficulty)
+    ),
+    # Heaviest and hardest items first, deadline breaks ties
+    "priority": lambda x: (
+        -(x.weight or 0),
+        -(6 if x.difficulty is None else x.difficulty),
+        x.due_str or ""
+    ),
+}
+
+# Identify the assignment or test an item or a generated block belongs to
+def get_item_key(item):
+    return ("test" if item.is_test else "assignment", item.course or "", get_title(item))
+
+def get_block_key(block):
+    title = block.get("title", "")
+    prefix = BLOCK_PREFIXES.get(block.get("type"), "Work on ")
+    if title.startswith(prefix):
+        title = title[len(prefix):]
+    return (block.get("type"), block.get("course", ""), title)
+
+# Due date of an item as a date, None when it is missing or unreadable
+def get_due_date(item):
     try:
-        start_str, end_str = time_range.split('–')
-        start = datetime.strptime(start_str.strip(), '%H:%M').time()
-        end = datetime.strptime(end_str.strip(), '%H:%M').time()
-        return start, end
-    except:
-        return None, None
-
-# Get blocked class hours per day
-def build_class_schedule(schedule):
-    class_blocks = defaultdict(list)
-    for item in schedule:
-        days = item.get("days", [])
-        time_range = item.get("time", "")
-        start, end = parse_time_range(time_range)
-        if not start or not end:
-            continue
-        for day in days:
-            class_blocks[day].append((start, end))
-    return class_blocks
-
-# Check if a given datetime conflicts with class schedule
-def is_class_conflict(dt, class_blocks):
-    weekday = dt.strftime("%A")
-    blocks = class_blocks.get(weekday, [])
-    for start, end in blocks:
-        if start <= dt.time() < end:
-            return True
-    return False
-
-# Check if time is within allowed study hours
-def is_study_time(dt):
-    hour = dt.hour + dt.minute / 60
-    return STUDY_HOURS_START <= hour or hour < 2
-
-# Generate 1-hour blocks
-def generate_blocks(item, due_date_str, is_test, class_blocks):
-    title = item.get("title", "Untitled")
-    weight = item.get("weight", 5)
-    difficulty = item.get("difficulty", 6)
-    course = item.get("course", "")
-    block_type = "test" if is_test else "assignment"
-
-    if is_test:
-        hours_needed = 15 if weight > 15 else 6
-        start_date = datetime.strptime(due_date_str, "%Y-%m-%d") - timedelta(days=14)
-    else:
-        base_hours = get_base_hours(weight)
-        multiplier = get_multiplier(difficulty)
-        hours_needed = int(round(base_hours * multiplier))
-        start_date = datetime.strptime(due_date_str, "%Y-%m-%d") - timedelta(days=14)
-
-    due_date = datetime.strptime(due_date_str, "%Y-%m-%d")
+        return to_date(item.due_date)
+    except (TypeError, ValueError):
+        return None
+
+# [start, end) datetimes study blocks can fall in for the items of course data
+# (dict or CourseData), None when nothing has a due date
+def get_horizon(data):
+    due_dates = [due for section in ("assignments", "tests")
+                 for due in map(get_due_date, iter_records(data, section)) if due]
+    if not due_dates:
+        return None
+    return (datetime.combine(min(due_dates) - timedelta(days=LEAD_DAYS), time()),
+            datetime.combine(max(due_dates) + timedelta(days=1), time()))
+
+# Absolute hours of a block dict, one per hour of its duration
+def get_block_hours(block):
+    start = date.fromisoformat(block["date"]).toordinal() * 24 + int(block["time"][:2])
+    return range(start, start + block.get("duration", 1))
+
+# Block dicts of {item key: absolute hours}. Back-to-back hours of the same item
+# are merged into one block with a duration in hours; per_hour=True keeps one
+# block per hour. Dates are formatted once per day, not once per block.
+def format_blocks(blocks_by_key, per_hour=False):
+    dates = {}
     blocks = []
-    daily_blocks = defaultdict(int)
-    current = start_date.replace(hour=STUDY_HOURS_START, minute=0)
-
-    while current <= due_date and hours_needed > 0:
-        if is_study_time(current) and not is_class_conflict(current, class_blocks):
-            key = (current.date(), title)
-            if daily_blocks[key] < MAX_BLOCKS_PER_DAY_PER_ITEM or due_date - current < timedelta(days=2):
-                block = {
-                    "title": f"{'Study for ' if is_test else 'Work on '}{title}",
-                    "date": current.strftime("%Y-%m-%d"),
-                    "time": current.strftime("%H:%M"),
-                    "type": block_type
-                }
-                blocks.append(block)
-                daily_blocks[key] += 1
-                hours_needed -= 1
-        current += timedelta(minutes=60)
+    for (block_type, course, title), hours in blocks_by_key.items():
+        block_title = BLOCK_PREFIXES.get(block_type, "Work on ") + title
+        runs = []
+        for hour in hours:
+            if not per_hour and runs and runs[-1][1] == hour:
+                runs[-1][1] += 1
+            else:
+                runs.append([hour, hour + 1])
+        for start, end in runs:
+            ordinal = start // 24
+            date_str = dates.get(ordinal)
+            if date_str is None:
+                date_str = dates[ordinal] = date.fromordinal(ordinal).isoformat()
+            block = {"title": block_title, "date": date_str, "time": HOUR_STRINGS[start % 24]}
+            if not per_hour:
+                block["duration"] = end - start
+            block["type"] = block_type
+            block["course"] = course
+            blocks.append(block)
     return blocks
 
-# Main function to build all blocks
-def generate_time_blocks(json_data):
-    all_blocks = []
-    class_blocks = build_class_schedule(json_data.get("schedule", []))
-
-    items = sorted(
-        json_data.get("assignments", []) + json_data.get("tests", []),
-        key=lambda x: (
-            x.get("due_date") or x.get("date"),
-            -x.get("weight", 0),
-            -x.get("difficulty", 6)
-        )
-    )
+# Schedule items in order against `occupied`, returning {item key: blocks}
+def schedule_items(items, occurrences, occupied):
+    blocks_by_key = {}
+    for item in items:
+        if not get_due_date(item):
+            continue
+        hours = generate_blocks(item, occurrences, occupied)
+        blocks_by_key.setdefault(get_item_key(item), []).extend(hours)
+    return blocks_by_key
 
+# Collect items that got fewer hours than they need and warn about them
+# Items with a due date that got fewer hours than they need, as
+# {title, course, due, hours_needed, hours_scheduled} dicts
+def list_unscheduled(items, blocks_by_key):
+    unscheduled = []
     for item in items:
-        is_test = "date" in item
-        date_field = "date" if is_test else "due_date"
-        if not item.get(date_field):
+        if not get_due_date(item):
             continue
-        blocks = generate_blocks(item, item[date_field], is_test, class_blocks)
-        all_blocks.extend(blocks)
+        hours_needed = get_hours_needed(item)
+        hours_scheduled = len(blocks_by_key.get(get_item_key(item), ()))
+        if hours_scheduled < hours_needed:
+            unscheduled.append({
+                "title": get_title(item),
+                "course": item.course or "",
+                "due": item.due_str,
+                "hours_needed": hours_needed,
+                "hours_scheduled": hours_scheduled
+            })
+    return unscheduled
+
+# list_unscheduled, with a warning printed for each item
+def find_unscheduled(items, blocks_by_key):
+    unscheduled = list_unscheduled(items, blocks_by_key)
+    for entry in unscheduled:
+        print(f"⚠️ Only {entry['hours_scheduled']}/{entry['hours_needed']} hours fit before "
+              f"{entry['due']} for '{entry['title']}' ({entry['course'] or 'no course'})")
+    return unscheduled
+
+# Main function to build all blocks.
+# strategy is "edf" or "priority"; both share one occupancy calendar so no two
+# items get the same hour. "independent" schedules every item on its own, which
+# was the original behaviour and allows overlapping blocks.
+# Back-to-back hours for the same item come out as one block with a
+# "duration" in hours; per_hour=True keeps the old one-block-per-hour format.
+# json_data is the merged course dict or an already loaded models.CourseData.
+# Classes only block time on the days they meet within `term`
+# (occurrence_index.Term, inferred from the deadlines when None). `busy` is other time to
+# keep free of blocks as (start, end) datetimes, e.g. from ics_import.
+def generate_time_blocks(json_data, strategy="edf", per_hour=False, term=None, busy=()):
+    with span("generate_time_blocks", strategy=strategy) as trace:
+        data = as_course_data(json_data)
+        occurrences = OccurrenceIndex(data, term, busy)
+
+        order = SCHEDULING_ORDERS["edf" if strategy == "independent" else strategy]
+        items = sorted(data.assignments + data.tests, key=order)
+        occupied = None if strategy == "independent" else {}
+
+        blocks_by_key = schedule_items(items, occurrences, occupied)
+        all_blocks = format_blocks(blocks_by_key, per_hour)
+        unscheduled = find_unscheduled(items, blocks_by_key)
+        trace.set(items=len(items), blocks=len(all_blocks), unscheduled=len(unscheduled))
+    return {"blocks": all_blocks, "unscheduled": unscheduled}
+
+def mark_occupied(occupied, hours):
+    for hour in hours:
+        ordinal = hour // 24
+        occupied[ordinal] = occupied.get(ordinal, 0) | 1 << hour % 24
+
+def fingerprint(value):
+    return hashlib.sha256(repr(value).encode("utf-8")).hexdigest()[:16]
+
+# What the blocks of course data depend on, small enough to save next to them:
+# a hash of the class times and, per item key (as a JSON list), a hash of its
+# due date and hours needed. reschedule_time_blocks compares it with the new
+# course data to find the edited items.
+def schedule_digest(json_data):
+    data = as_course_data(json_data)
+    return {
+        "schedule": fingerprint([(session.days, session.time) for session in data.schedule]),
+        "items": {json.dumps(get_item_key(item)): fingerprint((item.due_date, get_hours_needed(item)))
+                  for item in data.assignments + data.tests},
+    }
+
+# Recompute study blocks after an edit, touching only the items that changed.
+# old_digest is the schedule_digest of the course data the old blocks were
+# generated from. Blocks of unchanged items are kept as they are; changed or
+# new items are fitted into the remaining free time. If a changed item cannot
+# get all its hours, items that come after it in scheduling order and hold
+# hours inside its window are released and rescheduled as well. term and busy
+# have to be the ones the old blocks were generated with.
+def reschedule_time_blocks(old_digest, new_data, old_blocks, strategy="edf", per_hour=False, term=None, busy=()):
+    new_data = as_course_data(new_data)
+    new_digest = schedule_digest(new_data)
+    # Class changes move free time for everything, and old blocks without a
+    # course cannot be traced back to their item, so start over in those cases
+    if (strategy == "independent"
+            or old_digest.get("schedule") != new_digest["schedule"]
+            or any("course" not in block for block in old_blocks)):
+        return generate_time_blocks(new_data, strategy, per_hour, term, busy)
+
+    with span("reschedule_time_blocks", strategy=strategy) as trace:
+        occurrences = OccurrenceIndex(new_data, term, busy)
+        order = SCHEDULING_ORDERS[strategy]
+        items = sorted(new_data.assignments + new_data.tests, key=order)
+
+        old_items = old_digest.get("items", {})
+        changed = {key for key in map(get_item_key, items)
+                   if old_items.get(json.dumps(key)) != new_digest["items"][json.dumps(key)]}
+
+        kept = {}
+        for block in old_blocks:
+            kept.setdefault(get_block_key(block), []).extend(get_block_hours(block))
+        live_keys = {get_item_key(item) for item in items}
+
+        def reschedule(affected):
+            occupied = {}
+            for key, hours in kept.items():
+                if key in live_keys and key not in affected:
+                    mark_occupied(occupied, hours)
+            to_schedule = [item for item in items if get_item_key(item) in affected]
+            return schedule_items(to_schedule, occurrences, occupied)
+
+        new_blocks = reschedule(changed)
+
+        # Release later-ordered items that sit inside the window of a short item
+        displaced = set()
+        positions = {get_item_key(item): i for i, item in enumerate(items)}
+        for item in items:
+            key = get_item_key(item)
+            due_date = get_due_date(item)
+            if key not in changed or not due_date:
+                continue
+            # Only displace others when the shortfall comes from their blocks, not
+            # from the item's own window being too small
+            hours_scheduled = len(new_blocks.get(key, []))
+            if hours_scheduled >= get_hours_needed(item):
+                continue
+            if hours_scheduled >= len(generate_blocks(item, occurrences)):
+                continue
+            window_start = (due_date - timedelta(days=LEAD_DAYS)).toordinal() * 24
+            window_end = (due_date.toordinal() + 1) * 24
+            for other_key, hours in kept.items():
+                if (other_key in live_keys and other_key not in changed
+                        and positions[other_key] > positions[key]
+                        and any(window_start <= hour < window_end for hour in hours)):
+                    displaced.add(other_key)
 
-    return {"blocks": all_blocks}
+        affected = changed | displaced
+        if displaced:
+            new_blocks = reschedule(affected)
 
+        blocks_by_key = {}
+        for item in items:
+            key = get_item_key(item)
+            if key not in blocks_by_key:
+                blocks_by_key[key] = new_blocks.get(key, []) if key in affected else kept.get(key, [])
 
+        all_blocks = format_blocks(blocks_by_key, per_hour)
+        unscheduled = find_unscheduled(items, blocks_by_key)
+        trace.set(items=len(items), changed=len(changed), displaced=len(displaced),
+                  blocks=len(all_blocks), unscheduled=len(unscheduled))
+    return {"blocks": all_blocks, "unscheduled": unscheduled}
@@ -1,140 +1,375 @@
-from icalendar import Calendar, Event
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, time
 import pytz
 import uuid
+import hashlib
 import json
+import os
 
-def export_json_to_ics(data, output_path):
-    cal = Calendar()
-    cal.add('prodid', '-//Course Calendar Export//example.com//')
-    cal.add('version', '2.0')
+from instrumentation import span
+from models import format_date, format_range, format_time, iter_records, to_date, to_time, to_time_range
+from occurrence_index import OccurrenceIndex, syllabus_term
+
+# Namespace for deterministic event UIDs, so re-exports update events in place
+UID_NAMESPACE = uuid.uuid5(uuid.NAMESPACE_DNS, "course-calendar.example.com")
+
+# Zone of every exported event
+TIMEZONE = "America/Toronto"
 
-    tz = pytz.timezone("America/Toronto")
+# Times used when an assignment or test has none
+DUE_TIME = time(23, 59)
+TEST_TIME = time(9, 0)
 
+DAY_MAP = {
+    "Monday": "MO", "Tuesday": "TU", "Wednesday": "WE",
+    "Thursday": "TH", "Friday": "FR", "Saturday": "SA", "Sunday": "SU"
+}
+
+# Build a stable UID from the parts that identify an event
+def make_uid(*parts):
+    return f"{uuid.uuid5(UID_NAMESPACE, '|'.join(str(part) for part in parts))}@course-calendar"
+
+# Turn course data (the merged dict or a models.CourseData) into event
+# descriptions: dicts with uid, summary, dtstart, dtend and optionally
+# description, location, rrule and exdate. Classes repeat weekly within
+# `term` (occurrence_index.Term from term.json), or within the class dates the
+# syllabi give when it is None.
+def iter_event_specs(data, tz, term=None):
     # === Assignments as Events ===
-    for assignment in data.get("assignments", []):
-        title = assignment.get("title", "Untitled Assignment")
-        due_date = assignment.get("due_date")
-        due_time = assignment.get("due_time", "23:59")
+    for assignment in iter_records(data, "assignments"):
+        title = "Untitled Assignment" if assignment.title is None else assignment.title
+        due_date = assignment.due_date
 
         if due_date and due_date != "N/A":
             try:
-                dt_start = datetime.strptime(
-                    f"{due_date} {due_time if due_time != 'N/A' else '23:59'}", "%Y-%m-%d %H:%M"
-                )
+                dt_start = datetime.combine(to_date(due_date), to_time(assignment.due_time, DUE_TIME))
                 dt_start = tz.localize(dt_start)
-                dt_end = dt_start + timedelta(hours=1)
-
-                event = Event()
-                event.add("uid", str(uuid.uuid4()))
-                event.add("summary", f"Assignment: {title}")
-                event.add("dtstart", dt_start)
-                event.add("dtend", dt_end)
-                event.add("description", f"Assignment due: {title}")
-                event.add("dtstamp", datetime.now(tz))
-                cal.add_component(event)
+                yield {
+                    "uid": make_uid("assignment", assignment.course or "", title, format_date(due_date)),
+                    "summary": f"Assignment: {title}",
+                    "dtstart": dt_start,
+                    "dtend": dt_start + timedelta(hours=1),
+                    "description": f"Assignment due: {title}",
+                }
             except Exception as e:
                 print(f"Error processing assignment '{title}':", e)
 
     # === Tests as Events ===
-    for test in data.get("tests", []):
-        title = test.get("title", "Untitled Test")
-        date = test.get("date")
-        time = test.get("time", "09:00")
+    for test in iter_records(data, "tests"):
+        title = "Untitled Test" if test.title is None else test.title
+        date = test.date
 
         if date and date != "N/A":
             try:
-                dt_start = datetime.strptime(
-                    f"{date} {time if time != 'N/A' else '09:00'}", "%Y-%m-%d %H:%M"
-                )
+                dt_start = datetime.combine(to_date(date), to_time(test.time, TEST_TIME))
                 dt_start = tz.localize(dt_start)
-                dt_end = dt_start + timedelta(hours=2)
-
-                event = Event()
-                event.add("uid", str(uuid.uuid4()))
-                event.add("summary", f"Test: {title}")
-                event.add("dtstart", dt_start)
-                event.add("dtend", dt_end)
-                event.add("description", f"Test: {title}")
-                event.add("dtstamp", datetime.now(tz))
-                cal.add_component(event)
+                yield {
+                    "uid": make_uid("test", test.course or "", title, format_date(date)),
+                    "summary": f"Test: {title}",
+                    "dtstart": dt_start,
+                    "dtend": dt_start + timedelta(hours=2),
+                    "description": f"Test: {title}",
+                }
             except Exception as e:
                 print(f"Error processing test '{title}':", e)
 
     # === Recurring Class Schedule as Events ===
-    day_map = {
-        "Monday": "MO", "Tuesday": "TU", "Wednesday": "WE",
-        "Thursday": "TH", "Friday": "FR", "Saturday": "SA", "Sunday": "SU"
-    }
-
-    for session in data.get("schedule", []):
-        if "name" not in session:
-            session["name"] = "Class Session"
-        days = session.get("days", [])
-        time_range = session.get("time")
-        location = session.get("location", "TBD")
-
-        if time_range == "N/A" or not days:
+    # Weekly from the first meeting to the last day of classes, with meetings
+    # on reading weeks and holidays left out as EXDATEs
+    # Not the scheduler's guess from the deadlines, which would add meetings
+    # before classes start and drop the ones after the last deadline
+    term = term or syllabus_term(data)
+    sessions = list(iter_records(data, "schedule"))
+    if term is None:
+        if sessions:
+            print("⚠️ No term.json and no class dates in the syllabi, class meetings are left out")
+        sessions = []
+    else:
+        until = tz.localize(datetime.combine(term.end + timedelta(days=1), time()))
+    occurrences = OccurrenceIndex(sessions, term)
+    for position, session in enumerate(sessions):
+        name = "Class Session" if session.name is None else session.name
+        days = session.days
+        location = "TBD" if session.location is None else session.location
+
+        if session.time == "N/A" or not days:
             continue
 
         try:
-            start_str, end_str = time_range.split("–")
-            bydays = [day_map[day] for day in days if day in day_map]
-            term_start = datetime(2025, 1, 6)
-            start_day_idx = list(day_map.keys()).index(days[0])
-            first_occurrence = term_start + timedelta(days=(start_day_idx - term_start.weekday()) % 7)
-
-            start_time = datetime.strptime(start_str.strip(), "%H:%M").time()
-            end_time = datetime.strptime(end_str.strip(), "%H:%M").time()
-
-            dt_start = tz.localize(datetime.combine(first_occurrence, start_time))
-            dt_end = tz.localize(datetime.combine(first_occurrence, end_time))
-
-            event = Event()
-            event.add("uid", str(uuid.uuid4()))
-            event.add("summary", session.get("name", "Class Session"))
-            event.add("location", location)
-            event.add("dtstart", dt_start)
-            event.add("dtend", dt_end)
-            event.add("dtstamp", datetime.now(tz))
-            event.add("rrule", {
-                "FREQ": "WEEKLY",
-                "BYDAY": bydays,
-                "UNTIL": tz.localize(datetime(2025, 4, 9))
-            })
-            cal.add_component(event)
+            start_time, end_time = to_time_range(session.time)
+            bydays = [DAY_MAP[day] for day in days if day in DAY_MAP]
+            first_meeting = occurrences.first_meeting(position)
+            if first_meeting is None:
+                continue
+
+            spec = {
+                "uid": make_uid("class", session.course or "", name, ",".join(days), format_range(session.time)),
+                "summary": name,
+                "location": location,
+                "dtstart": tz.localize(first_meeting),
+                "dtend": tz.localize(datetime.combine(first_meeting.date(), end_time)),
+                "rrule": {
+                    "FREQ": "WEEKLY",
+                    "BYDAY": bydays,
+                    "UNTIL": until
+                },
+            }
+            skipped = occurrences.skipped_meetings(position)
+            if skipped:
+                spec["exdate"] = [tz.localize(start) for start in skipped]
+            yield spec
         except Exception as e:
             print("Error processing schedule:", e)
 
     # === Study Blocks as Events ===
-    for block in data.get("study_blocks", []):
-        title = block.get("title", "Study Block")
-        date = block.get("date")
-        time = block.get("time")
+    for block in iter_records(data, "study_blocks"):
+        title = "Study Block" if block.title is None else block.title
+        date = block.date
+        block_time = block.time
 
-        if not date or not time:
+        if not date or not block_time:
             continue
 
         try:
-            dt_start = datetime.strptime(f"{date} {time}", "%Y-%m-%d %H:%M")
-            dt_start = tz.localize(dt_start)
-            dt_end = dt_start + timedelta(hours=1)
-
-            event = Event()
-            event.add("uid", str(uuid.uuid4()))
-            event.add("summary", title)
-            event.add("dtstart", dt_start)
-            event.add("dtend", dt_end)
-            event.add("description", f"Scheduled study session for: {title}")
-            event.add("dtstamp", datetime.now(tz))
-            cal.add_component(event)
+            dt_start = tz.localize(datetime.combine(to_date(date), to_time(block_time, None)))
+            yield {
+                "uid": make_uid("study", block.course or "", title, format_date(date), format_time(block_time)),
+                "summary": title,
+                "dtstart": dt_start,
+                "dtend": dt_start + timedelta(hours=1 if block.duration is None else block.duration),
+                "description": f"Scheduled study session for: {title}",
+            }
         except Exception as e:
             print(f"Error processing study block '{title}':", e)
 
-    # === Save to .ics ===
-    with open(output_path, 'wb') as f:
-        f.write(cal.to_ical())
-        print(f"Exported Google Calendar compatible .ics to: {output_path}")
+# Like iter_event_specs, but identical items (e.g. two blocks at the same
+# hour) get a -N suffix so every UID is unique
+def iter_unique_event_specs(data, tz, term=None):
+    seen_uids = set()
+    for spec in iter_event_specs(data, tz, term):
+        base_uid, n = spec["uid"], 1
+        while spec["uid"] in seen_uids:
+            n += 1
+            spec["uid"] = f"{base_uid}-{n}"
+        seen_uids.add(spec["uid"])
+        yield spec
+
+# Hash of everything that defines an event, used to spot changes between exports
+def fingerprint(spec):
+    return hashlib.sha256(json.dumps(spec, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+# Escape a TEXT value (RFC 5545 3.3.11)
+def escape_text(value):
+    return (str(value).replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,")
+            .replace("\r\n", "\\n").replace("\n", "\\n"))
+
+# Fold a content line at 75 octets without splitting UTF-8 characters
+def fold_line(line):
+    encoded = line.encode("utf-8")
+    if len(encoded) <= 75:
+        return line + "\r\n"
+
+    parts = []
+    start = 0
+    limit = 75
+    while start < len(encoded):
+        end = min(start + limit, len(encoded))
+        # Step back off UTF-8 continuation bytes
+        while end < len(encoded) and (encoded[end] & 0xC0) == 0x80:
+            end -= 1
+        parts.append(encoded[start:end].decode("utf-8"))
+        start = end
+        limit = 74  # continuation lines start with a space
+    return "\r\n ".join(parts) + "\r\n"
+
+def format_local(dt):
+    return dt.strftime("%Y%m%dT%H%M%S")
+
+def format_utc(dt):
+    return dt.astimezone(pytz.utc).strftime("%Y%m%dT%H%M%SZ")
+
+def format_rrule(rrule):
+    parts = []
+    for key, value in rrule.items():
+        if isinstance(value, datetime):
+            value = format_local(value)
+        elif isinstance(value, (list, tuple)):
+            value = ",".join(value)
+        parts.append(f"{key}={value}")
+    return ";".join(parts)
+
+# Serialize one event to VEVENT text without building an icalendar object
+def serialize_event(spec, sequence, dtstamp):
+    lines = [
+        "BEGIN:VEVENT",
+        f"SUMMARY:{escape_text(spec['summary'])}",
+        f"DTSTART;TZID={spec['dtstart'].tzinfo.zone}:{format_local(spec['dtstart'])}",
+        f"DTEND;TZID={spec['dtend'].tzinfo.zone}:{format_local(spec['dtend'])}",
+        f"DTSTAMP:{format_utc(dtstamp)}",
+        f"UID:{spec['uid']}",
+        f"SEQUENCE:{sequence}",
+    ]
+    if "rrule" in spec:
+        lines.append(f"RRULE:{format_rrule(spec['rrule'])}")
+    if "exdate" in spec:
+        zone = spec["exdate"][0].tzinfo.zone
+        lines.append(f"EXDATE;TZID={zone}:{','.join(format_local(dt) for dt in spec['exdate'])}")
+    if "description" in spec:
+        lines.append(f"DESCRIPTION:{escape_text(spec['description'])}")
+    if "location" in spec:
+        lines.append(f"LOCATION:{escape_text(spec['location'])}")
+    lines.append("END:VEVENT")
+    return "".join(fold_line(line) for line in lines)
+
+def build_event(spec, sequence, dtstamp):
+    from icalendar import Event
+
+    event = Event()
+    event.add("uid", spec["uid"])
+    event.add("summary", spec["summary"])
+    if "location" in spec:
+        event.add("location", spec["location"])
+    event.add("dtstart", spec["dtstart"])
+    event.add("dtend", spec["dtend"])
+    if "description" in spec:
+        event.add("description", spec["description"])
+    event.add("dtstamp", dtstamp)
+    event.add("sequence", sequence)
+    if "rrule" in spec:
+        event.add("rrule", spec["rrule"])
+    if "exdate" in spec:
+        event.add("exdate", spec["exdate"])
+    return event
+
+# Mark a previously exported event as cancelled
+def build_cancellation(vevent, sequence, dtstamp):
+    from icalendar import Event
+
+    event = Event.from_ical(vevent)
+    for prop in ("status", "sequence", "dtstamp"):
+        if prop in event:
+            del event[prop]
+    event.add("dtstamp", dtstamp)
+    event.add("sequence", sequence)
+    event.add("status", "CANCELLED")
+    return event
+
+# Same bytes icalendar writes for an empty calendar with these properties, kept
+# as text so a plain export doesn't have to import icalendar at all
+CALENDAR_HEADER = (
+    "BEGIN:VCALENDAR\r\n"
+    "VERSION:2.0\r\n"
+    "PRODID:-//Course Calendar Export//example.com//\r\n"
+)
+
+def calendar_header():
+    return CALENDAR_HEADER
+
+def write_calendar(path, vevents):
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        f.write(calendar_header())
+        for vevent in vevents:
+            f.write(vevent)
+        f.write("END:VCALENDAR\r\n")
+
+def load_export_state(state_path):
+    if not os.path.exists(state_path):
+        return {"events": {}, "cancelled": {}}
+    with open(state_path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+# Export course data to .ics.
+# Events are serialized one at a time and streamed straight to the output
+# file. Event UIDs are stable and the serialized VEVENTs are cached next to
+# the output in `<output>.state.json`: unchanged events are written back
+# byte-for-byte, changed ones get their SEQUENCE bumped and removed ones are
+# cancelled. If changes_path is given, only the changed and cancelled events
+# are also written there for clients that sync deltas. With
+# incremental=False no state is read or kept, so memory use stays flat no
+# matter how many events are exported. Classes repeat within `term`
+# (occurrence_index.Term), or the syllabi's class dates when None.
+def export_json_to_ics(data, output_path, changes_path=None, state_path=None, incremental=True, term=None):
+    tz = pytz.timezone(TIMEZONE)
+    dtstamp = datetime.now(tz)
+    state_path = state_path or output_path + ".state.json"
+    state = load_export_state(state_path) if incremental else {"events": {}, "cancelled": {}}
+    previous = state["events"]
+    cancelled = state["cancelled"]
+
+    events = {}
+    changes = []
+    unchanged = changed = removed = 0
+    with span("export_json_to_ics", path=output_path, incremental=incremental) as trace, \
+            open(output_path, 'w', encoding='utf-8', newline='') as f:
+        f.write(calendar_header())
+        for spec in iter_unique_event_specs(data, tz, term):
+            uid = spec["uid"]
+
+            if not incremental:
+                f.write(serialize_event(spec, 0, dtstamp))
+                changed += 1
+                continue
+
+            fp = fingerprint(spec)
+            prev = previous.get(uid)
+            if prev and prev["fingerprint"] == fp:
+                entry = prev
+                unchanged += 1
+            else:
+                if prev:
+                    sequence = prev["sequence"] + 1
+                elif uid in cancelled:
+                    sequence = cancelled[uid]["sequence"] + 1
+                else:
+                    sequence = 0
+                vevent = serialize_event(spec, sequence, dtstamp)
+                entry = {"fingerprint": fp, "sequence": sequence, "vevent": vevent}
+                changes.append(vevent)
+                changed += 1
+            events[uid] = entry
+            f.write(entry["vevent"])
+        f.write("END:VCALENDAR\r\n")
+        trace.set(events=unchanged + changed, changed=changed)
+
+    print(f"Exported Google Calendar compatible .ics to: {output_path}")
+    if not incremental:
+        print(f"{changed} events written")
+        return
+
+    # Events that disappeared since the last export are sent as cancellations
+    for uid, prev in previous.items():
+        if uid in events:
+            continue
+        sequence = prev["sequence"] + 1
+        vevent = build_cancellation(prev["vevent"], sequence, dtstamp).to_ical().decode("utf-8")
+        cancelled[uid] = {"sequence": sequence}
+        changes.append(vevent)
+        removed += 1
+    for uid in events:
+        cancelled.pop(uid, None)
+
+    print(f"{unchanged} unchanged, {changed} new or changed, {removed} cancelled events")
+
+    if changes_path:
+        write_calendar(changes_path, changes)
+        print(f"Exported changed and cancelled events to: {changes_path}")
+
+    with open(state_path, "w", encoding="utf-8") as f:
+        json.dump({"events": events, "cancelled": cancelled}, f, ensure_ascii=False)
+
+# Build the whole calendar as an icalendar object tree, the way exports were
+# done before streaming. Kept as the reference the streaming writer is checked
+# and benchmarked against.
+def build_calendar(data, term=None):
+    from icalendar import Calendar
+
+    tz = pytz.timezone(TIMEZONE)
+    dtstamp = datetime.now(tz)
+    cal = Calendar()
+    cal.add('prodid', '-//Course Calendar Export//example.com//')
+    cal.add('version', '2.0')
+    for spec in iter_unique_event_specs(data, tz, term):
+        cal.add_component(build_event(spec, 0, dtstamp))
+    return cal
 
 
 # === Example usage ===
@@ -0,0 +1,169 @@
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+# Map-reduce extraction for documents too long for one prompt: the text is split
+# on section boundaries into chunks under a token budget, each chunk is sent to
+# the LLM concurrently and the per-chunk JSON is merged back into one result.
+CHUNK_TOKENS = 6000  # document tokens per chunk, the prompt itself comes on top
+CHUNK_JOBS = 4  # chunks of one document extracted at once, llm_client.MAX_REQUESTS caps the total
+CHARS_PER_TOKEN = 4  # estimate used when tiktoken is not installed
+
+# Lists that hold a single entry however many chunks mention it
+SINGLE_ENTRY_KEYS = {"assignment"}
+
+SECTION_BREAK = re.compile(r"\n[ \t]*\n")
+
+try:
+    import tiktoken
+    _encoding = tiktoken.get_encoding("o200k_base")
+except ImportError:
+    _encoding = None
+
+
+def count_tokens(text):
+    """Number of model tokens in `text`, estimated from its length without tiktoken."""
+    if _encoding is not None:
+        return len(_encoding.encode(text, disallowed_special=()))
+    return -(-len(text) // CHARS_PER_TOKEN)
+
+
+def _split_oversized(text, max_tokens):
+    # Fall back from sections to lines, and from lines to slices of the
+    # estimated size. Every piece is shorter than `text`: a line that is no
+    # longer than one slice but still over budget (digits, CJK, URLs count
+    # more tokens per character) is halved instead, so splitting always ends.
+    pieces = text.splitlines(keepends=True)
+    if len(pieces) > 1:
+        return pieces
+    step = max_tokens * CHARS_PER_TOKEN
+    if len(text) <= step:
+        step = (len(text) + 1) // 2
+    return [text[i:i + step] for i in range(0, len(text), step)]
+
+
+def split_text(text, max_tokens=CHUNK_TOKENS):
+    """Split `text` on section boundaries into chunks of at most `max_tokens` tokens."""
+    if count_tokens(text) <= max_tokens:
+        return [text]
+
+    # Keep each section's trailing blank line with it so chunks join back to `text`
+    sections = []
+    start = 0
+    for match in SECTION_BREAK.finditer(text):
+        sections.append(text[start:match.end()])
+        start = match.end()
+    sections.append(text[start:])
+
+    chunks = []
+    current = []
+    current_tokens = 0
+    stack = list(reversed(sections))
+    while stack:
+        section = stack.pop()
+        tokens = count_tokens(section)
+        # A single character over budget can't be split any further
+        if tokens > max_tokens and len(section) > 1:
+            stack.extend(reversed(_split_oversized(section, max_tokens)))
+            continue
+        if current and current_tokens + tokens > max_tokens:
+            chunks.append("".join(current))
+            current, current_tokens = [], 0
+        current.append(section)
+        current_tokens += tokens
+    if current:
+        chunks.append("".join(current))
+    return chunks
+
+
+def _normalize_title(title):
+    return re.sub(r"[^a-z0-9]+", " ", str(title).lower()).strip()
+
+
+def _date_field(item):
+    return "date" if "date" in item else "due_date"
+
+
+def _is_missing(value):
+    return value in (None, "", "N/A")
+
+
+def merge_items(items):
+    """Deduplicate items by title and date, filling gaps from later duplicates.
+
+    An item with the same title as a kept one is a duplicate if the dates match
+    or either date is missing. The first occurrence keeps its position.
+    """
+    merged = []
+    by_title = {}
+    for item in items:
+        if not isinstance(item, dict):
+            continue
+        field = _date_field(item)
+        match = None
+        for kept in by_title.get(_normalize_title(item.get("title", "")), []):
+            kept_date = kept.get(field)
+            if kept_date == item.get(field) or _is_missing(kept_date) or _is_missing(item.get(field)):
+                match = kept
+                break
+
+        if match is None:
+            kept = dict(item)
+            merged.append(kept)
+            by_title.setdefault(_normalize_title(item.get("title", "")), []).append(kept)
+            continue
+        for key, value in item.items():
+            if _is_missing(match.get(key)) and not _is_missing(value):
+                match[key] = value
+    return merged
+
+
+def merge_schedules(entries):
+    merged = []
+    seen = set()
+    for entry in entries:
+        if not isinstance(entry, dict):
+            continue
+        key = (entry.get("name"), tuple(entry.get("days", [])), entry.get("time"))
+        if key not in seen:
+            seen.add(key)
+            merged.append(entry)
+    return merged
+
+
+def merge_results(results):
+    """Merge parsed per-chunk results, in chunk order, into one result."""
+    lists = {}
+    # Single objects such as the term: the first chunk that filled every field wins
+    objects = {}
+    for result in results:
+        for key, value in result.items():
+            if isinstance(value, list):
+                lists.setdefault(key, []).extend(value)
+            elif isinstance(value, dict):
+                kept = objects.get(key)
+                if kept is None or (any(map(_is_missing, kept.values()))
+                                    and not any(map(_is_missing, value.values()))):
+                    objects[key] = value
+
+    merged = dict(objects)
+    for key, values in lists.items():
+        if key == "schedule":
+            merged[key] = merge_schedules(values)
+            continue
+        items = merge_items(values)
+        if key in SINGLE_ENTRY_KEYS:
+            # Prefer the first entry that found a due date
+            dated = [item for item in items if not _is_missing(item.get(_date_field(item)))]
+            items = (dated or items)[:1]
+        merged[key] = items
+    return merged
+
+
+def extract_chunked(extract, text, max_tokens=CHUNK_TOKENS, jobs=CHUNK_JOBS):
+    """Run `extract(chunk)` on every chunk of `text` concurrently and merge the parsed results.
+
+    `extract` returns the parsed dict for one chunk, errors it raises are passed on.
+    """
+    chunks = split_text(text, max_tokens)
+    with ThreadPoolExecutor(max_workers=min(jobs, len(chunks))) as pool:
+        return merge_results(list(pool.map(extract, chunks)))
@@ -0,0 +1,267 @@
+"""Non-interactive pipeline commands for scripting and cron jobs.
+
+Usage:
+    python cli.py [--trace trace.jsonl] [--metrics metrics.prom] COMMAND ...
+    python cli.py process  ROOT [--jobs N] [--full]
+    python cli.py match    ROOT [--jobs N]
+    python cli.py merge    ROOT [--jobs N] [--output syllabus_matched.json] [--full]
+    python cli.py allocate ROOT [--jobs N] [--strategy edf] [--blocks generated_blocks.json] [--busy FILE.ics]
+    python cli.py export   ROOT [--jobs N] [--calendar course_calendar.ics]
+    python cli.py db       ROOT [--jobs N] [--export]
+    python cli.py free     ROOT [--start YYYY-MM-DD] [--days 7] [--min-minutes 60] [--busy FILE.ics]
+
+ROOT is a student directory (holding Course*/Syllabus, Course*/Assignments) or
+any directory above several of them. `process` and `match` fan out over course
+directories, the other commands over student directories. Relative output
+paths are resolved inside each student directory. Events in the .ics files of
+a student's busy/ folder, and in any --busy files, are kept free of study blocks.
+"""
+import argparse
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime, timedelta
+
+import instrumentation
+import main as pipeline
+from block_generator import SCHEDULING_ORDERS, STUDY_WINDOWS
+from occurrence_index import load_term
+from sqlite_store import STORE_NAME, CourseStore
+
+MATCHED_NAME = "syllabus_matched.json"
+BLOCKS_NAME = "generated_blocks.json"
+CALENDAR_NAME = "course_calendar.ics"
+
+
+def find_course_dirs(root):
+    """Every directory under root that holds a Syllabus or Assignments folder."""
+    course_dirs = []
+    for current, dirs, _ in os.walk(root):
+        if "Syllabus" in dirs or "Assignments" in dirs:
+            course_dirs.append(current)
+            dirs[:] = []  # courses don't nest
+        else:
+            dirs.sort()
+    return sorted(course_dirs)
+
+
+def find_student_dirs(root):
+    """Directories whose children are course directories."""
+    return sorted({os.path.dirname(course_dir) for course_dir in find_course_dirs(root)})
+
+
+def resolve(student_dir, path):
+    return path if os.path.isabs(path) else os.path.join(student_dir, path)
+
+
+def process_course(course_dir, timeout, retries, full):
+    return pipeline.process_directory(course_dir, timeout=timeout, retries=retries, use_manifest=not full)
+
+
+def match_course(course_dir):
+    # Confident matches only, files the matcher is unsure about are left for the menu
+    if os.path.isdir(os.path.join(course_dir, "Syllabus", "parsed")):
+        pipeline.match_assignments_interactive(course_dir, interactive=False)
+
+
+def merge_student(student_dir, output, full):
+    pipeline.merge_json(student_dir, resolve(student_dir, output), use_manifest=not full)
+
+
+# .ics files with a student's other commitments: the busy/ folder plus --busy files
+def busy_calendars(student_dir, extra):
+    from ics_import import find_busy_calendars
+
+    return find_busy_calendars(student_dir) + [resolve(student_dir, path) for path in extra or ()]
+
+
+def allocate_student(student_dir, matched, blocks, strategy, busy):
+    matched_path = resolve(student_dir, matched)
+    blocks_path = resolve(student_dir, blocks)
+    course_data = pipeline.load_course_data(matched_path)
+
+    # Same steps as menu option 5, without the export
+    blocks_json = pipeline.allocate_study_blocks(course_data, blocks_path, strategy=strategy,
+                                                 term=load_term(matched_path),
+                                                 busy_calendars=busy_calendars(student_dir, busy))
+    with open(blocks_path, "w", encoding="utf-8") as f:
+        json.dump(blocks_json, f, indent=4, ensure_ascii=False)
+    print(f"Saved study blocks to {blocks_path}")
+    pipeline.merge_blocks_into_course_json(matched_path, blocks_path)
+
+
+def store_student(student_dir, matched, export):
+    matched_path = resolve(student_dir, matched)
+    store_path = os.path.join(student_dir, STORE_NAME)
+    if export and not os.path.exists(store_path):
+        raise FileNotFoundError(f"no {STORE_NAME} to export")
+    with CourseStore(store_path) as store:
+        if export:
+            with open(matched_path, "w", encoding="utf-8") as f:
+                json.dump(store.export_course_data(), f, indent=4, ensure_ascii=False)
+            print(f"Exported {store_path} to {matched_path}")
+        else:
+            with open(matched_path, "r", encoding="utf-8") as f:
+                store.import_course_data(json.load(f))
+            print(f"Imported {matched_path} into {store_path}")
+
+
+def export_student(student_dir, matched, calendar):
+    from calendar_generator import export_json_to_ics
+
+    matched_path = resolve(student_dir, matched)
+    data = pipeline.load_course_data(matched_path)
+    export_json_to_ics(data, resolve(student_dir, calendar), term=load_term(matched_path))
+
+
+# "09:00–11:00"; ends on a later day are marked, "22:00–02:00+1", and midnight is "24:00"
+def format_slot(start, end):
+    days = (end.date() - start.date()).days
+    if days == 1 and end.time() == datetime.min.time():
+        return f"{start:%H:%M}–24:00"
+    return f"{start:%H:%M}–{end:%H:%M}" + (f"+{days}" if days else "")
+
+
+def free_student(student_dir, matched, start, days, min_minutes, busy):
+    from freebusy import FreeBusy
+    from ics_import import load_busy
+
+    matched_path = resolve(student_dir, matched)
+    window_start = datetime.combine(start, datetime.min.time())
+    window_end = window_start + timedelta(days=days)
+    index = FreeBusy(pipeline.load_course_data(matched_path), load_term(matched_path),
+                     load_busy(busy_calendars(student_dir, busy), window_start, window_end))
+    load = index.load_per_day(start, start + timedelta(days=days - 1))
+
+    # Free time during study hours, listed under the day it starts
+    slots = index.free_slots(window_start, window_end, timedelta(minutes=min_minutes), STUDY_WINDOWS)
+    lines = [f"{student_dir}:"]
+    for day, hours in load.items():
+        free = ", ".join(format_slot(slot_start, slot_end) for slot_start, slot_end in slots
+                         if slot_start.date() == day)
+        lines.append(f"  {day:%a %Y-%m-%d}  {hours:4.1f} h busy  free {free or '-'}")
+    print("\n".join(lines))
+
+
+# Run fn(directory, *args) for every directory, in a process pool when jobs > 1.
+# Returns the number of directories that failed.
+def run_all(fn, directories, jobs, *args):
+    failed = 0
+    if jobs <= 1 or len(directories) <= 1:
+        results = []
+        for directory in directories:
+            try:
+                results.append((directory, fn(directory, *args), None))
+            except Exception as e:
+                results.append((directory, None, e))
+    else:
+        with ProcessPoolExecutor(max_workers=min(jobs, len(directories))) as pool:
+            futures = [(directory, pool.submit(fn, directory, *args)) for directory in directories]
+            results = []
+            for directory, future in futures:
+                try:
+                    results.append((directory, future.result(), None))
+                except Exception as e:
+                    results.append((directory, None, e))
+
+    for directory, result, error in results:
+        if error is not None:
+            print(f"⚠️ {directory}: {error}")
+            failed += 1
+        elif isinstance(result, dict) and result.get("failed"):
+            print(f"⚠️ {directory}: {result['failed']} PDFs failed")
+            failed += 1
+    return failed
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Course calendar pipeline",
+                                     epilog="Run without arguments for the interactive menu.")
+    parser.add_argument("--trace", help="append timing spans to this JSONL file")
+    parser.add_argument("--metrics", help="write Prometheus text metrics to this file on exit")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    def add_command(name, help_text):
+        command = commands.add_parser(name, help=help_text)
+        command.add_argument("root", help="student directory, or a directory of student directories")
+        command.add_argument("--jobs", "-j", type=int, default=1, help="directories handled in parallel")
+        return command
+
+    process = add_command("process", "extract syllabus and assignment PDFs into parsed JSON")
+    process.add_argument("--timeout", type=float, default=pipeline.LLM_TIMEOUT,
+                         help="seconds per LLM request")
+    process.add_argument("--retries", type=int, default=pipeline.LLM_RETRIES,
+                         help="retries on rate limits and timeouts")
+    process.add_argument("--full", action="store_true", help="reprocess PDFs unchanged since the last run")
+
+    add_command("match", "match parsed assignment PDFs to syllabus entries automatically")
+
+    merge = add_command("merge", "merge each course's parsed syllabus into one file")
+    merge.add_argument("--output", default=MATCHED_NAME)
+    merge.add_argument("--full", action="store_true", help="rebuild every course, not just changed ones")
+
+    allocate = add_command("allocate", "schedule study blocks and merge them into the course file")
+    allocate.add_argument("--matched", default=MATCHED_NAME)
+    allocate.add_argument("--blocks", default=BLOCKS_NAME)
+    allocate.add_argument("--strategy", default="edf",
+                          choices=sorted(SCHEDULING_ORDERS) + ["independent"])
+    allocate.add_argument("--busy", action="append", metavar="FILE.ics",
+                          help="calendar whose events blocks must avoid, besides busy/*.ics (repeatable)")
+
+    db = add_command("db", "move the course file into a SQLite store used from then on, or back")
+    db.add_argument("--matched", default=MATCHED_NAME)
+    db.add_argument("--export", action="store_true", help="write the store back to the JSON course file")
+
+    free = add_command("free", "show when each student is free, from classes, tests and study blocks")
+    free.add_argument("--matched", default=MATCHED_NAME)
+    free.add_argument("--start", type=date.fromisoformat, default=date.today(), help="first day (YYYY-MM-DD)")
+    free.add_argument("--days", type=int, default=7)
+    free.add_argument("--min-minutes", type=int, default=60, help="shortest free slot to list")
+    free.add_argument("--busy", action="append", metavar="FILE.ics",
+                      help="calendar with more busy time, besides busy/*.ics (repeatable)")
+
+    export = add_command("export", "export the course file to .ics")
+    export.add_argument("--matched", default=MATCHED_NAME)
+    export.add_argument("--calendar", default=CALENDAR_NAME)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if not os.path.isdir(args.root):
+        print(f"No such directory: {args.root}")
+        return 2
+    # Also exports COURSE_TRACE, which worker processes read when they import instrumentation
+    instrumentation.enable(args.trace, args.metrics)
+
+    if args.command == "process":
+        directories = find_course_dirs(args.root)
+        failed = run_all(process_course, directories, args.jobs, args.timeout, args.retries, args.full)
+    elif args.command == "match":
+        directories = find_course_dirs(args.root)
+        failed = run_all(match_course, directories, args.jobs)
+    else:
+        directories = find_student_dirs(args.root)
+        if args.command == "merge":
+            failed = run_all(merge_student, directories, args.jobs, args.output, args.full)
+        elif args.command == "db":
+            failed = run_all(store_student, directories, args.jobs, args.matched, args.export)
+        elif args.command == "free":
+            failed = run_all(free_student, directories, args.jobs,
+                             args.matched, args.start, args.days, args.min_minutes, args.busy)
+        elif args.command == "allocate":
+            failed = run_all(allocate_student, directories, args.jobs,
+                             args.matched, args.blocks, args.strategy, args.busy)
+        else:
+            failed = run_all(export_student, directories, args.jobs, args.matched, args.calendar)
+
+    if not directories:
+        print(f"No course directories found under {args.root}")
+        return 1
+    print(f"\n{args.command}: {len(directories) - failed}/{len(directories)} directories done")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
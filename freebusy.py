@@ -0,0 +1,166 @@
+import bisect
+from datetime import datetime, time, timedelta
+
+from calendar_generator import TEST_TIME
+from models import StudyBlock, iter_records, to_date, to_time
+from occurrence_index import OccurrenceIndex, split_days
+
+# Free/busy lookups over one student's merged course data, without scheduling
+# or exporting anything. Class meetings (from the term's occurrence index),
+# tests, study blocks and busy time from other calendars are kept as one list
+# of (start, end, kind, title) intervals sorted by start; queries bisect into
+# it and only look at the intervals that can overlap. Intervals are split at
+# midnight as in OccurrenceIndex, so one multi-day event doesn't widen every
+# lookup. Assignment due dates are deadlines, not busy time.
+#
+# Study blocks can be added and removed one at a time, so a front end can keep
+# one index per student while blocks are moved around.
+
+# Tests take this long, as in the exported calendar
+TEST_DURATION = timedelta(hours=2)
+
+
+def block_interval(block):
+    """(start, end, "study", title) of a study block dict or StudyBlock. Raises ValueError if unreadable."""
+    if isinstance(block, dict):
+        block = StudyBlock.from_dict(block)
+    start = datetime.combine(to_date(block.date), to_time(block.time, None))
+    hours = 1 if block.duration is None else block.duration
+    return start, start + timedelta(hours=hours), "study", block.title or ""
+
+
+def test_interval(test):
+    start = datetime.combine(to_date(test.date), to_time(test.time, TEST_TIME))
+    return start, start + TEST_DURATION, "test", test.title or ""
+
+
+class FreeBusy:
+    """Busy time of one student.
+
+    `data` is the merged course data (dict or CourseData), `busy` other
+    (start, end) datetimes such as ics_import.load_busy gives.
+    """
+
+    def __init__(self, data, term=None, busy=()):
+        occurrences = OccurrenceIndex(data, term)
+        names = [session.name or "" for session in iter_records(data, "schedule")]
+        # Class meetings are already split at midnight
+        intervals = [(start, end, "class", names[position]) for start, end, position in occurrences.meetings]
+        for start, end in busy:
+            intervals.extend(split_interval(start, end, "busy", ""))
+        for section, to_interval in (("tests", test_interval), ("study_blocks", block_interval)):
+            for record in iter_records(data, section):
+                try:
+                    intervals.extend(split_interval(*to_interval(record)))
+                except (TypeError, ValueError):
+                    continue  # no usable date or time
+        intervals.sort()
+        self.intervals = intervals
+        self.starts = [interval[0] for interval in intervals]
+        self.longest = max((end - start for start, end, _, _ in intervals), default=timedelta(0))
+
+    def __len__(self):
+        return len(self.intervals)
+
+    def add(self, start, end, kind, title=""):
+        for piece in split_interval(start, end, kind, title):
+            i = bisect.bisect_right(self.intervals, piece)
+            self.intervals.insert(i, piece)
+            self.starts.insert(i, piece[0])
+            self.longest = max(self.longest, piece[1] - piece[0])
+        return start, end, kind, title
+
+    def remove(self, interval):
+        """Drop one copy of `interval` (every piece of it). Returns False if it wasn't there."""
+        positions = []
+        for piece in split_interval(*interval):
+            i = bisect.bisect_left(self.intervals, piece)
+            if i == len(self.intervals) or self.intervals[i] != piece:
+                return False
+            positions.append(i)
+        # Pieces sort in order, so deleting from the last keeps the others in place
+        for i in reversed(positions):
+            del self.intervals[i]
+            del self.starts[i]
+        return True
+
+    def add_block(self, block):
+        return self.add(*block_interval(block))
+
+    def remove_block(self, block):
+        return self.remove(block_interval(block))
+
+    def between(self, start, end):
+        """Intervals overlapping [start, end), by start time; ones spanning midnight come in pieces."""
+        lo = bisect.bisect_left(self.starts, start - self.longest)
+        hi = bisect.bisect_left(self.starts, end)
+        return [interval for interval in self.intervals[lo:hi] if interval[1] > start]
+
+    def busy_at(self, dt):
+        """Intervals covering the moment `dt`; empty when the student is free."""
+        lo = bisect.bisect_left(self.starts, dt - self.longest)
+        hi = bisect.bisect_right(self.starts, dt)
+        return [interval for interval in self.intervals[lo:hi] if interval[1] > dt]
+
+    def free_slots(self, start, end, min_duration=timedelta(0), hours=None):
+        """(start, end) gaps in [start, end) at least `min_duration` long.
+
+        `hours` limits the search to [start hour, end hour) windows of each day,
+        e.g. block_generator.STUDY_WINDOWS to leave out the night.
+        """
+        gaps = []
+        cursor = start
+        for busy_start, busy_end, _, _ in self.between(start, end):
+            if busy_start > cursor:
+                gaps.append((cursor, busy_start))
+            cursor = max(cursor, busy_end)
+        if cursor < end:
+            gaps.append((cursor, end))
+        if hours is not None:
+            gaps = [clipped for gap in gaps for clipped in clip_to_hours(*gap, hours)]
+        return [(slot_start, slot_end) for slot_start, slot_end in gaps if slot_end - slot_start >= min_duration]
+
+    def load_per_day(self, first_day, last_day):
+        """{date: busy hours} for every day from first_day to last_day, overlaps counted once."""
+        load = {}
+        day = first_day
+        while day <= last_day:
+            day_start = datetime.combine(day, time())
+            day_end = day_start + timedelta(days=1)
+            busy = timedelta(0)
+            cursor = day_start
+            for busy_start, busy_end, _, _ in self.between(day_start, day_end):
+                busy_start = max(busy_start, cursor)
+                busy_end = min(busy_end, day_end)
+                if busy_end > busy_start:
+                    busy += busy_end - busy_start
+                    cursor = busy_end
+            load[day] = busy / timedelta(hours=1)
+            day += timedelta(days=1)
+        return load
+
+
+# (start, end, kind, title) pieces of an interval cut at every midnight it spans
+def split_interval(start, end, kind, title):
+    return [(piece_start, piece_end, kind, title) for piece_start, piece_end in split_days(start, end)]
+
+
+# Parts of [start, end) that fall in the daily [start hour, end hour) windows,
+# which are sorted and don't overlap
+def clip_to_hours(start, end, hours):
+    parts = []
+    day = start.date()
+    while day <= end.date():
+        midnight = datetime.combine(day, time())
+        for first_hour, last_hour in hours:
+            part_start = max(start, midnight + timedelta(hours=first_hour))
+            part_end = min(end, midnight + timedelta(hours=last_hour))
+            if part_end <= part_start:
+                continue
+            # Windows that touch at midnight give one slot
+            if parts and parts[-1][1] == part_start:
+                parts[-1] = (parts[-1][0], part_end)
+            else:
+                parts.append((part_start, part_end))
+        day += timedelta(days=1)
+    return parts
@@ -0,0 +1,286 @@
+import glob
+import hashlib
+import os
+import re
+from datetime import datetime, time, timedelta
+
+import pytz
+
+from calendar_generator import TIMEZONE
+
+# Busy time from other calendars (jobs, labs, personal events) for the study
+# block scheduler. .ics files are read line by line and only the VEVENT
+# properties that place an event in time are kept, so a calendar with years of
+# history loads without building a component tree. Recurring events are
+# expanded with dateutil only inside the scheduling horizon. Everything comes
+# back as naive (start, end) datetimes in the zone calendars are exported in.
+#
+# Cancelled events, events marked free (TRANSP:TRANSPARENT) and all-day events
+# are not busy time; all-day entries are mostly birthdays and reminders.
+#
+# Calendars are picked up from the busy/ folder next to syllabus_matched.json.
+BUSY_DIR = "busy"
+
+# VEVENT properties that place an event in time, other lines are skipped
+KEPT_PROPERTIES = {"UID", "DTSTART", "DTEND", "DURATION", "RRULE", "RDATE", "EXDATE",
+                   "RECURRENCE-ID", "STATUS", "TRANSP"}
+DURATION_RE = re.compile(r"([+-])?P(?:(\d+)W)?(?:(\d+)D)?(?:T(?:(\d+)H)?(?:(\d+)M)?(?:(\d+)S)?)?$")
+# Rules that repeat every INTERVAL days/weeks can have their start moved forward by whole periods
+PERIOD_DAYS = {"DAILY": 1, "WEEKLY": 7}
+
+LOCAL = pytz.timezone(TIMEZONE)
+_zones = {}
+
+
+def find_busy_calendars(directory):
+    """.ics files in the busy/ folder of a student directory."""
+    return sorted(glob.glob(os.path.join(directory, BUSY_DIR, "*.ics")))
+
+
+# Content lines with folded continuation lines joined back on
+def unfold(lines):
+    current = None
+    for line in lines:
+        line = line.rstrip("\r\n")
+        if line[:1] in (" ", "\t"):
+            if current is not None:
+                current += line[1:]
+            continue
+        if current is not None:
+            yield current
+        current = line
+    if current is not None:
+        yield current
+
+
+# (NAME, {PARAM: value}, value) of a content line
+def split_property(line):
+    head, _, value = line.partition(":")
+    name, *params = head.split(";")
+    return name.upper(), dict(param.split("=", 1) for param in params if "=" in param), value
+
+
+def get_zone(tzid):
+    # Unknown zone names (e.g. Windows ones) are read as local time
+    zone = _zones.get(tzid)
+    if zone is None:
+        try:
+            zone = pytz.timezone(tzid.strip('"'))
+        except pytz.UnknownTimeZoneError:
+            zone = LOCAL
+        _zones[tzid] = zone
+    return zone
+
+
+# YYYYMMDDTHHMMSS without strptime, which is the slow part of reading a big calendar
+def parse_stamp(value):
+    if len(value) != 15 or value[8] != "T":
+        raise ValueError(f"bad DATE-TIME {value!r}")
+    return datetime(int(value[:4]), int(value[4:6]), int(value[6:8]),
+                     int(value[9:11]), int(value[11:13]), int(value[13:15]))
+
+
+def parse_datetime(params, value):
+    """(wall clock datetime, zone) of a DATE-TIME value, or (date, None) for a DATE."""
+    value = value.strip()
+    if params.get("VALUE") == "DATE" or len(value) == 8:
+        return datetime.strptime(value, "%Y%m%d").date(), None
+    if value.endswith("Z"):
+        return parse_stamp(value[:-1]), pytz.utc
+    zone = get_zone(params["TZID"]) if "TZID" in params else LOCAL
+    return parse_stamp(value), zone
+
+
+def to_local(wall, zone):
+    if zone is LOCAL:
+        return wall
+    return zone.localize(wall).astimezone(LOCAL).replace(tzinfo=None)
+
+
+def from_local(wall, zone):
+    if zone is LOCAL:
+        return wall
+    return LOCAL.localize(wall).astimezone(zone).replace(tzinfo=None)
+
+
+def parse_duration(value):
+    match = DURATION_RE.match(value.strip())
+    if match is None:
+        raise ValueError(f"bad DURATION {value!r}")
+    sign, weeks, days, hours, minutes, seconds = match.groups()
+    duration = timedelta(weeks=int(weeks or 0), days=int(days or 0), hours=int(hours or 0),
+                         minutes=int(minutes or 0), seconds=int(seconds or 0))
+    return -duration if sign == "-" else duration
+
+
+# Local start times listed in EXDATE/RDATE/RECURRENCE-ID properties
+def parse_datetimes(entries):
+    starts = []
+    for params, value in entries:
+        for part in value.split(","):
+            wall, zone = parse_datetime(params, part)
+            if zone is not None:
+                starts.append(to_local(wall, zone))
+    return starts
+
+
+# Wall-clock starts of a recurring event in its own zone between lo and hi
+def expand_rule(rule, wall_start, zone, lo, hi):
+    from dateutil.rrule import rrulestr
+
+    parts = dict(part.split("=", 1) for part in rule.split(";") if "=" in part)
+    until = parts.get("UNTIL")
+    if until:
+        # Rules are expanded on naive wall-clock times, so UNTIL has to be one too
+        if until.endswith("Z"):
+            until_wall = from_local(to_local(parse_stamp(until[:-1]), pytz.utc), zone)
+        elif len(until) == 8:
+            until_wall = datetime.combine(datetime.strptime(until, "%Y%m%d").date(), time.max)
+        else:
+            until_wall = parse_stamp(until)
+        if until_wall < lo:
+            return []
+        parts["UNTIL"] = until_wall.strftime("%Y%m%dT%H%M%S")
+
+    # Skip whole periods of history instead of stepping through them
+    period = PERIOD_DAYS.get(parts.get("FREQ"))
+    if period and "COUNT" not in parts and wall_start < lo:
+        step = timedelta(days=period * int(parts.get("INTERVAL", 1)))
+        wall_start += (lo - wall_start) // step * step
+
+    rule = rrulestr(";".join(f"{key}={value}" for key, value in parts.items()), dtstart=wall_start)
+    return rule.between(lo, hi, inc=True)
+
+
+# Value of the first `name` property of an event, "" if it has none
+def first_value(props, name):
+    return props[name][0][1].strip() if name in props else ""
+
+
+def event_intervals(props, start, end):
+    """Local (start, end) busy intervals of one VEVENT overlapping [start, end)."""
+    if first_value(props, "STATUS").upper() == "CANCELLED" or first_value(props, "TRANSP").upper() == "TRANSPARENT":
+        return []
+    wall_start, zone = parse_datetime(*props["DTSTART"][0])
+    if zone is None:
+        return []  # all-day
+
+    if "DTEND" in props:
+        wall_end, end_zone = parse_datetime(*props["DTEND"][0])
+        if end_zone is None:
+            return []
+        duration = to_local(wall_end, end_zone) - to_local(wall_start, zone)
+    elif "DURATION" in props:
+        duration = parse_duration(first_value(props, "DURATION"))
+    else:
+        return []
+    if duration <= timedelta(0):
+        return []
+
+    if "RRULE" not in props and "RDATE" not in props:
+        local_start = to_local(wall_start, zone)
+        if local_start < end and local_start + duration > start:
+            return [(local_start, local_start + duration)]
+        return []
+
+    # A day of slack on both sides covers the zone offset
+    lo = from_local(start - duration, zone) - timedelta(days=1)
+    hi = from_local(end, zone) + timedelta(days=1)
+    starts = set()
+    if "RRULE" in props:
+        rule = first_value(props, "RRULE")
+        starts.update(to_local(wall, zone) for wall in expand_rule(rule, wall_start, zone, lo, hi))
+    else:
+        starts.add(to_local(wall_start, zone))
+    starts.update(parse_datetimes(props.get("RDATE", [])))
+    starts.difference_update(parse_datetimes(props.get("EXDATE", [])))
+    return [(local_start, local_start + duration) for local_start in sorted(starts)
+            if local_start < end and local_start + duration > start]
+
+
+# True when a one-off event certainly ends before lo_key or starts after
+# hi_key (YYYYMMDD strings), judged from the raw values without parsing them
+def outside_horizon(props, lo_key, hi_key):
+    if "RRULE" in props or "RDATE" in props:
+        return False
+    if first_value(props, "DTSTART")[:8] > hi_key:
+        return True
+    return "DTEND" in props and first_value(props, "DTEND")[:8] < lo_key
+
+
+def read_busy(path, start, end):
+    """(start, end) busy intervals of the .ics file at `path` overlapping [start, end), sorted."""
+    # Two days of slack for events stored in other zones
+    lo_key = (start - timedelta(days=2)).strftime("%Y%m%d")
+    hi_key = (end + timedelta(days=2)).strftime("%Y%m%d")
+    intervals = []
+    # Recurring events: uid -> intervals, and instances moved by a RECURRENCE-ID override
+    series = {}
+    moved = {}
+    skipped = 0
+    props = None
+    nested = 0
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        for line in unfold(f):
+            if props is None:
+                if line == "BEGIN:VEVENT":
+                    props = {}
+                continue
+            # Components inside the event (VALARM) have their own DURATION etc.
+            if line.startswith("BEGIN:"):
+                nested += 1
+                continue
+            if nested:
+                if line.startswith("END:"):
+                    nested -= 1
+                continue
+            if line != "END:VEVENT":
+                name = line.split(":", 1)[0].split(";", 1)[0].upper()
+                if name in KEPT_PROPERTIES:
+                    name, params, value = split_property(line)
+                    props.setdefault(name, []).append((params, value))
+                continue
+
+            event, props = props, None
+            if "DTSTART" not in event:
+                continue
+            try:
+                uid = first_value(event, "UID")
+                override = "RECURRENCE-ID" in event and uid
+                # The instance an override replaces is dropped even when the
+                # override moves it out of the horizon
+                if override:
+                    moved.setdefault(uid, set()).update(parse_datetimes(event["RECURRENCE-ID"]))
+                if outside_horizon(event, lo_key, hi_key):
+                    continue
+                found = event_intervals(event, start, end)
+                if override:
+                    intervals.extend(found)
+                elif "RRULE" in event and uid:
+                    series.setdefault(uid, []).extend(found)
+                else:
+                    intervals.extend(found)
+            except (KeyError, ValueError, TypeError):
+                skipped += 1
+
+    for uid, found in series.items():
+        overridden = moved.get(uid, ())
+        intervals.extend(interval for interval in found if interval[0] not in overridden)
+    if skipped:
+        print(f"⚠️ Skipped {skipped} unreadable events in {path}")
+    intervals.sort()
+    return intervals
+
+
+def load_busy(paths, start, end):
+    """Busy intervals of several .ics files overlapping [start, end), sorted."""
+    intervals = []
+    for path in paths:
+        intervals.extend(read_busy(path, start, end))
+    intervals.sort()
+    return intervals
+
+
+def busy_fingerprint(intervals):
+    """Short hash of busy intervals, to tell whether a saved allocation used the same busy time."""
+    return hashlib.sha256(repr(intervals).encode("utf-8")).hexdigest()[:16]
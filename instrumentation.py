@@ -0,0 +1,218 @@
+import atexit
+import json
+import os
+import threading
+import time
+
+# Lightweight tracing for the pipeline stages. Off by default: span() then
+# hands back one shared no-op object, so instrumented code costs a function
+# call and an attribute check. When enabled (enable() or the COURSE_TRACE /
+# COURSE_METRICS environment variables), every span is appended to a JSONL
+# trace file and rolled up into counters that are written as Prometheus text
+# when the process exits.
+#
+# Numeric span attributes (pages, chars, prompt_tokens, blocks, ...) are
+# summed into `course_pipeline_<attr>_total{span="..."}` counters. enable()
+# puts the trace path in COURSE_TRACE, so worker processes pick it up on
+# import whichever way they are started (fork, or spawn on macOS/Windows)
+# and append their spans to the same file. The metrics are totalled from that
+# file and so include the workers; with --metrics alone the spans go to a
+# scratch trace next to the metrics file, deleted once the metrics are
+# written. COURSE_METRICS is cleared for the workers, only the process that
+# called enable() writes the metrics file.
+TRACE_ENV = "COURSE_TRACE"
+METRICS_ENV = "COURSE_METRICS"
+METRIC_PREFIX = "course_pipeline_"
+# Suffix of the scratch trace used when only metrics are asked for
+SCRATCH_TRACE_SUFFIX = ".trace.jsonl"
+
+# USD per 1M tokens (prompt, completion)
+MODEL_PRICES = {
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4o": (2.50, 10.00),
+}
+
+_state = None
+_lock = threading.Lock()
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **attrs):
+        pass
+
+
+NULL_SPAN = _NullSpan()
+
+
+class Span:
+    __slots__ = ("name", "attrs", "state", "started", "clock")
+
+    def __init__(self, name, attrs, state):
+        self.name = name
+        self.attrs = attrs
+        self.state = state
+
+    def __enter__(self):
+        self.started = time.time()
+        self.clock = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        duration = time.perf_counter() - self.clock
+        record(self.state, self, self.started, duration, exc_type.__name__ if exc_type else None)
+        return False
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+
+def enable(trace_path=None, metrics_path=None):
+    """Start recording spans to trace_path (JSONL) and counters to metrics_path."""
+    global _state
+    if not trace_path and not metrics_path:
+        return
+    first = _state is None
+    scratch = not trace_path
+    if scratch:
+        trace_path = metrics_path + SCRATCH_TRACE_SUFFIX
+        if os.path.exists(trace_path):
+            os.remove(trace_path)  # left behind by a run that was killed
+    # Spans already in the trace file belong to earlier runs
+    offset = os.path.getsize(trace_path) if os.path.exists(trace_path) else 0
+    _state = {"trace_path": trace_path, "metrics_path": metrics_path, "pid": os.getpid(),
+              "trace_offset": offset, "scratch": scratch}
+    # Read back by worker processes when they import this module
+    os.environ[TRACE_ENV] = trace_path
+    os.environ.pop(METRICS_ENV, None)
+    if first:
+        atexit.register(write_metrics)
+
+
+def disable():
+    global _state
+    if _state is not None:
+        os.environ.pop(TRACE_ENV, None)
+    _state = None
+
+
+def enabled():
+    return _state is not None
+
+
+# Fields every trace entry has, the remaining numeric ones are span attributes
+ENTRY_FIELDS = {"span", "start", "duration_ms", "pid", "thread", "error"}
+
+
+def _add(counters, name, labels, value):
+    key = (name, labels)
+    counters[key] = counters.get(key, 0) + value
+
+
+def count_entry(counters, entry):
+    labels = (("span", entry["span"]),)
+    _add(counters, "span_calls_total", labels, 1)
+    _add(counters, "span_seconds_total", labels, entry["duration_ms"] / 1000)
+    if "error" in entry:
+        _add(counters, "span_errors_total", labels, 1)
+    for attr, value in entry.items():
+        if attr not in ENTRY_FIELDS and isinstance(value, (int, float)) and not isinstance(value, bool):
+            _add(counters, f"{attr}_total", labels, value)
+
+
+def span(name, **attrs):
+    """Context manager timing a block of work; `as` gives an object whose set(**attrs) adds attributes."""
+    state = _state
+    if state is None:
+        return NULL_SPAN
+    return Span(name, attrs, state)
+
+
+def record(state, current, started, duration, error):
+    entry = {"span": current.name, "start": round(started, 6), "duration_ms": round(duration * 1000, 3),
+             "pid": os.getpid(), "thread": threading.current_thread().name, **current.attrs}
+    if error:
+        entry["error"] = error
+    with _lock:
+        with open(state["trace_path"], "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry, default=str) + "\n")
+
+
+def read_trace(path, offset=0):
+    """Trace entries written to `path` after byte `offset`."""
+    entries = []
+    with open(path, "r", encoding="utf-8") as f:
+        f.seek(offset)
+        for line in f:
+            try:
+                entries.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue  # a worker killed mid-write
+    return entries
+
+
+def llm_cost(model, prompt_tokens, completion_tokens, discount=1.0):
+    """Estimated USD cost of a request, None for models without a known price."""
+    # Responses name dated snapshots such as gpt-4o-mini-2024-07-18
+    name = max((name for name in MODEL_PRICES if model.startswith(name)), key=len, default=None)
+    if name is None:
+        return None
+    prices = MODEL_PRICES[name]
+    return (prompt_tokens * prices[0] + completion_tokens * prices[1]) * discount / 1_000_000
+
+
+def llm_usage(model, response):
+    """Token counts and estimated cost of one chat completion, for an llm span."""
+    usage = getattr(response, "usage", None)
+    if usage is None:
+        return {}
+    prompt = getattr(usage, "prompt_tokens", 0) or 0
+    completion = getattr(usage, "completion_tokens", 0) or 0
+    attrs = {"model": model, "prompt_tokens": prompt, "completion_tokens": completion}
+    cost = llm_cost(model, prompt, completion)
+    if cost is not None:
+        attrs["cost_usd"] = cost
+    return attrs
+
+
+def format_metrics(counters):
+    lines = []
+    by_name = {}
+    for (name, labels), value in counters.items():
+        by_name.setdefault(name, []).append((labels, value))
+    for name in sorted(by_name):
+        metric = METRIC_PREFIX + name
+        lines.append(f"# TYPE {metric} counter")
+        for labels, value in sorted(by_name[name]):
+            label_text = ",".join(f'{key}="{value_}"' for key, value_ in labels)
+            lines.append(f"{metric}{{{label_text}}} {value!r}" if label_text else f"{metric} {value!r}")
+    return "\n".join(lines) + "\n"
+
+
+def write_metrics():
+    """Write the counters as Prometheus text exposition format, if a metrics path is set."""
+    state = _state
+    if state is None or not state["metrics_path"] or state["pid"] != os.getpid():
+        return
+    with _lock:
+        counters = {}
+        if os.path.exists(state["trace_path"]):
+            for entry in read_trace(state["trace_path"], state["trace_offset"]):
+                count_entry(counters, entry)
+        text = format_metrics(counters)
+    tmp_path = state["metrics_path"] + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp_path, state["metrics_path"])
+    if state["scratch"] and os.path.exists(state["trace_path"]):
+        os.remove(state["trace_path"])
+
+
+enable(os.environ.get(TRACE_ENV), os.environ.get(METRICS_ENV))
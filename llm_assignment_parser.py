@@ -1,16 +1,36 @@
-from openai import OpenAI
-from dotenv import load_dotenv
-import os
+from instrumentation import llm_usage, span
+from llm_client import get_client
+from llm_json import response_content, response_format
 
-# Load environment variables from API.env
-load_dotenv("API.env")
+MODEL = "gpt-4o-mini"
+# Bump whenever the prompt below changes so cached extractions are invalidated
+PROMPT_VERSION = "2"
 
-# Retrieve API key from env variable
-api_key = os.getenv("OPENAI_API_KEY")
-client = OpenAI(api_key=api_key)
+# Shape of the JSON the model must return, also used to validate responses locally
+RESPONSE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "assignment": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "title": {"type": "string"},
+                    "due_date": {"type": "string"},
+                    "due_time": {"type": "string"},
+                    "difficulty": {"type": "number"},
+                },
+                "required": ["title", "due_date", "due_time", "difficulty"],
+                "additionalProperties": False,
+            },
+        },
+    },
+    "required": ["assignment"],
+    "additionalProperties": False,
+}
 
-def extract_assignment_info(text):
-    prompt = f"""
+def build_prompt(text):
+    return f"""
     From the following assignment information, extract information.
 
     - title
@@ -40,8 +60,31 @@ def extract_assignment_info(text):
     {text}
     """
 
-    response = client.chat.completions.create(model="gpt-4o-mini",
-    messages=[{"role": "user", "content": prompt}],
-    temperature=0.2)
+def build_messages(text):
+    return [{"role": "user", "content": build_prompt(text)}]
 
-    return response.choices[0].message.content
+# One line of an OpenAI Batch API input file
+def build_batch_request(custom_id, text):
+    return {
+        "custom_id": custom_id,
+        "method": "POST",
+        "url": "/v1/chat/completions",
+        "body": {
+            "model": MODEL,
+            "messages": build_messages(text),
+            "temperature": 0.2,
+            "response_format": response_format("assignment", RESPONSE_SCHEMA),
+        },
+    }
+
+def extract_assignment_info(text, timeout=None):
+    client = get_client()
+    request_client = client.with_options(timeout=timeout) if timeout else client
+    with span("llm_request", parser="assignment", model=MODEL, chars=len(text)) as trace:
+        response = request_client.chat.completions.create(model=MODEL,
+        messages=build_messages(text),
+        temperature=0.2,
+        response_format=response_format("assignment", RESPONSE_SCHEMA))
+        trace.set(**llm_usage(MODEL, response))
+
+    return response_content(response)
@@ -0,0 +1,115 @@
+import json
+import os
+import time
+
+from instrumentation import llm_cost, span
+
+# Helpers for running extractions through the OpenAI Batch API.
+# Point OPENAI_BASE_URL at a local stand-in server to exercise the full
+# submit/poll/download cycle, or use read_results_file() on a recorded output.
+BATCH_PATH = "data/batch/batch_input.jsonl"
+POLL_INTERVAL = 60  # seconds between status checks
+FINAL_STATUSES = {"completed", "failed", "expired", "cancelled"}
+BATCH_DISCOUNT = 0.5  # batch requests are billed at half the regular price
+
+
+# Write one request per line in the Batch API input format
+def write_batch_file(requests, path=BATCH_PATH):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        for request in requests:
+            f.write(json.dumps(request, ensure_ascii=False) + "\n")
+    return path
+
+
+# Upload the input file and start a batch, returns the batch id
+def submit_batch(client, path=BATCH_PATH):
+    with open(path, "rb") as f:
+        batch_file = client.files.create(file=f, purpose="batch")
+    batch = client.batches.create(
+        input_file_id=batch_file.id,
+        endpoint="/v1/chat/completions",
+        completion_window="24h",
+    )
+    return batch.id
+
+
+# Poll until the batch reaches a final status
+def wait_for_batch(client, batch_id, poll_interval=POLL_INTERVAL):
+    while True:
+        batch = client.batches.retrieve(batch_id)
+        counts = batch.request_counts
+        if counts is not None:
+            print(f"Batch {batch_id}: {batch.status} "
+                  f"({counts.completed}/{counts.total} done, {counts.failed} failed)")
+        else:
+            print(f"Batch {batch_id}: {batch.status}")
+
+        if batch.status in FINAL_STATUSES:
+            return batch
+        time.sleep(poll_interval)
+
+
+# Download the output file of a finished batch as {custom_id: message content}
+def download_results(client, batch):
+    if batch.status != "completed" or not batch.output_file_id:
+        print(f"Batch {batch.id} finished with status {batch.status}, no results to download")
+        return {}
+    content = client.files.content(batch.output_file_id).text
+    return parse_results(content.splitlines())
+
+
+# Load a recorded batch output file as {custom_id: message content}
+def read_results_file(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return parse_results(f)
+
+
+def parse_results(lines):
+    results = {}
+    with span("llm_batch_results") as trace:
+        failed = prompt_tokens = completion_tokens = 0
+        cost = 0.0
+        for line in lines:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # A line cut short by an interrupted download; its PDF is retried directly
+                print(f"⚠️ Skipping malformed batch output line: {line[:80]}")
+                failed += 1
+                continue
+            custom_id = record.get("custom_id")
+            response = record.get("response") or {}
+            if record.get("error") or response.get("status_code") != 200:
+                print(f"Batch request {custom_id} failed: {record.get('error') or response.get('status_code')}")
+                failed += 1
+                continue
+            body = response.get("body") or {}
+            usage = body.get("usage") or {}
+            prompt = usage.get("prompt_tokens", 0)
+            completion = usage.get("completion_tokens", 0)
+            prompt_tokens += prompt
+            completion_tokens += completion
+            cost += llm_cost(body.get("model", ""), prompt, completion, BATCH_DISCOUNT) or 0.0
+            try:
+                choice = body["choices"][0]
+                content = choice["message"]["content"]
+            except (KeyError, IndexError, TypeError):
+                content = None
+            if not content:
+                # E.g. a refusal; the PDF is retried directly
+                print(f"Batch request {custom_id} returned no message content")
+                failed += 1
+                continue
+            if choice.get("finish_reason") == "length":
+                # Cut off at the output limit; the PDF is retried directly, which re-chunks it
+                print(f"Batch request {custom_id} was cut off at the output token limit")
+                failed += 1
+                continue
+            results[custom_id] = content
+        trace.set(requests=len(results), failed=failed, prompt_tokens=prompt_tokens,
+                  completion_tokens=completion_tokens, cost_usd=cost)
+    return results
@@ -0,0 +1,78 @@
+import hashlib
+import json
+import os
+
+# On-disk cache of LLM extraction results, keyed by the extracted PDF text,
+# the prompt version and the model so that unchanged PDFs never hit the API.
+CACHE_DIR = "data/.llm_cache"
+MAX_CACHE_BYTES = 50 * 1024 * 1024  # 50 MB
+
+
+# Build a content-addressed key for one extraction request
+def cache_key(text, prompt_version, model, pdf_type=""):
+    digest = hashlib.sha256()
+    for part in (pdf_type, prompt_version, model, text):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def _entry_path(key, cache_dir):
+    return os.path.join(cache_dir, key + ".json")
+
+
+# Return the cached parsed JSON for a key, or None on a miss
+def get_cached(key, cache_dir=CACHE_DIR):
+    path = _entry_path(key, cache_dir)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+
+    # Touch the entry so eviction treats it as recently used
+    try:
+        os.utime(path, None)
+    except OSError:
+        pass
+    return data
+
+
+# Store parsed JSON under a key and keep the cache under its size limit
+def store(key, data, cache_dir=CACHE_DIR, max_bytes=MAX_CACHE_BYTES):
+    os.makedirs(cache_dir, exist_ok=True)
+    path = _entry_path(key, cache_dir)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+    evict(cache_dir, max_bytes)
+
+
+# Delete least recently used entries until the cache fits in max_bytes
+def evict(cache_dir=CACHE_DIR, max_bytes=MAX_CACHE_BYTES):
+    entries = []
+    total = 0
+    for file in os.listdir(cache_dir):
+        if not file.endswith(".json"):
+            continue
+        path = os.path.join(cache_dir, file)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        entries.append((stat.st_mtime, stat.st_size, path))
+        total += stat.st_size
+
+    if total <= max_bytes:
+        return
+
+    entries.sort()
+    for _, size, path in entries:
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+            total -= size
+        except OSError:
+            pass
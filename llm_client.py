@@ -0,0 +1,46 @@
+import os
+import threading
+from contextlib import contextmanager
+
+# One OpenAI client shared by every parser, built on first use. The client owns
+# the HTTP connection pool, so all LLM calls (and the per-request copies made by
+# with_options) reuse the same keep-alive connections. Creating it lazily keeps
+# `import main` fast for menu options that never talk to the API.
+ENV_FILE = "API.env"
+# LLM requests in flight at once across every pool that sends them (PDFs
+# processed concurrently, chunks of each PDF, re-chunked cut-off responses)
+MAX_REQUESTS = 4
+
+_client = None
+_lock = threading.Lock()
+_slots = threading.BoundedSemaphore(MAX_REQUESTS)
+
+
+def get_client():
+    """Return the shared OpenAI client, creating it on the first call."""
+    global _client
+    if _client is None:
+        with _lock:
+            if _client is None:
+                # openai and dotenv are slow to import, only pay for them when needed
+                from dotenv import load_dotenv
+                from openai import OpenAI
+
+                # Load environment variables from API.env
+                load_dotenv(ENV_FILE)
+                _client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+    return _client
+
+
+def set_max_requests(limit):
+    """Change how many LLM requests may be in flight; call it before any are sent."""
+    global _slots
+    _slots = threading.BoundedSemaphore(max(1, limit))
+
+
+@contextmanager
+def request_slot():
+    """Hold one of the MAX_REQUESTS slots for the duration of an LLM request."""
+    slots = _slots
+    with slots:
+        yield
@@ -0,0 +1,164 @@
+import ast
+import json
+import re
+
+# Turning raw LLM responses into validated Python data. The parsers ask for
+# structured output, so responses are normally plain JSON; the repair steps
+# below only kick in for the odd hand-formatted response. A response cut off
+# at the output token limit is never patched up, since closing it would
+# silently drop the items it did not get to; it raises TruncatedResponseError
+# so the caller can extract the text again in smaller pieces.
+
+TRAILING_COMMA = re.compile(r",(\s*[}\]])")
+
+
+class InvalidResponseError(ValueError):
+    """Raised when an LLM response parses but does not match the expected schema."""
+
+
+class TruncatedResponseError(json.JSONDecodeError):
+    """Raised when an LLM response was cut off before the JSON was complete."""
+
+    def __init__(self, doc):
+        super().__init__("response was cut off", doc, len(doc))
+
+
+def strip_code_fence(raw_output):
+    cleaned = raw_output.strip()
+    # Handle code block wrappers like ```json
+    if cleaned.startswith("```"):
+        cleaned = cleaned.strip("`")
+        if cleaned.lower().startswith("json"):
+            cleaned = cleaned[4:]
+    return cleaned.strip()
+
+
+def _is_truncated(text):
+    # An unterminated string or unclosed bracket means the response stopped early
+    depth = 0
+    in_string = False
+    escaped = False
+    for char in text:
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char in "{[":
+            depth += 1
+        elif char in "}]" and depth:
+            depth -= 1
+    return in_string or depth > 0
+
+
+def _python_literal(text):
+    # Responses written as a Python dict use single quotes and True/False/None
+    value = ast.literal_eval(text)
+    if not isinstance(value, (dict, list)):
+        raise ValueError("not a JSON object")
+    return json.loads(json.dumps(value))
+
+
+def repair_json(text):
+    """Best-effort local repair of malformed JSON.
+
+    Raises TruncatedResponseError for a cut-off response, ValueError if nothing works.
+    """
+    start = text.find("{")
+    end = text.rfind("}")
+    candidate = text[start:end + 1] if start != -1 and end > start else text[max(start, 0):]
+    candidate = TRAILING_COMMA.sub(r"\1", candidate)
+
+    for attempt in (json.loads, _python_literal):
+        try:
+            return attempt(candidate)
+        except (ValueError, SyntaxError, MemoryError, RecursionError):
+            continue
+    if start != -1 and _is_truncated(text[start:]):
+        raise TruncatedResponseError(text)
+    raise ValueError("could not repair JSON")
+
+
+def parse_llm_json(raw_output):
+    """Parse raw LLM output into a dict, repairing common breakage locally.
+
+    Raises json.JSONDecodeError if the output cannot be recovered, the
+    TruncatedResponseError subclass if it was cut off.
+    """
+    cleaned_json = strip_code_fence(raw_output)
+    try:
+        return json.loads(cleaned_json)
+    except json.JSONDecodeError as error:
+        try:
+            return repair_json(cleaned_json)
+        except TruncatedResponseError:
+            raise
+        except ValueError:
+            raise error from None
+
+
+def validate(data, schema, path="$"):
+    """Check `data` against the JSON schema subset used by the parsers, returning error strings."""
+    errors = []
+    expected = schema.get("type")
+    types = expected if isinstance(expected, list) else [expected]
+    checks = {
+        "object": lambda value: isinstance(value, dict),
+        "array": lambda value: isinstance(value, list),
+        "string": lambda value: isinstance(value, str),
+        "number": lambda value: isinstance(value, (int, float)) and not isinstance(value, bool),
+        "integer": lambda value: isinstance(value, int) and not isinstance(value, bool),
+        "null": lambda value: value is None,
+        None: lambda value: True,
+    }
+    if not any(checks[name](data) for name in types):
+        return [f"{path}: expected {expected}, got {type(data).__name__}"]
+
+    if isinstance(data, dict):
+        properties = schema.get("properties", {})
+        for key in schema.get("required", []):
+            if key not in data:
+                errors.append(f"{path}: missing '{key}'")
+        for key, value in data.items():
+            if key in properties:
+                errors.extend(validate(value, properties[key], f"{path}.{key}"))
+            elif schema.get("additionalProperties") is False:
+                errors.append(f"{path}: unexpected '{key}'")
+    elif isinstance(data, list) and "items" in schema:
+        for index, value in enumerate(data):
+            errors.extend(validate(value, schema["items"], f"{path}[{index}]"))
+    return errors
+
+
+def load_response(raw_output, schema):
+    """Parse an LLM response and validate it against `schema`.
+
+    Raises json.JSONDecodeError or InvalidResponseError (both ValueErrors).
+    """
+    data = raw_output if isinstance(raw_output, dict) else parse_llm_json(raw_output or "")
+    errors = validate(data, schema)
+    if errors:
+        more = f" (+{len(errors) - 3} more)" if len(errors) > 3 else ""
+        raise InvalidResponseError("; ".join(errors[:3]) + more)
+    return data
+
+
+def response_content(response):
+    """Message content of a chat completion.
+
+    Raises TruncatedResponseError if the model stopped at its output token limit.
+    """
+    choice = response.choices[0]
+    content = choice.message.content or ""
+    if choice.finish_reason == "length":
+        raise TruncatedResponseError(content)
+    return content
+
+
+def response_format(name, schema):
+    """OpenAI structured-output response_format for a JSON schema."""
+    return {"type": "json_schema", "json_schema": {"name": name, "strict": True, "schema": schema}}
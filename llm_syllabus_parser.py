@@ -1,16 +1,87 @@
-from openai import OpenAI
-from dotenv import load_dotenv
-import os
+from instrumentation import llm_usage, span
+from llm_client import get_client
+from llm_json import response_content, response_format
 
-# Load environment variables from API.env
-load_dotenv("API.env")
+MODEL = "gpt-4o-mini"
+# Bump whenever the prompt below changes so cached extractions are invalidated
+PROMPT_VERSION = "3"
 
-# Retrieve API key from env variable
-api_key = os.getenv("OPENAI_API_KEY")
-client = OpenAI(api_key=api_key)
+# Shape of the JSON the model must return, also used to validate responses locally
+RESPONSE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "assignments": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "title": {"type": "string"},
+                    "due_date": {"type": "string"},
+                    "due_time": {"type": "string"},
+                    "weight": {"type": "number"},
+                    "difficulty": {"type": "number"},
+                },
+                "required": ["title", "due_date", "due_time", "weight", "difficulty"],
+                "additionalProperties": False,
+            },
+        },
+        "tests": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "title": {"type": "string"},
+                    "date": {"type": "string"},
+                    "time": {"type": "string"},
+                    "weight": {"type": "number"},
+                },
+                "required": ["title", "date", "time", "weight"],
+                "additionalProperties": False,
+            },
+        },
+        "schedule": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "name": {"type": "string"},
+                    "days": {"type": "array", "items": {"type": "string"}},
+                    "time": {"type": "string"},
+                    "location": {"type": "string"},
+                },
+                "required": ["name", "days", "time", "location"],
+                "additionalProperties": False,
+            },
+        },
+        "term": {
+            "type": "object",
+            "properties": {
+                "start": {"type": "string"},
+                "end": {"type": "string"},
+                "exclusions": {
+                    "type": "array",
+                    "items": {
+                        "type": "object",
+                        "properties": {
+                            "name": {"type": "string"},
+                            "start": {"type": "string"},
+                            "end": {"type": "string"},
+                        },
+                        "required": ["name", "start", "end"],
+                        "additionalProperties": False,
+                    },
+                },
+            },
+            "required": ["start", "end", "exclusions"],
+            "additionalProperties": False,
+        },
+    },
+    "required": ["assignments", "tests", "schedule", "term"],
+    "additionalProperties": False,
+}
 
-def extract_schedule_info(text):
-    prompt = f"""
+def build_prompt(text):
+    return f"""
     From the following course information, extract:
 
     1. A list of assignments:
@@ -32,6 +103,11 @@ def extract_schedule_info(text):
         - time (e.g. 10:30–11:30 or "N/A")
         - location (if mentioned)
 
+    4. The term's class dates:
+        - start: first day of classes (YYYY-MM-DD or "N/A")
+        - end: last day of classes (YYYY-MM-DD or "N/A")
+        - exclusions: reading weeks, breaks and holidays without classes, each with name, start and end (YYYY-MM-DD)
+
     Guidelines:
     - If you are unable to determine weight use the placeholder value of 6
     - Name of the course should be the course code followed by the course name if possible if there are multiple different course codes
@@ -54,15 +130,43 @@ def extract_schedule_info(text):
           "time": "10:30–11:30",
           "location": "Room 101"
         }}
-      ]
+      ],
+      "term": {{
+        "start": "2025-01-06",
+        "end": "2025-04-04",
+        "exclusions": [{{"name": "Reading week", "start": "2025-02-15", "end": "2025-02-23"}}]
+      }}
     }}
 
     Course Info:
     {text}
     """
 
-    response = client.chat.completions.create(model="gpt-4o-mini",
-    messages=[{"role": "user", "content": prompt}],
-    temperature=0.2)
+def build_messages(text):
+    return [{"role": "user", "content": build_prompt(text)}]
+
+# One line of an OpenAI Batch API input file
+def build_batch_request(custom_id, text):
+    return {
+        "custom_id": custom_id,
+        "method": "POST",
+        "url": "/v1/chat/completions",
+        "body": {
+            "model": MODEL,
+            "messages": build_messages(text),
+            "temperature": 0.2,
+            "response_format": response_format("syllabus", RESPONSE_SCHEMA),
+        },
+    }
+
+def extract_schedule_info(text, timeout=None):
+    client = get_client()
+    request_client = client.with_options(timeout=timeout) if timeout else client
+    with span("llm_request", parser="syllabus", model=MODEL, chars=len(text)) as trace:
+        response = request_client.chat.completions.create(model=MODEL,
+        messages=build_messages(text),
+        temperature=0.2,
+        response_format=response_format("syllabus", RESPONSE_SCHEMA))
+        trace.set(**llm_usage(MODEL, response))
 
-    return response.choices[0].message.content
+    return response_content(response)
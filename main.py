@@ -1,49 +1,229 @@
-from pdf_parser import extract_text_from_pdf
+import llm_syllabus_parser
+import llm_assignment_parser
 from llm_syllabus_parser import extract_schedule_info
 from llm_assignment_parser import extract_assignment_info  # You'll need to create this
-from calendar_generator import export_json_to_ics
-from block_generator import generate_time_blocks
-
+from llm_client import get_client, request_slot, set_max_requests
+from block_generator import generate_time_blocks, get_horizon, reschedule_time_blocks, schedule_digest
+import llm_cache
+import llm_batch
+import chunked_extraction
+import llm_json
+import assignment_matcher
+import manifest
+from sqlite_store import CourseStore, store_path_for
+from occurrence_index import load_term, syllabus_term
+from instrumentation import span
+
+# PyMuPDF (pdf_parser, rule_based_parser), openai and icalendar (calendar_generator)
+# are imported inside the functions that use them so the menu starts instantly.
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 import json
 import os
+import random
+import sys
+import time
+
+LLM_TIMEOUT = 120  # seconds per LLM request
+LLM_RETRIES = 3
+PROCESS_JOBS = 4
+PDF_PAGE_WORKERS = 4  # only used for very long PDFs, see pdf_parser.PARALLEL_MIN_PAGES
+# Set to "pages" to drop syllabus pages without dates, weights or deadline keywords
+# before prompting, or "sections" to keep only the lines around them. Off by
+# default: a page dropped by mistake loses its assignments.
+SYLLABUS_PRUNE = None
+# Syllabi whose rule-based extraction scores at least this skip the LLM
+RULES_CONFIDENCE = 0.9
+# Extra LLM calls for a document (or chunk) whose output is malformed even after local repair
+PARSE_RETRIES = 2
+# A response cut off at the output limit is re-extracted in halved chunks down to this size
+MIN_CHUNK_TOKENS = 500
+
+def get_parsed_output_path(pdf_path):
+    output_dir = os.path.join(os.path.dirname(pdf_path), "parsed")
+    output_filename = os.path.splitext(os.path.basename(pdf_path))[0] + "_parsed.json"
+    return os.path.join(output_dir, output_filename)
+
+def call_with_backoff(fn, *args, retries=3, base_delay=2.0, **kwargs):
+    """Call an LLM function, retrying with exponential backoff on rate limits and timeouts.
+
+    Each attempt waits for a free llm_client request slot, the backoff doesn't hold one.
+    """
+    import openai
+
+    for attempt in range(retries + 1):
+        try:
+            with request_slot():
+                return fn(*args, **kwargs)
+        except (openai.RateLimitError, openai.APITimeoutError, openai.APIConnectionError) as e:
+            if attempt == retries:
+                raise
+            delay = base_delay * (2 ** attempt) + random.uniform(0, base_delay)
+            print(f"LLM call failed ({type(e).__name__}), retrying in {delay:.1f}s")
+            time.sleep(delay)
+
+def extract_json(extract, text, schema, timeout=None, retries=0, parse_retries=PARSE_RETRIES):
+    """Call an LLM extraction function until its output parses and matches `schema`.
+
+    Only this text is re-sent on a malformed response. Raises ValueError once
+    `parse_retries` extra calls have failed too, and llm_json.TruncatedResponseError
+    straight away for a cut-off response, which the same text would give again.
+    """
+    for attempt in range(parse_retries + 1):
+        try:
+            raw_output = call_with_backoff(extract, text, timeout=timeout, retries=retries)
+            return llm_json.load_response(raw_output, schema)
+        except llm_json.TruncatedResponseError:
+            raise
+        except ValueError as e:
+            if attempt == parse_retries:
+                raise
+            print(f"Malformed LLM output ({e}), retrying")
+
+def run_llm(extract, text, schema, timeout=None, retries=0, max_tokens=chunked_extraction.CHUNK_TOKENS):
+    """Extract validated JSON from `text`, in concurrent chunks when it is over `max_tokens`.
+
+    A chunk whose response is cut off is extracted again as chunks of half its
+    size, so a truncated response is never used or cached.
+    """
+    tokens = chunked_extraction.count_tokens(text)
+    if tokens > max_tokens:
+        return chunked_extraction.extract_chunked(
+            lambda chunk: run_llm(extract, chunk, schema, timeout, retries, max_tokens), text, max_tokens
+        )
+    try:
+        return extract_json(extract, text, schema, timeout=timeout, retries=retries)
+    except llm_json.TruncatedResponseError:
+        smaller = tokens // 2
+        if smaller < MIN_CHUNK_TOKENS:
+            raise
+        print(f"LLM output was cut off, extracting again in chunks of {smaller} tokens")
+        return run_llm(extract, text, schema, timeout, retries, smaller)
+
+def read_pdf_text(pdf_path, pdf_type, workers=PDF_PAGE_WORKERS):
+    from pdf_parser import extract_text_from_pdf
+
+    prune = SYLLABUS_PRUNE if pdf_type == "syllabus" else None
+    return extract_text_from_pdf(pdf_path, workers=workers, prune=prune)
+
+def get_parser(pdf_type):
+    """Return the parser module and extraction function for a PDF type, or (None, None)."""
+    if pdf_type == "syllabus":
+        return llm_syllabus_parser, extract_schedule_info
+    if pdf_type == "assignment":
+        return llm_assignment_parser, extract_assignment_info
+    return None, None
 
-def process_pdf(pdf_path, pdf_type):
-    text = extract_text_from_pdf(pdf_path)
-    
+def get_cache_key(text, pdf_type):
+    import rule_based_parser
+
+    parser, _ = get_parser(pdf_type)
+    version = parser.PROMPT_VERSION
     if pdf_type == "syllabus":
-        parsed_json = extract_schedule_info(text)
-    elif pdf_type == "assignment":
-        parsed_json = extract_assignment_info(text)
-    else:
+        # Syllabus results may come from the rules, so a rule change invalidates them too
+        version += f"+rules{rule_based_parser.RULES_VERSION}"
+    return llm_cache.cache_key(text, version, parser.MODEL, pdf_type)
+
+def prepare_pdf(pdf_path, pdf_type, workers=PDF_PAGE_WORKERS):
+    """Read a PDF's text and, for uncached syllabi, run the rule-based extractor on it."""
+    import rule_based_parser
+
+    text = read_pdf_text(pdf_path, pdf_type, workers)
+    rules = None
+    if pdf_type == "syllabus" and llm_cache.get_cached(get_cache_key(text, pdf_type)) is None:
+        rules = rule_based_parser.extract_schedule_rules(pdf_path, text)
+    return text, rules
+
+def apply_rules(pdf_path, text, rules=None):
+    """Rule-based syllabus data and the sections it lacks, or (None, None) if not confident."""
+    import rule_based_parser
+
+    if rules is None:
+        rules = rule_based_parser.extract_schedule_rules(pdf_path, text)
+    data, confidence = rules
+    if confidence < RULES_CONFIDENCE:
+        return None, None
+    return data, rule_based_parser.missing_sections(data)
+
+def fill_missing_sections(pdf_path, data, llm_data, missing):
+    """Take the sections the rules could not fill from the parsed LLM output."""
+    for section in missing:
+        data[section] = llm_data.get(section, [])
+    if "term" not in data and llm_data.get("term"):
+        data["term"] = llm_data["term"]
+    print(f"Filled {', '.join(missing)} from the LLM for {pdf_path}")
+    return data
+
+def process_pdf(pdf_path, pdf_type, use_cache=True, text=None, rules=None, timeout=None, retries=0):
+    """Extract, parse and save one PDF. Returns "processed", "cached" or "failed".
+
+    Syllabi go through the rule-based extractor first (`rules` may hold its result
+    already), and the LLM is only called when it is unsure or missed a section.
+    """
+    with span("process_pdf", path=pdf_path, pdf_type=pdf_type) as trace:
+        status = _process_pdf(pdf_path, pdf_type, use_cache, text, rules, timeout, retries)
+        trace.set(status=status)
+    return status
+
+def _process_pdf(pdf_path, pdf_type, use_cache, text, rules, timeout, retries):
+    import openai
+
+    if text is None:
+        text = read_pdf_text(pdf_path, pdf_type)
+
+    parser, extract = get_parser(pdf_type)
+    if parser is None:
         print(f"Unknown PDF type: {pdf_type}")
-        return
+        return "failed"
+
+    output_path = get_parsed_output_path(pdf_path)
+    key = get_cache_key(text, pdf_type)
+
+    cached = llm_cache.get_cached(key) if use_cache else None
+    if cached is not None and os.path.exists(output_path):
+        # Keep the existing parsed file as-is, it may hold manual matches/edits
+        print(f"Unchanged, reusing: {output_path}")
+        return "cached"
 
+    if cached is not None:
+        parsed_json = cached
+    else:
+        data, missing = apply_rules(pdf_path, text, rules) if pdf_type == "syllabus" else (None, None)
+        if data is not None and not missing:
+            print(f"Extracted without the LLM: {pdf_path}")
+            parsed_json = data
+        else:
+            try:
+                parsed_json = run_llm(extract, text, parser.RESPONSE_SCHEMA,
+                                      timeout=timeout, retries=retries)
+            except openai.OpenAIError as e:
+                print(f"LLM request failed for {pdf_path}:", e)
+                return "failed"
+            except ValueError as e:
+                print(f"Failed to parse JSON for {pdf_path}:", e)
+                return "failed"
+            if data is not None:
+                parsed_json = fill_missing_sections(pdf_path, data, parsed_json, missing)
+
+    return save_parsed_output(pdf_path, parsed_json, key)
+
+def save_parsed_output(pdf_path, parsed_json, key):
+    """Parse raw LLM output if needed, cache it under `key` and write parsed/*_parsed.json."""
     if not parsed_json:
         print(f"No data returned from LLM for {pdf_path}")
-        return
+        return "failed"
 
+    output_path = get_parsed_output_path(pdf_path)
     try:
         # If parsed_json is already a dictionary, no need to parse
 
         if isinstance(parsed_json, dict):
             parsed_data = parsed_json
         else:
-            # Clean the JSON string before parsing
-            cleaned_json = parsed_json.strip()
-            # Handle code block wrappers like ```json
-            if cleaned_json.startswith("```"):
-                cleaned_json = cleaned_json.strip("`")
-                if cleaned_json.lower().startswith("json"):
-                    cleaned_json = cleaned_json[4:].strip()
-            cleaned_json = cleaned_json.replace("'", '"')
-            parsed_data = json.loads(cleaned_json)
+            parsed_data = llm_json.parse_llm_json(parsed_json)
+        llm_cache.store(key, parsed_data)
         # Save the parsed data to a JSON file
-        output_dir = os.path.join(os.path.dirname(pdf_path), "parsed")
-        os.makedirs(output_dir, exist_ok=True)
-        
-        output_filename = os.path.splitext(os.path.basename(pdf_path))[0] + "_parsed.json"
-        output_path = os.path.join(output_dir, output_filename)
-        
+        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+
         with open(output_path, 'w', encoding='utf-8') as f:
             json.dump(parsed_data, f, indent=4, ensure_ascii=False)
             print(f"Saved parsed data to: {output_path}")
@@ -51,31 +231,227 @@ def process_pdf(pdf_path, pdf_type):
     except json.JSONDecodeError as e:
         print(f"Failed to parse JSON for {pdf_path}:", e)
         print("Raw LLM output was:\n", parsed_json)
-        return
+        return "failed"
     except Exception as e:
         print(f"Unexpected error processing {pdf_path}:", e)
-        return
+        return "failed"
 
     print(f"\nProcessed: {pdf_path}")
+    return "processed"
 
 
-def process_directory(base_path):
+def collect_pdfs(base_path):
+    """Return (pdf_path, pdf_type) pairs for every syllabus and assignment PDF."""
+    pdfs = []
     for root, dirs, files in os.walk(base_path):
         current_dir = os.path.basename(root)
-        
-        # Process files in Syllabus directory
+
+        # Files in Syllabus directories are syllabi, files in Assignments are assignments
         if current_dir == "Syllabus":
-            for file in files:
-                if file.endswith(".pdf"):
-                    pdf_path = os.path.join(root, file)
-                    process_pdf(pdf_path, "syllabus")
-        
-        # Process files in Assignments directory
+            pdf_type = "syllabus"
         elif current_dir == "Assignments":
-            for file in files:
-                if file.endswith(".pdf"):
-                    pdf_path = os.path.join(root, file)
-                    process_pdf(pdf_path, "assignment")
+            pdf_type = "assignment"
+        else:
+            continue
+
+        for file in sorted(files):
+            if file.endswith(".pdf"):
+                pdfs.append((os.path.join(root, file), pdf_type))
+    return pdfs
+
+
+def process_directory(base_path, jobs=1, timeout=LLM_TIMEOUT, retries=LLM_RETRIES, use_manifest=True):
+    """Process the PDFs under base_path, skipping the ones unchanged since the last run.
+
+    With use_manifest, only new or changed PDFs (by size and mtime, then content
+    hash) are opened, and parsed outputs of deleted PDFs are removed.
+    """
+    pdfs = collect_pdfs(base_path)
+    state = manifest.load_manifest(base_path) if use_manifest else None
+    skipped = 0
+    if state is not None:
+        todo, removed = manifest.scan_pdfs(base_path, pdfs, state, get_parsed_output_path)
+        skipped = len(pdfs) - len(todo)
+        pdfs = todo
+        for rel in removed:
+            stale_path = manifest.forget_pdf(base_path, state, rel)
+            if os.path.exists(stale_path):
+                os.remove(stale_path)
+                print(f"Removed stale output {stale_path}")
+
+    # Only PDFs that were parsed successfully go into the manifest, failures are retried next run
+    def record(pdf_path, pdf_type, status):
+        if state is not None and status != "failed":
+            manifest.record_pdf(base_path, state, pdf_path, pdf_type, get_parsed_output_path(pdf_path))
+
+    if jobs > 1 and pdfs:
+        summary = process_directory_concurrent(pdfs, jobs, timeout=timeout, retries=retries, on_done=record)
+    else:
+        summary = {"processed": 0, "cached": 0, "failed": 0}
+        for pdf_path, pdf_type in pdfs:
+            status = process_pdf(pdf_path, pdf_type, timeout=timeout, retries=retries)
+            record(pdf_path, pdf_type, status)
+            summary[status] += 1
+
+    if state is not None:
+        manifest.save_manifest(base_path, state)
+        summary["unchanged"] = skipped
+        if skipped:
+            print(f"{skipped} PDFs unchanged since the last run, skipped")
+    return summary
+
+
+def process_directory_batch(base_path, batch_path=llm_batch.BATCH_PATH, results_path=None,
+                            poll_interval=llm_batch.POLL_INTERVAL):
+    """Extract every PDF through the OpenAI Batch API and fan the results back out.
+
+    If `results_path` points at a recorded batch output JSONL, it is used instead of
+    submitting a new batch. PDFs whose result is missing or malformed are retried
+    one by one with direct calls, the rest of the batch is not re-sent.
+    """
+    pending = {}
+    pending_types = {}
+    partial = {}
+    chunk_counts = {}
+    requests = []
+    for pdf_path, pdf_type in collect_pdfs(base_path):
+        text = read_pdf_text(pdf_path, pdf_type)
+        key = get_cache_key(text, pdf_type)
+        cached = llm_cache.get_cached(key)
+        if cached is not None and os.path.exists(get_parsed_output_path(pdf_path)):
+            print(f"Unchanged, reusing: {get_parsed_output_path(pdf_path)}")
+            continue
+        if cached is not None:
+            save_parsed_output(pdf_path, cached, key)
+            continue
+
+        if pdf_type == "syllabus":
+            data, missing = apply_rules(pdf_path, text)
+            if data is not None and not missing:
+                print(f"Extracted without the LLM: {pdf_path}")
+                save_parsed_output(pdf_path, data, key)
+                continue
+            if data is not None:
+                partial[pdf_path] = (data, missing)
+
+        # The cache key doubles as the batch custom_id, so identical PDFs share one request.
+        # Long documents are sent as one request per chunk, suffixed with the chunk number.
+        if key not in pending:
+            parser, _ = get_parser(pdf_type)
+            chunks = chunked_extraction.split_text(text)
+            if len(chunks) == 1:
+                requests.append(parser.build_batch_request(key, text))
+            else:
+                for i, chunk in enumerate(chunks):
+                    requests.append(parser.build_batch_request(f"{key}:{i}", chunk))
+            chunk_counts[key] = len(chunks)
+            pending[key] = []
+            pending_types[key] = pdf_type
+        pending[key].append(pdf_path)
+
+    if not requests:
+        print("All PDFs are up to date, nothing to submit.")
+        return
+
+    if results_path:
+        results = llm_batch.read_results_file(results_path)
+    else:
+        llm_batch.write_batch_file(requests, batch_path)
+        client = get_client()
+        batch_id = llm_batch.submit_batch(client, batch_path)
+        print(f"Submitted batch {batch_id} with {len(requests)} requests")
+        batch = llm_batch.wait_for_batch(client, batch_id, poll_interval)
+        results = llm_batch.download_results(client, batch)
+
+    retry = []
+    for key, pdf_paths in pending.items():
+        parser, _ = get_parser(pending_types[key])
+        chunk_ids = [key] if chunk_counts[key] == 1 else [f"{key}:{i}" for i in range(chunk_counts[key])]
+        if not all(chunk_id in results for chunk_id in chunk_ids):
+            print(f"No batch result for {', '.join(pdf_paths)}")
+            retry.extend((pdf_path, pending_types[key]) for pdf_path in pdf_paths)
+            continue
+        try:
+            parsed = [llm_json.load_response(results[chunk_id], parser.RESPONSE_SCHEMA)
+                      for chunk_id in chunk_ids]
+        except ValueError as e:
+            print(f"Failed to parse JSON for {', '.join(pdf_paths)}:", e)
+            retry.extend((pdf_path, pending_types[key]) for pdf_path in pdf_paths)
+            continue
+
+        parsed_json = parsed[0] if len(parsed) == 1 else chunked_extraction.merge_results(parsed)
+        for pdf_path in pdf_paths:
+            result = parsed_json
+            if pdf_path in partial:
+                data, missing = partial[pdf_path]
+                result = fill_missing_sections(pdf_path, data, parsed_json, missing)
+            save_parsed_output(pdf_path, result, key)
+
+    if retry:
+        print(f"\nRetrying {len(retry)} PDFs without a usable batch result directly")
+        for pdf_path, pdf_type in retry:
+            process_pdf(pdf_path, pdf_type, timeout=LLM_TIMEOUT, retries=LLM_RETRIES)
+
+
+def process_directory_concurrent(pdfs, jobs, timeout=LLM_TIMEOUT, retries=LLM_RETRIES, on_done=None):
+    """Extract PDF text in a process pool and run up to `jobs` LLM calls at once.
+
+    on_done(pdf_path, pdf_type, status) is called in this thread as each PDF finishes.
+    """
+    started = time.monotonic()
+    summary = {"processed": 0, "cached": 0, "failed": 0}
+    total = len(pdfs)
+    # Chunked PDFs fan out into more threads, the shared limit keeps it at `jobs` requests
+    set_max_requests(jobs)
+
+    done = 0
+
+    # Count a finished PDF, whether it failed at extraction or at the LLM step
+    def finish(pdf_path, pdf_type, status):
+        nonlocal done
+        done += 1
+        if on_done is not None:
+            on_done(pdf_path, pdf_type, status)
+        summary[status] += 1
+        print(f"[{done}/{total}] {status}: {pdf_path}")
+
+    with ProcessPoolExecutor(max_workers=jobs) as extract_pool, \
+            ThreadPoolExecutor(max_workers=jobs) as llm_pool:
+        extract_futures = {
+            # The pool already runs `jobs` processes; a page pool inside each
+            # worker would oversubscribe the CPUs, so pages are read serially there
+            extract_pool.submit(prepare_pdf, pdf_path, pdf_type, 1): (pdf_path, pdf_type)
+            for pdf_path, pdf_type in pdfs
+        }
+
+        # Hand each PDF to the LLM pool as soon as its text is ready
+        llm_futures = {}
+        for future in as_completed(extract_futures):
+            pdf_path, pdf_type = extract_futures[future]
+            try:
+                text, rules = future.result()
+            except Exception as e:
+                print(f"Failed to extract text from {pdf_path}:", e)
+                finish(pdf_path, pdf_type, "failed")
+                continue
+            llm_future = llm_pool.submit(
+                process_pdf, pdf_path, pdf_type, text=text, rules=rules, timeout=timeout, retries=retries
+            )
+            llm_futures[llm_future] = (pdf_path, pdf_type)
+
+        for future in as_completed(llm_futures):
+            pdf_path, pdf_type = llm_futures[future]
+            try:
+                status = future.result()
+            except Exception as e:
+                print(f"Unexpected error processing {pdf_path}:", e)
+                status = "failed"
+            finish(pdf_path, pdf_type, status)
+
+    elapsed = time.monotonic() - started
+    print(f"\n{total} PDFs in {elapsed:.1f}s: {summary['processed']} processed, "
+          f"{summary['cached']} reused from cache, {summary['failed']} failed")
+    return summary
 
 
 def run_manual_matching():
@@ -109,8 +485,39 @@ def run_manual_matching():
         except ValueError:
             print("Invalid input. Please enter a number or 'q'.")
 
-def match_assignments_interactive(course_path: str) -> dict:
-    """Match assignments interactively and update the original syllabus file in-place."""
+def apply_assignment_match(syllabus_assignment, parsed_assignment):
+    for field in ['title', 'difficulty', 'weight', 'due_time']:
+        if field in parsed_assignment:
+            syllabus_assignment[field] = parsed_assignment[field]
+
+def auto_match_assignments(syllabus_json, assignment_files):
+    """Apply confident automatic matches, returning the 1-based file numbers left to match by hand."""
+    candidates = []
+    for index, (filename, json_data) in enumerate(assignment_files):
+        assignments = json_data.get('assignment') if isinstance(json_data, dict) else None
+        if isinstance(assignments, list) and assignments:
+            candidates.append((index, filename, assignments[0]))
+
+    matches, _ = assignment_matcher.match_assignments(
+        syllabus_json['assignments'],
+        [assignment for _, _, assignment in candidates],
+        labels=[os.path.splitext(filename)[0] for _, filename, _ in candidates],
+    )
+    matched = set()
+    for syllabus_idx, candidate_idx, score in matches:
+        file_idx, filename, parsed_assignment = candidates[candidate_idx]
+        syllabus_assignment = syllabus_json['assignments'][syllabus_idx]
+        print(f"Matched {filename} -> {syllabus_assignment.get('title', 'Untitled')} (score {score:.2f})")
+        apply_assignment_match(syllabus_assignment, parsed_assignment)
+        matched.add(file_idx + 1)
+    return [i for i in range(1, len(assignment_files) + 1) if i not in matched]
+
+def match_assignments_interactive(course_path: str, auto: bool = True, interactive: bool = True) -> dict:
+    """Match assignments and update the original syllabus file in-place.
+
+    With `auto`, confident matches are made automatically and the prompt only
+    comes up if some assignment files are left; `interactive=False` skips it.
+    """
 
     # Load syllabus JSON
     syllabus_dir = os.path.join(course_path, "Syllabus", "parsed")
@@ -140,7 +547,14 @@ def match_assignments_interactive(course_path: str) -> dict:
 
     matched_assignments = set()
 
-    if assignment_files:
+    unmatched = list(range(1, len(assignment_files) + 1))
+    if assignment_files and auto:
+        unmatched = auto_match_assignments(syllabus_json, assignment_files)
+        matched_assignments.update(set(range(1, len(assignment_files) + 1)) - set(unmatched))
+        if unmatched and interactive:
+            print(f"\nCould not confidently match files {', '.join(map(str, unmatched))}, please match them below")
+
+    if assignment_files and unmatched and interactive:
         while True:
             print("\n=== Assignment Matching Interface ===")
             print("\nSyllabus Assignments:")
@@ -181,10 +595,7 @@ def match_assignments_interactive(course_path: str) -> dict:
                     if assignments:
                         parsed_assignment = assignments[0]
                         syllabus_assignment = syllabus_json['assignments'][syllabus_idx - 1]
-
-                        for field in ['title', 'difficulty', 'weight', 'due_time']:
-                            if field in parsed_assignment:
-                                syllabus_assignment[field] = parsed_assignment[field]
+                        apply_assignment_match(syllabus_assignment, parsed_assignment)
 
                         matched_assignments.add(assignment_idx)
                         print("\nSuccessfully matched assignments!")
@@ -194,7 +605,7 @@ def match_assignments_interactive(course_path: str) -> dict:
                     print("\nInvalid assignment numbers")
             except (ValueError, IndexError):
                 print("\nInvalid input format. Please enter two numbers separated by space")
-    else:
+    elif not assignment_files:
         print("No assignment JSONs found to match. Proceeding to save syllabus as-is.")
 
     # Save back to original syllabus file
@@ -203,15 +614,32 @@ def match_assignments_interactive(course_path: str) -> dict:
     print(f"\nUpdated original syllabus file: {syllabus_file}")
 
     return syllabus_json
+def open_store(json_path):
+    """Open the SQLite store next to a merged JSON file, or None if the student has none."""
+    store_path = store_path_for(json_path)
+    return CourseStore(store_path) if store_path else None
+
+def load_course_data(path):
+    """Merged course data from the SQLite store next to `path` if there is one, else from the JSON file."""
+    store = open_store(path)
+    if store is not None:
+        with store:
+            return store.export_course_data()
+    with open(path, "r") as f:
+        return json.load(f)
+
 def edit_schedule():
     path = "data/user_pdfs/syllabus_matched.json"
 
-    if not os.path.exists(path):
+    # With a SQLite store each edit updates one row instead of rewriting the file
+    store = open_store(path)
+    if store is None and not os.path.exists(path):
         print("No matched syllabus file found.")
         return
 
-    with open(path, "r") as f:
-        data = json.load(f)
+    if store is None:
+        with open(path, "r") as f:
+            data = json.load(f)
 
     def show_section(name, entries, fields):
         print(f"\n{name} Entries:")
@@ -246,7 +674,12 @@ def edit_schedule():
             print("Invalid option.")
             continue
 
-        items = data.get(key, [])
+        if store is not None:
+            rows = store.items(key)
+            row_ids = [row_id for row_id, _ in rows]
+            items = [item for _, item in rows]
+        else:
+            items = data.get(key, [])
         if not items:
             print(f"No {section_name.lower()} found.")
             continue
@@ -261,6 +694,8 @@ def edit_schedule():
                 idx = int(entry_input[2:]) - 1
                 if 0 <= idx < len(items):
                     deleted = items.pop(idx)
+                    if store is not None:
+                        store.delete(key, row_ids[idx])
                     print(f"Deleted {section_name[:-1]}: {deleted.get('title', deleted)}")
                 else:
                     print("Invalid number.")
@@ -272,79 +707,155 @@ def edit_schedule():
                 if 0 <= idx < len(items):
                     entry = items[idx]
                     print(f"Editing {section_name[:-1]}: {entry.get('title', entry)}")
+                    changes = {}
                     for field in fields:
                         current = entry.get(field, "")
                         new_val = input(f"{field} [{current}]: ").strip()
                         if new_val:
                             if field == "days":
-                                entry[field] = [d.strip().capitalize() for d in new_val.split(',')]
+                                changes[field] = [d.strip().capitalize() for d in new_val.split(',')]
                             else:
-                                entry[field] = new_val
+                                changes[field] = new_val
+                    entry.update(changes)
+                    if store is not None and changes:
+                        store.update(key, row_ids[idx], **changes)
                     print("Entry updated.")
                 else:
                     print("Invalid number.")
             except:
                 print("Invalid input.")
 
-        # Save after each edit
-        with open(path, "w", encoding="utf-8") as f:
-            json.dump(data, f, indent=4, ensure_ascii=False)
-            print("Saved changes.")
-def merge_json(courses_dir: str, output_path: str = "data/user_pdfs/syllabus_matched.json") -> None:
-    """Merge all syllabus_parsed.json files from each course into one JSON file."""
+        # Save after each edit, the store has already committed it
+        if store is None:
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(data, f, indent=4, ensure_ascii=False)
+        print("Saved changes.")
+
+    if store is not None:
+        store.close()
+def merge_json(courses_dir: str, output_path: str = "data/user_pdfs/syllabus_matched.json",
+               use_manifest: bool = True) -> None:
+    """Merge all syllabus_parsed.json files from each course into one JSON file.
+
+    With use_manifest, courses whose parsed files are unchanged since the last
+    merge keep their entries from the existing output, so only the affected
+    courses are re-read and nothing is written when no course changed.
+    """
+    state = manifest.load_manifest(courses_dir) if use_manifest else None
+    output_key = os.path.abspath(output_path)
+    previous_sources = state["merged"].get(output_key, {}) if state is not None else {}
+    previous = None
+    if previous_sources and os.path.exists(output_path):
+        try:
+            with open(output_path, 'r', encoding='utf-8') as f:
+                previous = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            previous = None
+
     merged = {
         'assignments': [],
         'tests': [],
         'schedule': []
     }
+    # Class dates of each course's syllabus, see occurrence_index.syllabus_term
+    terms = {}
+    sources = {}
+    changed = []
 
-    for course_name in os.listdir(courses_dir):
+    for course_name in sorted(os.listdir(courses_dir)):
         course_path = os.path.join(courses_dir, course_name)
         syllabus_dir = os.path.join(course_path, "Syllabus", "parsed")
 
         if not os.path.exists(syllabus_dir):
             continue
 
-        for file in os.listdir(syllabus_dir):
-            if file.endswith("_parsed.json"):
-                full_path = os.path.join(syllabus_dir, file)
-                try:
-                    with open(full_path, 'r', encoding='utf-8') as f:
-                        syllabus_data = json.load(f)
-
-                        # Merge assignments
-                        for assignment in syllabus_data.get("assignments", []):
-                            assignment["course"] = course_name
-                            merged["assignments"].append(assignment)
-
-                        # Merge tests
-                        for test in syllabus_data.get("tests", []):
-                            test["course"] = course_name
-                            merged["tests"].append(test)
-
-                        # Merge schedule
-                        for sched in syllabus_data.get("schedule", []):
-                            sched["course"] = course_name
-                            merged["schedule"].append(sched)
-
-                except Exception as e:
-                    print(f"⚠️ Failed to load {full_path}: {e}")
-
-    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+        files = sorted(file for file in os.listdir(syllabus_dir) if file.endswith("_parsed.json"))
+        stats = {file: manifest.stat_entry(os.path.join(syllabus_dir, file)) for file in files}
+
+        # Unchanged course: reuse its entries as they are in the existing output
+        if previous is not None and previous_sources.get(course_name) == stats:
+            for key in merged:
+                merged[key].extend(entry for entry in previous.get(key, [])
+                                   if entry.get("course") == course_name)
+            if course_name in previous.get("terms", {}):
+                terms[course_name] = previous["terms"][course_name]
+            sources[course_name] = stats
+            continue
+
+        changed.append(course_name)
+        loaded = True
+        for file in files:
+            full_path = os.path.join(syllabus_dir, file)
+            try:
+                with open(full_path, 'r', encoding='utf-8') as f:
+                    syllabus_data = json.load(f)
+
+                    # Merge assignments
+                    for assignment in syllabus_data.get("assignments", []):
+                        assignment["course"] = course_name
+                        merged["assignments"].append(assignment)
+
+                    # Merge tests
+                    for test in syllabus_data.get("tests", []):
+                        test["course"] = course_name
+                        merged["tests"].append(test)
+
+                    # Merge schedule
+                    for sched in syllabus_data.get("schedule", []):
+                        sched["course"] = course_name
+                        merged["schedule"].append(sched)
+
+                    if syllabus_data.get("term"):
+                        terms[course_name] = syllabus_data["term"]
+
+            except Exception as e:
+                print(f"⚠️ Failed to load {full_path}: {e}")
+                loaded = False
+
+        # Leave failed courses out of the manifest so the next merge reads them again
+        if loaded:
+            sources[course_name] = stats
+
+    if terms:
+        merged["terms"] = terms
+
+    if previous is not None and not changed and sources == previous_sources:
+        print(f"\n✅ Merged syllabus is up to date: {output_path}")
+        return
+
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
     with open(output_path, 'w', encoding='utf-8') as f:
         json.dump(merged, f, indent=4, ensure_ascii=False)
 
+    store = open_store(output_path)
+    if store is not None:
+        with store:
+            store.replace_courses(merged, changed, keep=set(sources) | set(changed))
+
+    if state is not None:
+        state["merged"][output_key] = sources
+        manifest.save_manifest(courses_dir, state)
+    if previous is not None:
+        print(f"Updated {len(changed)} changed course(s): {', '.join(changed) or 'none'}")
     print(f"\n✅ Merged syllabus saved to: {output_path}")
 
 def merge_blocks_into_course_json(course_path, blocks_path, output_path=None):
-    # Load syllabus_matched.json
-    with open(course_path, 'r') as f:
-        course_data = json.load(f)
-
     # Load generated_blocks.json
     with open(blocks_path, 'r') as f:
         blocks_data = json.load(f)
 
+    # With a SQLite store only the blocks table is replaced
+    store = open_store(course_path) if not output_path else None
+    if store is not None:
+        with store:
+            store.replace_blocks(blocks_data.get("blocks", []))
+        print(f"Merged study blocks into {store_path_for(course_path)}")
+        return
+
+    # Load syllabus_matched.json
+    with open(course_path, 'r') as f:
+        course_data = json.load(f)
+
     # Add the blocks into the course data
     course_data["study_blocks"] = blocks_data.get("blocks", [])
 
@@ -358,7 +869,54 @@ def merge_blocks_into_course_json(course_path, blocks_path, output_path=None):
 
     print(f"Merged and saved to {output_path}")
 
+def allocate_study_blocks(course_data, blocks_path="generated_blocks.json", strategy="edf", term=None,
+                          busy_calendars=()):
+    """Generate study blocks, reusing the previous allocation in blocks_path where nothing changed.
+
+    busy_calendars are .ics files whose events the blocks have to avoid.
+    """
+    # Without term.json or class dates in the syllabi the term is inferred from
+    # the deadlines
+    term = term or syllabus_term(course_data)
+    term_key = term.to_dict() if term else None
+    busy = []
+    busy_key = None
+    horizon = get_horizon(course_data)
+    if busy_calendars and horizon:
+        from ics_import import busy_fingerprint, load_busy
+
+        busy = load_busy(busy_calendars, *horizon)
+        busy_key = busy_fingerprint(busy) if busy else None
+
+    previous = None
+    if os.path.exists(blocks_path):
+        with open(blocks_path, "r") as f:
+            previous = json.load(f)
+
+    # generated_blocks.json keeps a digest of the items it was built from so
+    # edits to syllabus_matched.json can be found
+    if (previous and "digest" in previous and previous.get("strategy", "edf") == strategy
+            and previous.get("term") == term_key
+            and previous.get("busy") == busy_key):
+        blocks_json = reschedule_time_blocks(previous["digest"], course_data, previous.get("blocks", []),
+                                             strategy=strategy, term=term, busy=busy)
+    else:
+        blocks_json = generate_time_blocks(course_data, strategy=strategy, term=term, busy=busy)
+
+    blocks_json["digest"] = schedule_digest(course_data)
+    blocks_json["strategy"] = strategy
+    if term_key:
+        blocks_json["term"] = term_key
+    if busy_key:
+        blocks_json["busy"] = busy_key
+    return blocks_json
+
 if __name__ == "__main__":
+    # Arguments switch to the non-interactive CLI, e.g. `python main.py process data/user_pdfs`
+    if len(sys.argv) > 1:
+        import cli
+        sys.exit(cli.main(sys.argv[1:]))
+
     while True:
         print("\n=== PDF Processing and Assignment Matching Tool ===")
         print("1. Process PDFs and create JSON files")
@@ -366,6 +924,7 @@ if __name__ == "__main__":
         print("3. Edit Schedule")
         print("4. Compile into Calender")
         print("5. Allocate Study Time")
+        print("6. Process PDFs with the Batch API (slow, half price)")
         print("q. Quit")
         
         choice = input("\nSelect option: ").strip().lower()
@@ -373,7 +932,7 @@ if __name__ == "__main__":
         if choice == 'q':
             break
         elif choice == '1':
-            process_directory("data/user_pdfs")
+            process_directory("data/user_pdfs", jobs=PROCESS_JOBS)
             print("\nFinished processing PDFs")
         elif choice == '2':
             run_manual_matching()
@@ -381,19 +940,22 @@ if __name__ == "__main__":
         elif choice == '3':
             edit_schedule()
         elif choice == '4':
-            with open("data/user_pdfs/syllabus_matched.json", "r") as f:  # Replace with your actual file
-                data = json.load(f)
-            export_json_to_ics(data,"course_calendar.ics")
+            from calendar_generator import export_json_to_ics
+
+            data = load_course_data("data/user_pdfs/syllabus_matched.json")
+            export_json_to_ics(data,"course_calendar.ics", term=load_term("data/user_pdfs/syllabus_matched.json"))
         elif choice == '5':
+            from ics_import import find_busy_calendars
+
             syllabus_path = "data/user_pdfs/syllabus_matched.json"
             blocks_path = "generated_blocks.json"
 
             # Load existing course data
-            with open(syllabus_path, "r") as f:
-                course_data = json.load(f)
+            course_data = load_course_data(syllabus_path)
 
-            # Generate study blocks via LLM
-            blocks_str = generate_time_blocks(course_data)
+            # Generate study blocks, only recomputing items edited since the last run
+            blocks_str = allocate_study_blocks(course_data, blocks_path, term=load_term(syllabus_path),
+                                               busy_calendars=find_busy_calendars("data/user_pdfs"))
 
             # Save to generated_blocks.json
             try:
@@ -416,9 +978,13 @@ if __name__ == "__main__":
             )
 
             # Reload merged data and export to .ics
-            with open(syllabus_path, "r") as f:
-                merged_data = json.load(f)
-            export_json_to_ics(merged_data, "course_calendar.ics")
+            from calendar_generator import export_json_to_ics
 
+            merged_data = load_course_data(syllabus_path)
+            export_json_to_ics(merged_data, "course_calendar.ics", term=load_term(syllabus_path))
+
+        elif choice == '6':
+            process_directory_batch("data/user_pdfs")
+            print("\nFinished processing PDFs")
         else:
             print("Invalid option. Please try again.")
@@ -0,0 +1,99 @@
+import hashlib
+import json
+import os
+
+# Per-directory manifest of what has already been processed, so repeat runs
+# only touch new or changed files. Stored as <base_path>/.manifest.json:
+#
+#   "pdfs":   {pdf path: {type, size, mtime_ns, sha256, parsed}} for every PDF
+#             whose parsed JSON is up to date (paths relative to base_path)
+#   "merged": {output path: {course: {parsed file: [size, mtime_ns]}}}, the
+#             parsed syllabus files each merged output was built from
+MANIFEST_NAME = ".manifest.json"
+
+
+def manifest_path(base_path):
+    return os.path.join(base_path, MANIFEST_NAME)
+
+
+def load_manifest(base_path):
+    try:
+        with open(manifest_path(base_path), "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        manifest = {}
+    manifest.setdefault("pdfs", {})
+    manifest.setdefault("merged", {})
+    return manifest
+
+
+def save_manifest(base_path, manifest):
+    path = manifest_path(base_path)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=1, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def stat_entry(path):
+    """[size, mtime_ns] of a file, or None if it is missing."""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def scan_pdfs(base_path, pdfs, manifest, output_path_for):
+    """Split `pdfs` into the ones needing processing and the manifest entries of deleted PDFs.
+
+    A PDF is skipped when its parsed output exists and its size and mtime match
+    the manifest. If only the mtime changed (e.g. the file was copied), the
+    content hash decides.
+    """
+    entries = manifest["pdfs"]
+    todo = []
+    seen = set()
+    for pdf_path, pdf_type in pdfs:
+        rel = os.path.relpath(pdf_path, base_path)
+        seen.add(rel)
+        entry = entries.get(rel)
+        stat = stat_entry(pdf_path)
+        if entry is None or stat is None or entry["type"] != pdf_type \
+                or not os.path.exists(output_path_for(pdf_path)):
+            todo.append((pdf_path, pdf_type))
+            continue
+        if [entry["size"], entry["mtime_ns"]] == stat:
+            continue
+        if entry["size"] == stat[0] and file_hash(pdf_path) == entry["sha256"]:
+            entry["mtime_ns"] = stat[1]
+            continue
+        todo.append((pdf_path, pdf_type))
+
+    removed = sorted(rel for rel in entries if rel not in seen)
+    return todo, removed
+
+
+def record_pdf(base_path, manifest, pdf_path, pdf_type, parsed_path):
+    size, mtime_ns = stat_entry(pdf_path)
+    manifest["pdfs"][os.path.relpath(pdf_path, base_path)] = {
+        "type": pdf_type,
+        "size": size,
+        "mtime_ns": mtime_ns,
+        "sha256": file_hash(pdf_path),
+        "parsed": os.path.relpath(parsed_path, base_path),
+    }
+
+
+def forget_pdf(base_path, manifest, rel):
+    """Drop a deleted PDF from the manifest, returning the path of its stale parsed output."""
+    entry = manifest["pdfs"].pop(rel)
+    return os.path.join(base_path, entry["parsed"])
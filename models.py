@@ -0,0 +1,280 @@
+import json
+import sys
+from dataclasses import dataclass
+from datetime import date, datetime, time
+from typing import ClassVar
+
+# Typed in-memory form of the merged course data (syllabus_matched.json).
+# Dates and times are parsed once when loading, repeated strings (course names,
+# titles, weekdays) are interned, and every record remembers which keys it was
+# loaded with and in what order, so to_dict() gives back the same JSON. Values
+# that don't parse exactly (e.g. "N/A" or "9:30") are kept as the original
+# string; to_date, to_time and to_time_range still read those the way the old
+# strptime calls did.
+
+DATE_FORMAT = "%Y-%m-%d"
+TIME_FORMAT = "%H:%M"
+RANGE_SEPARATOR = "–"
+
+# Records loaded from the same JSON layout share one key tuple
+_layouts = {}
+
+
+def _layout(keys):
+    keys = tuple(keys)
+    return _layouts.setdefault(keys, keys)
+
+
+def _text(value):
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+def _date(value):
+    if isinstance(value, str) and len(value) == 10:
+        try:
+            parsed = date.fromisoformat(value)
+        except ValueError:
+            return value
+        if parsed.isoformat() == value:
+            return parsed
+    return value
+
+
+def _time(value):
+    # fromisoformat instead of strptime, which was most of the load time;
+    # only exact HH:MM strings are taken either way
+    if isinstance(value, str) and len(value) == 5:
+        try:
+            parsed = time.fromisoformat(value)
+        except ValueError:
+            return value
+        if parsed.tzinfo is None and parsed.isoformat("minutes") == value:
+            return parsed
+    return value
+
+
+def _range(value):
+    if isinstance(value, str) and value.count(RANGE_SEPARATOR) == 1:
+        start, end = (_time(part) for part in value.split(RANGE_SEPARATOR))
+        if isinstance(start, time) and isinstance(end, time):
+            return start, end
+    return value
+
+
+def _days(value):
+    if isinstance(value, list):
+        return tuple(_text(day) for day in value)
+    return value
+
+
+def format_date(value):
+    return value.isoformat() if isinstance(value, date) else value
+
+
+def format_time(value):
+    return value.strftime(TIME_FORMAT) if isinstance(value, time) else value
+
+
+def format_range(value):
+    if isinstance(value, tuple):
+        return f"{format_time(value[0])}{RANGE_SEPARATOR}{format_time(value[1])}"
+    return value
+
+
+def _list(value):
+    return list(value) if isinstance(value, tuple) else value
+
+
+# Field kinds: how each JSON value is parsed on load and written back
+PARSERS = {"text": _text, "date": _date, "time": _time, "range": _range, "days": _days}
+FORMATTERS = {"date": format_date, "time": format_time, "range": format_range, "days": _list}
+
+
+def to_date(value):
+    """A stored date as a date, reading leftover strings with strptime. Raises ValueError if unreadable."""
+    if isinstance(value, date):
+        return value
+    return datetime.strptime(value, DATE_FORMAT).date()
+
+
+def to_time(value, default):
+    """A stored time as a time; missing and "N/A" give `default`. Raises ValueError if unreadable."""
+    if isinstance(value, time):
+        return value
+    if value is None or value == "N/A":
+        return default
+    return datetime.strptime(value.strip(), TIME_FORMAT).time()
+
+
+def to_time_range(value):
+    """A stored class time as (start, end) times. Raises ValueError if unreadable."""
+    if isinstance(value, tuple):
+        return value
+    start, end = value.split(RANGE_SEPARATOR)
+    return to_time(start, None), to_time(end, None)
+
+
+class Record:
+    """Base for one JSON object. FIELDS maps known keys to their kind, other keys go to `extra`."""
+    __slots__ = ()
+    FIELDS: ClassVar[dict] = {}
+
+    @classmethod
+    def from_dict(cls, data):
+        values = {}
+        extra = None
+        for key, value in data.items():
+            kind = cls.FIELDS.get(key)
+            if kind is None:
+                if extra is None:
+                    extra = {}
+                extra[key] = value
+            else:
+                parse = PARSERS.get(kind)
+                values[key] = parse(value) if parse else value
+        return cls(**values, extra=extra, keys=_layout(data))
+
+    def to_dict(self):
+        data = {}
+        for key in self.keys:
+            kind = self.FIELDS.get(key)
+            if kind is None:
+                data[key] = self.extra[key]
+            else:
+                value = getattr(self, key)
+                write = FORMATTERS.get(kind)
+                data[key] = write(value) if write else value
+        return data
+
+
+@dataclass(slots=True)
+class Assignment(Record):
+    FIELDS: ClassVar[dict] = {"title": "text", "course": "text", "due_date": "date",
+                              "due_time": "time", "weight": "value", "difficulty": "value"}
+    is_test: ClassVar[bool] = False
+
+    title: str = None
+    course: str = None
+    due_date: date = None
+    due_time: time = None
+    weight: float = None
+    difficulty: int = None
+    extra: dict = None
+    keys: tuple = ()
+
+    @property
+    def due_str(self):
+        return format_date(self.due_date)
+
+
+@dataclass(slots=True)
+class Test(Record):
+    FIELDS: ClassVar[dict] = {"title": "text", "course": "text", "date": "date",
+                              "time": "time", "weight": "value", "difficulty": "value"}
+    is_test: ClassVar[bool] = True
+
+    title: str = None
+    course: str = None
+    date: date = None
+    time: time = None
+    weight: float = None
+    difficulty: int = None
+    extra: dict = None
+    keys: tuple = ()
+
+    @property
+    def due_date(self):
+        return self.date
+
+    @property
+    def due_str(self):
+        return format_date(self.date)
+
+
+@dataclass(slots=True)
+class ClassSession(Record):
+    FIELDS: ClassVar[dict] = {"name": "text", "course": "text", "days": "days",
+                              "time": "range", "location": "text"}
+
+    name: str = None
+    course: str = None
+    days: tuple = ()
+    time: tuple = None
+    location: str = None
+    extra: dict = None
+    keys: tuple = ()
+
+
+@dataclass(slots=True)
+class StudyBlock(Record):
+    FIELDS: ClassVar[dict] = {"title": "text", "course": "text", "date": "date",
+                              "time": "time", "duration": "value", "type": "text"}
+
+    title: str = None
+    course: str = None
+    date: date = None
+    time: time = None
+    duration: int = None
+    type: str = None
+    extra: dict = None
+    keys: tuple = ()
+
+
+SECTIONS = {"assignments": Assignment, "tests": Test, "schedule": ClassSession, "study_blocks": StudyBlock}
+
+
+@dataclass(slots=True)
+class CourseData:
+    """Merged course data: assignments, tests, class schedule and study blocks of every course."""
+    assignments: list
+    tests: list
+    schedule: list
+    study_blocks: list
+    extra: dict = None
+    keys: tuple = ()
+
+    @classmethod
+    def from_dict(cls, data):
+        sections = {name: [] for name in SECTIONS}
+        extra = None
+        for key, value in data.items():
+            record = SECTIONS.get(key)
+            if record is not None and isinstance(value, list):
+                sections[key] = [record.from_dict(item) for item in value]
+            else:
+                if extra is None:
+                    extra = {}
+                extra[key] = value
+        return cls(**sections, extra=extra, keys=_layout(data))
+
+    def to_dict(self):
+        data = {}
+        for key in self.keys:
+            if self.extra is not None and key in self.extra:
+                data[key] = self.extra[key]
+            else:
+                data[key] = [record.to_dict() for record in getattr(self, key)]
+        return data
+
+
+def as_course_data(data):
+    """Accept either a CourseData or the plain JSON dict."""
+    return data if isinstance(data, CourseData) else CourseData.from_dict(data)
+
+
+def iter_records(data, section):
+    """Records of one section; plain dicts are converted one at a time, nothing is kept."""
+    if isinstance(data, CourseData):
+        return iter(getattr(data, section))
+    record = SECTIONS[section]
+    return (record.from_dict(item) for item in data.get(section, []))
+
+
+def load_course_data(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return CourseData.from_dict(json.load(f))
+
+
+def save_course_data(data, path):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data.to_dict(), f, indent=4, ensure_ascii=False)
@@ -0,0 +1,282 @@
+import bisect
+import json
+import os
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta
+
+from models import ClassSession, CourseData, iter_records, to_date, to_time_range
+
+# Term-aware index of class meetings, shared by the scheduler and the .ics
+# export. Every class session is expanded once into its concrete meetings
+# between the first and last day of classes, skipping reading weeks and
+# holidays, and kept as sorted (start, end) datetimes so meetings on a day or
+# overlapping a time range are found by bisection. Busy time from other
+# calendars (see ics_import) goes into the same index.
+#
+# The term comes from term.json next to syllabus_matched.json:
+#
+#   {"start": "2025-01-06", "end": "2025-04-08",
+#    "exclusions": [{"name": "Reading week", "start": "2025-02-17", "end": "2025-02-21"},
+#                   {"name": "Good Friday", "start": "2025-04-18"}]}
+#
+# `end` is the last day of classes; an exclusion without `end` is one day.
+# Without term.json the class dates printed in the syllabi are used; merge_json
+# keeps them per course under "terms" in the same shape. Only the scheduler
+# goes further and guesses a term from the deadlines when there are none.
+TERM_NAME = "term.json"
+# Days before a deadline that work on it can start, see block_generator
+LEAD_DAYS = 14
+
+WEEKDAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+# Session position of busy time that isn't a class
+BUSY = -1
+
+
+@dataclass(frozen=True, slots=True)
+class Term:
+    start: date
+    end: date
+    # Sorted, non-overlapping (first day, last day, name) ranges without classes
+    exclusions: tuple = ()
+
+    @classmethod
+    def from_dict(cls, data):
+        exclusions = []
+        for entry in data.get("exclusions", []):
+            first = to_date(entry["start"])
+            exclusions.append((first, to_date(entry.get("end") or first), entry.get("name", "")))
+        return cls(to_date(data["start"]), to_date(data["end"]), merge_ranges(exclusions))
+
+    def to_dict(self):
+        return {
+            "start": self.start.isoformat(),
+            "end": self.end.isoformat(),
+            "exclusions": [{"name": name, "start": first.isoformat(), "end": last.isoformat()}
+                           for first, last, name in self.exclusions],
+        }
+
+    def excluded(self, day):
+        """Exclusion name if classes are off on `day`, else None."""
+        i = bisect.bisect_right(self.exclusions, (day, date.max)) - 1
+        if i >= 0 and self.exclusions[i][1] >= day:
+            return self.exclusions[i][2]
+        return None
+
+
+# Sort (first, last, name) ranges and join overlapping or adjacent ones
+def merge_ranges(ranges):
+    merged = []
+    for first, last, name in sorted(ranges):
+        if merged and first <= merged[-1][1] + timedelta(days=1):
+            prev_first, prev_last, prev_name = merged[-1]
+            merged[-1] = (prev_first, max(prev_last, last), prev_name)
+        else:
+            merged.append((first, last, name))
+    return tuple(merged)
+
+
+def load_term(json_path):
+    """Term from term.json next to a merged JSON file, None if there is none."""
+    path = os.path.join(os.path.dirname(json_path) or ".", TERM_NAME)
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return Term.from_dict(json.load(f))
+
+
+def merge_terms(terms):
+    """One Term covering several courses' terms, None for none.
+
+    It runs from the first start to the last end; only days every course has
+    off stay excluded.
+    """
+    if not terms:
+        return None
+    shared = set.intersection(*({(first, last) for first, last, _ in term.exclusions} for term in terms))
+    exclusions = [exclusion for exclusion in terms[0].exclusions if exclusion[:2] in shared]
+    return Term(min(term.start for term in terms), max(term.end for term in terms), tuple(exclusions))
+
+
+def syllabus_term(data):
+    """Term from the class dates in the syllabi (the "terms" of course data), None if they give none."""
+    extra = data.extra if isinstance(data, CourseData) else data
+    terms = []
+    for entry in ((extra or {}).get("terms") or {}).values():
+        try:
+            terms.append(Term.from_dict(entry))
+        except (AttributeError, KeyError, TypeError, ValueError):
+            continue  # no usable class dates for this course
+    return merge_terms(terms)
+
+
+def infer_term(data):
+    """Term for scheduling course data (dict or CourseData) without a term.json, None if nothing has a date.
+
+    The syllabi's own class dates when they give them. Otherwise it runs from
+    LEAD_DAYS before the first assignment or test to the last one, so classes
+    take time on every day study blocks can go, whatever year the course is
+    in; reading weeks and holidays are then unknown and classes are taken to
+    meet every week. Only for scheduling, the export leaves classes out
+    rather than guess.
+    """
+    term = syllabus_term(data)
+    if term is not None:
+        return term
+    due_dates = []
+    for section in ("assignments", "tests"):
+        for record in iter_records(data, section):
+            try:
+                due_dates.append(to_date(record.due_date))
+            except (TypeError, ValueError):
+                continue  # no usable date
+    if not due_dates:
+        return None
+    return Term(min(due_dates) - timedelta(days=LEAD_DAYS), max(due_dates))
+
+
+# [start, end) cut at every midnight it spans
+def split_days(start, end):
+    pieces = []
+    while start < end:
+        midnight = datetime.combine(start.date() + timedelta(days=1), time())
+        pieces.append((start, min(end, midnight)))
+        start = midnight
+    return pieces
+
+
+# Round a time up to the next whole hour
+def ceil_hour(t):
+    return t.hour + (1 if (t.minute or t.second or t.microsecond) else 0)
+
+
+def weekly_hours(schedule):
+    """Bitmap per weekday (0 = Monday) of the hour slots the class sessions take in a week.
+
+    The same slots OccurrenceIndex.busy_hours gives for a day the classes
+    meet, for code that lays the week out over the term itself.
+    """
+    masks = [0] * 7
+    for session in schedule:
+        try:
+            start_time, end_time = to_time_range(session.time)
+        except (AttributeError, TypeError, ValueError):
+            continue
+        if not start_time or not end_time:
+            continue
+        lo, hi = ceil_hour(start_time), ceil_hour(end_time)
+        if hi <= lo:
+            continue
+        for day in set(session.days or ()):
+            if day in WEEKDAYS:
+                masks[WEEKDAYS.index(day)] |= (1 << hi) - (1 << lo)
+    return masks
+
+
+class OccurrenceIndex:
+    """Concrete class meetings of a schedule within a term.
+
+    `schedule` is the merged course data (dict or CourseData), or a list of
+    ClassSession records or schedule dicts. Without a `term` it is inferred
+    from the course data (see infer_term); a bare list or course data without
+    dates then gives no class meetings. Sessions whose time or days can't be
+    read have no meetings. `busy` adds other (start, end) datetimes, e.g.
+    from ics_import.load_busy; they are split at midnight and have session
+    position BUSY.
+    """
+
+    def __init__(self, schedule, term=None, busy=()):
+        if isinstance(schedule, list):
+            schedule = [ClassSession.from_dict(session) if isinstance(session, dict) else session
+                        for session in schedule]
+        else:
+            term = term or infer_term(schedule)
+            schedule = list(iter_records(schedule, "schedule"))
+        self.term = term
+        meetings = []
+        # Per session: sorted meeting starts, and starts skipped for an exclusion
+        self.session_starts = []
+        self.session_skipped = []
+        for position, session in enumerate(schedule):
+            starts, skipped = self._expand(session)
+            for start, end in starts:
+                meetings.append((start, end, position))
+            self.session_starts.append([start for start, _ in starts])
+            self.session_skipped.append(skipped)
+        for start, end in busy:
+            meetings.extend((piece_start, piece_end, BUSY) for piece_start, piece_end in split_days(start, end))
+        meetings.sort()
+        self.meetings = meetings
+        self.starts = [start for start, _, _ in meetings]
+        self.longest = max((end - start for start, end, _ in meetings), default=timedelta(0))
+        self._busy = {}
+
+    def _expand(self, session):
+        try:
+            start_time, end_time = to_time_range(session.time)
+        except (AttributeError, TypeError, ValueError):
+            return [], []
+        if not start_time or not end_time:
+            return [], []
+        term = self.term
+        if term is None:
+            return [], []
+        weekdays = sorted({WEEKDAYS.index(day) for day in session.days or () if day in WEEKDAYS})
+        starts, skipped = [], []
+        for weekday in weekdays:
+            day = term.start + timedelta(days=(weekday - term.start.weekday()) % 7)
+            while day <= term.end:
+                start = datetime.combine(day, start_time)
+                if term.excluded(day):
+                    skipped.append(start)
+                else:
+                    starts.append((start, datetime.combine(day, end_time)))
+                day += timedelta(days=7)
+        starts.sort()
+        skipped.sort()
+        return starts, skipped
+
+    def __len__(self):
+        return len(self.meetings)
+
+    def between(self, start, end):
+        """(start, end, session position) of meetings overlapping [start, end)."""
+        lo = bisect.bisect_left(self.starts, start - self.longest)
+        hi = bisect.bisect_left(self.starts, end)
+        return [meeting for meeting in self.meetings[lo:hi] if meeting[1] > start]
+
+    def on_day(self, day):
+        """(start, end, session position) of meetings starting on `day`, in order."""
+        midnight = datetime.combine(day, time())
+        lo = bisect.bisect_left(self.starts, midnight)
+        hi = bisect.bisect_left(self.starts, midnight + timedelta(days=1), lo)
+        return self.meetings[lo:hi]
+
+    def busy_hours(self, day):
+        """Bitmap of the hour slots of `day` taken by classes.
+
+        A slot is taken when it starts inside a class, so a 14:30–16:30 class
+        takes the 15:00 and 16:00 slots. Other busy time takes every slot it
+        overlaps.
+        """
+        mask = self._busy.get(day)
+        if mask is None:
+            mask = 0
+            for start, end, position in self.on_day(day):
+                lo = start.hour if position == BUSY else ceil_hour(start.time())
+                hi = 24 if end.date() > day else ceil_hour(end.time())
+                if hi > lo:
+                    mask |= (1 << hi) - (1 << lo)
+            self._busy[day] = mask
+        return mask
+
+    def first_meeting(self, position):
+        """Start of the first meeting of the session at `position`, None if it never meets."""
+        starts = self.session_starts[position]
+        return starts[0] if starts else None
+
+    def skipped_meetings(self, position):
+        """Starts of the session's meetings dropped for an exclusion, after its first meeting."""
+        first = self.first_meeting(position)
+        if first is None:
+            return []
+        return [start for start in self.session_skipped[position] if start > first]
@@ -1,8 +1,96 @@
 import fitz  # PyMuPDF
+import re
+from concurrent.futures import ProcessPoolExecutor
 
-def extract_text_from_pdf(pdf_path):
-    doc = fitz.open(pdf_path)
-    text = ""
-    for page in doc:
-        text += page.get_text()
+from instrumentation import span
+
+# Documents shorter than this are read in-process, spawning workers costs more
+PARALLEL_MIN_PAGES = 64
+
+MONTH = (r"(?:jan(?:uary)?|feb(?:ruary)?|mar(?:ch)?|apr(?:il)?|may|june?|july?|aug(?:ust)?|"
+         r"sep(?:t(?:ember)?)?|oct(?:ober)?|nov(?:ember)?|dec(?:ember)?)\.?")
+TIME = r"\d{1,2}(?::?\d{2})?"
+# Dates, class times, weights and deadline keywords worth sending to the LLM.
+# Bare month or weekday names, "assignment" or "lecture" are on nearly every
+# page of a syllabus, so they don't count on their own.
+SCHEDULE_PATTERN = re.compile(
+    rf"\b{MONTH}\s+\d{{1,2}}(?:st|nd|rd|th)?\b|\b\d{{1,2}}(?:st|nd|rd|th)?\s+{MONTH}"
+    rf"|\b{TIME}\s*(?:[ap]\.?m\.?)?\s*[–-]\s*{TIME}\s*[ap]\.?m\b|\b\d{{1,2}}:\d{{2}}\s*[ap]\.?m\b"
+    r"|\b(?:due|deadlines?|exams?|examinations?|midterms?|quiz(?:zes)?|weight(?:ing)?|grading)\b"
+    r"|\d+(?:\.\d+)?\s*%|\b\d{4}-\d{2}-\d{2}\b|\b\d{1,2}/\d{1,2}/\d{2,4}\b",
+    re.IGNORECASE,
+)
+# Lines kept on either side of a matching line when pruning sections
+SECTION_CONTEXT = 2
+# Lines on more than half the pages of a document this long are headers or footers
+HEADER_MIN_PAGES = 3
+
+def _extract_page_range(pdf_path, start, stop):
+    with fitz.open(pdf_path) as doc:
+        return [doc[i].get_text() for i in range(start, stop)]
+
+# Extract the text of every page, reading page ranges in parallel worker processes
+# for long documents
+def extract_pages_from_pdf(pdf_path, workers=1):
+    with fitz.open(pdf_path) as doc:
+        page_count = doc.page_count
+
+    if workers <= 1 or page_count < PARALLEL_MIN_PAGES:
+        return _extract_page_range(pdf_path, 0, page_count)
+
+    step = -(-page_count // workers)
+    ranges = [(start, min(start + step, page_count)) for start in range(0, page_count, step)]
+    with ProcessPoolExecutor(max_workers=len(ranges)) as pool:
+        parts = pool.map(_extract_page_range, [pdf_path] * len(ranges),
+                         [start for start, _ in ranges], [stop for _, stop in ranges])
+        return [page for part in parts for page in part]
+
+# Stripped lines repeated on most pages, e.g. "Last updated: 8 January 2025"
+def _repeated_lines(pages):
+    if len(pages) < HEADER_MIN_PAGES:
+        return set()
+    counts = {}
+    for page in pages:
+        for line in {line.strip() for line in page.splitlines()}:
+            counts[line] = counts.get(line, 0) + 1
+    return {line for line, count in counts.items() if line and count * 2 > len(pages)}
+
+def _matches(line, repeated):
+    return line.strip() not in repeated and SCHEDULE_PATTERN.search(line) is not None
+
+# Keep only the pages (prune="pages") or the lines around matches (prune="sections")
+# that mention dates, weights or schedule keywords, not counting page headers
+# and footers. The first page is always kept since it usually carries the
+# course code and meeting times.
+def prune_pages(pages, prune="pages"):
+    repeated = _repeated_lines(pages)
+    kept = []
+    for index, page in enumerate(pages):
+        if index == 0:
+            kept.append(page)
+        elif not any(_matches(line, repeated) for line in page.splitlines()):
+            continue
+        elif prune == "sections":
+            kept.append(_prune_lines(page, repeated))
+        else:
+            kept.append(page)
+    return kept
+
+def _prune_lines(page, repeated=frozenset()):
+    lines = page.splitlines(keepends=True)
+    keep = [False] * len(lines)
+    for i, line in enumerate(lines):
+        if _matches(line, repeated):
+            for j in range(max(0, i - SECTION_CONTEXT), min(len(lines), i + SECTION_CONTEXT + 1)):
+                keep[j] = True
+    return "".join(line for line, flag in zip(lines, keep) if flag)
+
+def extract_text_from_pdf(pdf_path, workers=1, prune=None):
+    with span("extract_text_from_pdf", path=pdf_path) as trace:
+        pages = extract_pages_from_pdf(pdf_path, workers)
+        trace.set(pages=len(pages))
+        if prune:
+            pages = prune_pages(pages, prune)
+        text = "".join(pages)
+        trace.set(chars=len(text))
     return text
@@ -0,0 +1,514 @@
+import fitz  # PyMuPDF
+import re
+from collections import Counter
+from datetime import date
+
+# Rule-based syllabus extractor. Reads the grading table with PyMuPDF's table
+# finder and the class times with regexes, producing the same JSON shape as
+# llm_syllabus_parser. Each result comes with a confidence score so callers can
+# decide whether an LLM pass is still needed.
+
+# Bump whenever the rules below change so cached extractions are invalidated
+RULES_VERSION = "3"
+
+MONTHS = {
+    "jan": 1, "feb": 2, "mar": 3, "apr": 4, "may": 5, "jun": 6,
+    "jul": 7, "aug": 8, "sep": 9, "oct": 10, "nov": 11, "dec": 12,
+}
+WEEKDAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+
+MONTH = (r"(jan(?:uary)?|feb(?:ruary)?|mar(?:ch)?|apr(?:il)?|may|june?|july?|aug(?:ust)?|"
+         r"sep(?:t(?:ember)?)?|oct(?:ober)?|nov(?:ember)?|dec(?:ember)?)\.?")
+DATE_PATTERN = re.compile(
+    rf"\b{MONTH}\s+(\d{{1,2}})(?:st|nd|rd|th)?\b"          # January 20, Jan 14
+    rf"|\b(\d{{1,2}})(?:st|nd|rd|th)?\s+{MONTH}"            # 30th Jan, 1st March
+    r"|\b(\d{4})-(\d{2})-(\d{2})\b",                        # 2025-01-20
+    re.IGNORECASE,
+)
+DATE_RANGE_PATTERN = re.compile(
+    rf"\b{MONTH}\s+(\d{{1,2}})\s*(?:–|-|to)\s*(?:{MONTH}\s+)?(\d{{1,2}})\b", re.IGNORECASE
+)
+CLOCK_PATTERN = re.compile(r"\b(\d{1,2})(?::(\d{2}))?\s*([ap])\.?\s*m\b\.?", re.IGNORECASE)
+WEIGHT_PATTERN = re.compile(r"(\d+(?:\.\d+)?)\s*%")
+EACH_WEIGHT_PATTERN = re.compile(r"(\d+(?:\.\d+)?)\s*%\s*each", re.IGNORECASE)
+YEAR_PATTERN = re.compile(r"\b(20\d{2})\b")
+TEST_PATTERN = re.compile(r"\b(quiz(zes)?|exam(ination)?s?|midterms?|tests?)\b", re.IGNORECASE)
+COURSE_NAME_PATTERN = re.compile(r"^\s*([A-Z][A-Za-z]+\s+\d{4}[A-Z]?:\s*\S.*?)\s*$", re.MULTILINE)
+LOCATION_PATTERN = re.compile(r"\b(?:Room|Rm\.?)\s+[A-Z]*-?\d+[A-Z]?\b")
+
+DAY = r"(?:mon|tues?|wed(?:nes)?|thu(?:rs?)?|fri|sat(?:ur)?|sun)(?:day)?s?"
+TIME = r"\d{1,2}(?::?\d{2})?(?!\d)"
+CLASS_TIME_PATTERN = re.compile(
+    rf"\b({DAY}(?:\s*(?:,|/|&|and)\s*{DAY})*)[\s,:]*(?:from\s+)?"
+    rf"({TIME})\s*(?:([ap])\.?m\.?)?\s*(?:–|-|—|to)\s*({TIME})\s*(?:([ap])\.?m\.?)?",
+    re.IGNORECASE,
+)
+# Weekly times that are not class meetings
+NOT_CLASS_PATTERN = re.compile(r"\b(?:office|lab|TA|help|mentorship)\s+hours?\b", re.IGNORECASE)
+
+# Header keywords that identify the columns of a grading table
+TITLE_HEADER = re.compile(r"assess|evaluat|component|deliverable|assignment|item|task", re.IGNORECASE)
+WEIGHT_HEADER = re.compile(r"weight|worth|value|marks|%", re.IGNORECASE)
+DUE_HEADER = re.compile(r"due|date|deadline|when", re.IGNORECASE)
+
+# Labels of an "Important dates" table: the first and last day of classes,
+# breaks without classes, and other rows whose dates only need to be skipped
+TERM_LABELS = [
+    ("start", re.compile(r"(?:classes|lectures)\s+(?:begin|start)s?|first\s+day\s+of\s+(?:classes|lectures)", re.IGNORECASE)),
+    ("end", re.compile(r"(?:classes|lectures)\s+end|last\s+day\s+of\s+(?:classes|lectures)", re.IGNORECASE)),
+    ("break", re.compile(r"(?:reading|study|spring|fall|winter|mid-?term)\s+(?:week|break)", re.IGNORECASE)),
+    ("other", re.compile(r"study\s+days?(?:\s*\(s\))?|exams?(?:\s+period)?|examinations?", re.IGNORECASE)),
+]
+# Longer cells are prose, not table labels
+MAX_LABEL_LENGTH = 40
+
+# Date ranges at least this long are taken as term-level periods (reading week, exams)
+MIN_PERIOD_DAYS = 7
+# Weights within this many points of 100 count as a complete grading scheme
+WEIGHT_TOLERANCE = 5
+# Class meetings outside this length in minutes are probably misread
+MIN_CLASS_MINUTES = 50
+MAX_CLASS_MINUTES = 240
+
+
+def infer_year(text):
+    """Most frequently mentioned year in the document, falling back to the current year."""
+    years = Counter(YEAR_PATTERN.findall(text))
+    return int(years.most_common(1)[0][0]) if years else date.today().year
+
+
+def _month(name):
+    return MONTHS[name[:3].lower()]
+
+
+def parse_date(text, year):
+    """First date in `text` as YYYY-MM-DD, or None."""
+    for match in DATE_PATTERN.finditer(text):
+        groups = match.groups()
+        try:
+            if groups[0]:
+                return date(year, _month(groups[0]), int(groups[1])).isoformat()
+            if groups[2]:
+                return date(year, _month(groups[3]), int(groups[2])).isoformat()
+            return date(int(groups[4]), int(groups[5]), int(groups[6])).isoformat()
+        except ValueError:
+            continue
+    return None
+
+
+def parse_clock(text):
+    """First time of day in `text` as HH:MM, or "N/A"."""
+    if re.search(r"\bnoon\b", text, re.IGNORECASE):
+        return "12:00"
+    if re.search(r"\bmidnight\b", text, re.IGNORECASE):
+        return "23:59"
+    match = CLOCK_PATTERN.search(text)
+    if match is None:
+        return "N/A"
+    hour = int(match.group(1)) % 12 + (12 if match.group(3).lower() == "p" else 0)
+    return f"{hour:02d}:{match.group(2) or '00'}"
+
+
+def _split_time(value):
+    # "130" -> (1, 30), "2:30" -> (2, 30), "11" -> (11, 0)
+    value = value.replace(":", "")
+    if len(value) <= 2:
+        return int(value), 0
+    return int(value[:-2]), int(value[-2:])
+
+
+def parse_time_range(start, start_meridiem, end, end_meridiem):
+    """Class time range as "HH:MM–HH:MM", or None if it cannot be read unambiguously."""
+    if not (start_meridiem or end_meridiem or (":" in start and ":" in end)):
+        return None
+    start_hour, start_minute = _split_time(start)
+    end_hour, end_minute = _split_time(end)
+    if start_hour > 24 or end_hour > 24 or start_minute > 59 or end_minute > 59:
+        return None
+
+    if end_meridiem:
+        end_hour = end_hour % 12 + (12 if end_meridiem.lower() == "p" else 0)
+    if start_meridiem:
+        start_hour = start_hour % 12 + (12 if start_meridiem.lower() == "p" else 0)
+    elif end_meridiem and end_meridiem.lower() == "p" and start_hour + 12 <= end_hour:
+        # "2:30-4:30PM" means 14:30-16:30
+        start_hour += 12
+
+    if (start_hour, start_minute) >= (end_hour, end_minute):
+        return None
+    return f"{start_hour:02d}:{start_minute:02d}–{end_hour:02d}:{end_minute:02d}"
+
+
+def _normalize_day(name):
+    prefix = name[:3].lower()
+    return next(day for day in WEEKDAYS if day[:3].lower() == prefix)
+
+
+def _is_class_time(text, match):
+    # Office, lab or TA hours on the match's line, or on the line above when
+    # the match starts its line ("Office hours:\nWed 2-3pm")
+    line_start = text.rfind("\n", 0, match.start()) + 1
+    line_end = text.find("\n", match.end())
+    context = text[line_start:len(text) if line_end == -1 else line_end]
+    if not text[line_start:match.start()].strip():
+        context = text[text.rfind("\n", 0, max(line_start - 1, 0)) + 1:line_start] + context
+    return NOT_CLASS_PATTERN.search(context) is None
+
+
+def extract_class_schedule(text):
+    """Schedule entries from "Tuesday 1:30-3:30pm" style mentions in the text.
+
+    Times on a line about office, lab or TA hours are left out.
+    """
+    name_match = COURSE_NAME_PATTERN.search(text)
+    name = name_match.group(1) if name_match else "N/A"
+    location_match = LOCATION_PATTERN.search(text)
+    location = location_match.group(0) if location_match else "N/A"
+
+    schedule = []
+    seen = set()
+    for match in CLASS_TIME_PATTERN.finditer(text):
+        time_range = parse_time_range(match.group(2), match.group(3), match.group(4), match.group(5))
+        if time_range is None or not _is_class_time(text, match):
+            continue
+        days = []
+        for day in re.findall(DAY, match.group(1), re.IGNORECASE):
+            day = _normalize_day(day)
+            if day not in days:
+                days.append(day)
+        if (tuple(days), time_range) in seen:
+            continue
+        seen.add((tuple(days), time_range))
+        schedule.append({"name": name, "days": days, "time": time_range, "location": location})
+    return schedule
+
+
+def find_exam_period_start(text, year):
+    """Start of the latest long date range in the text, which syllabi use for the exam period."""
+    starts = []
+    for match in DATE_RANGE_PATTERN.finditer(text):
+        start_month, start_day, end_month, end_day = match.groups()
+        try:
+            start = date(year, _month(start_month), int(start_day))
+            end = date(year, _month(end_month or start_month), int(end_day))
+        except ValueError:
+            continue
+        if (end - start).days >= MIN_PERIOD_DAYS:
+            starts.append(start)
+    return max(starts).isoformat() if starts else None
+
+
+def _term_label(cell):
+    # (kind, label text) when the cell starts with a term label, else None
+    for kind, pattern in TERM_LABELS:
+        match = pattern.match(cell)
+        if match is not None:
+            return kind, match.group(0)
+    return None
+
+
+def _date_span(text, year):
+    # (first, last) day of a date or date range at the start of `text`, else None
+    match = DATE_RANGE_PATTERN.match(text)
+    if match is not None:
+        start_month, start_day, end_month, end_day = match.groups()
+        try:
+            return (date(year, _month(start_month), int(start_day)),
+                    date(year, _month(end_month or start_month), int(end_day)))
+        except ValueError:
+            return None
+    match = DATE_PATTERN.match(text)
+    if match is not None:
+        day = parse_date(match.group(0), year)
+        if day is not None:
+            day = date.fromisoformat(day)
+            return day, day
+    return None
+
+
+def extract_term(text, year):
+    """First and last day of classes and breaks from the syllabus's "Important dates".
+
+    Returns {"start", "end", "exclusions"} as in term.json, or None when the
+    dates of both ends can't be found. Labels are matched to the dates after
+    them in order, so a table whose labels and dates come out of the PDF as two
+    runs ("Classes Begin, Reading Week, Classes End, January 6, February
+    15–23, April 4") reads the same as "Classes begin: January 6".
+    """
+    found = {}
+    breaks = []
+    pending = []
+    for cell in re.split(r"[\t\n]", text):
+        cell = cell.strip(" :–-")
+        if not cell:
+            continue
+        label = _term_label(cell)
+        if label is not None and len(cell) <= MAX_LABEL_LENGTH:
+            rest = cell[len(label[1]):].strip(" :–-\t")
+            if not rest:
+                pending.append(label)
+                continue
+            # "Classes begin: January 6"; other text after the label is prose
+            span = _date_span(rest, year)
+            if span is None:
+                continue
+        else:
+            span = _date_span(cell, year)
+            if span is None:
+                if len(cell) > MAX_LABEL_LENGTH:
+                    pending = []  # prose between a label and a date, they don't belong together
+                continue
+            if not pending:
+                continue
+            label = pending.pop(0)
+
+        kind, name = label
+        if kind == "start":
+            found.setdefault("start", span[0])
+        elif kind == "end":
+            found.setdefault("end", span[1])
+        elif kind == "break":
+            breaks.append((span[0], span[1], " ".join(name.split()).capitalize()))
+
+    start, end = found.get("start"), found.get("end")
+    if start is None or end is None:
+        return None
+    if end < start:
+        # A fall-to-winter term mentions only one year
+        end = end.replace(year=end.year + 1)
+    return {
+        "start": start.isoformat(),
+        "end": end.isoformat(),
+        "exclusions": [{"name": name, "start": first.isoformat(), "end": last.isoformat()}
+                       for first, last, name in breaks if start <= first and last <= end],
+    }
+
+
+def clean_title(text):
+    title = " ".join(text.split())
+    # Drop trailing notes such as "- covers lectures 1-6" or "(3), 1st quiz, ..."
+    title = re.split(r"\s[–-]\s|\s[–-]$|\s*\(\d", title)[0]
+    return title.strip(" ,;:-–")
+
+
+def _find_columns(row):
+    """Map a header row to (title, weight, due) column indexes, or None if it is not one."""
+    columns = {}
+    for index, cell in enumerate(row):
+        if not cell:
+            continue
+        for name, pattern in (("title", TITLE_HEADER), ("weight", WEIGHT_HEADER), ("due", DUE_HEADER)):
+            if name not in columns and pattern.search(cell):
+                columns[name] = index
+                break
+        else:
+            columns.setdefault("other", []).append(index)
+    if not all(name in columns for name in ("title", "weight", "due")):
+        return None
+    return columns
+
+
+def _column_of(index, columns):
+    # Merged header cells can be offset from the data cells below them, so each
+    # data cell belongs to the nearest header, ties going to the left one
+    headers = [(columns[name], name) for name in ("title", "weight", "due")]
+    headers += [(other, "other") for other in columns.get("other", [])]
+    return min(headers, key=lambda header: (abs(header[0] - index), header[0]))[1]
+
+
+def extract_table_items(rows, year):
+    """Assessment rows of one grading table as a list of item dicts."""
+    columns = None
+    groups = []
+    group = None
+    for row in rows:
+        if columns is None:
+            columns = _find_columns(row)
+            if columns is not None:
+                first_title = next(i for i in range(len(row)) if _column_of(i, columns) == "title")
+            continue
+
+        cells = {"title": [], "weight": [], "due": []}
+        group_cell = None
+        for index, cell in enumerate(row):
+            if cell is None or not cell.strip():
+                continue
+            column = _column_of(index, columns)
+            if column in cells:
+                cells[column].append(cell)
+                if index == first_title:
+                    group_cell = cell
+        if not cells["title"]:
+            continue
+
+        # A row whose first title cell is empty continues the group above it (merged cells)
+        if group_cell is not None:
+            group = {"title": clean_title(group_cell), "items": []}
+            groups.append(group)
+            parts = cells["title"][1:]
+        elif group is None:
+            continue
+        else:
+            parts = cells["title"]
+        title = group["title"]
+        if parts:
+            title = f"{title} – {clean_title(' '.join(parts))}"
+
+        weight_text = " ".join(cells["weight"])
+        due_text = " ".join(cells["due"])
+        weight_match = WEIGHT_PATTERN.search(weight_text)
+        each_match = EACH_WEIGHT_PATTERN.search(weight_text)
+
+        # One line per occurrence, e.g. three quiz dates in one cell
+        dates = [parse_date(line, year) for line in due_text.splitlines()]
+        dates = [day for day in dates if day] or [None]
+        if weight_match is None:
+            weights = [None] * len(dates)
+        elif each_match is not None:
+            weights = [float(each_match.group(1))] * len(dates)
+        else:
+            weights = [float(weight_match.group(1)) / len(dates)] * len(dates)
+
+        time = parse_clock(re.sub(DATE_PATTERN, "", due_text))
+        for number, (due, weight) in enumerate(zip(dates, weights), 1):
+            item = {
+                "title": f"{title} {number}" if len(dates) > 1 else title,
+                "date": due,
+                "time": time,
+                "weight": weight,
+            }
+            group["items"].append(item)
+
+    for group in groups:
+        _share_group_weight(group["items"])
+    return [item for group in groups for item in group["items"]]
+
+
+def _share_group_weight(items):
+    # Items without a weight of their own split the weight of the weighted item above them
+    runs = []
+    for item in items:
+        if item["weight"] is not None or not runs:
+            runs.append([item])
+        else:
+            runs[-1].append(item)
+    for run in runs:
+        if run[0]["weight"] is not None:
+            share = run[0]["weight"] / len(run)
+            for item in run:
+                item["weight"] = share
+
+
+def _find_grading_items(pdf_path, year):
+    items = []
+    with fitz.open(pdf_path) as doc:
+        for page in doc:
+            # Table detection is slow, only look at pages that mention a weight
+            if WEIGHT_PATTERN.search(page.get_text()) is None:
+                continue
+            for table in page.find_tables().tables:
+                items.extend(extract_table_items(table.extract(), year))
+    return items
+
+
+def _format_weight(weight):
+    if weight is None:
+        return 0
+    weight = round(weight, 2)
+    return int(weight) if weight == int(weight) else weight
+
+
+def build_output(items, schedule, exam_start, term=None):
+    """Sort table items into the assignments/tests/schedule JSON shape, with `term` if found."""
+    lecture_times = {}
+    for entry in schedule:
+        for day in entry["days"]:
+            lecture_times.setdefault(day, entry["time"].split("–")[0])
+
+    data = {"assignments": [], "tests": [], "schedule": schedule}
+    for item in items:
+        is_test = TEST_PATTERN.search(item["title"]) is not None
+        due = item["date"]
+        if due is None and is_test:
+            due = exam_start
+        time = item["time"]
+        if time == "N/A" and due is not None:
+            # Assessments on a lecture day take place during the lecture
+            time = lecture_times.get(WEEKDAYS[date.fromisoformat(due).weekday()], "N/A")
+
+        if is_test:
+            data["tests"].append({
+                "title": item["title"],
+                "date": due or "N/A",
+                "time": time,
+                "weight": _format_weight(item["weight"]),
+            })
+        else:
+            data["assignments"].append({
+                "title": item["title"],
+                "due_date": due or "N/A",
+                "due_time": time,
+                "weight": _format_weight(item["weight"]),
+                "difficulty": 6,
+            })
+    if term is not None:
+        data["term"] = term
+    return data
+
+
+def _minutes(clock):
+    hours, minutes = clock.split(":")
+    return int(hours) * 60 + int(minutes)
+
+
+def _schedule_score(schedule):
+    # Share of sessions that look like classes: a plausible length and no overlap
+    # with another session on the same day
+    spans = []
+    for entry in schedule:
+        start, end = entry["time"].split("–")
+        spans.append((set(entry["days"]), _minutes(start), _minutes(end)))
+    plausible = 0
+    for i, (days, start, end) in enumerate(spans):
+        overlaps = any(days & other_days and start < other_end and other_start < end
+                       for j, (other_days, other_start, other_end) in enumerate(spans) if j != i)
+        if days and MIN_CLASS_MINUTES <= end - start <= MAX_CLASS_MINUTES and not overlaps:
+            plausible += 1
+    return plausible / len(spans)
+
+
+def score_confidence(data):
+    """0-1 score: share of dated items, scaled down when the weights don't add up to 100
+    and by the share of class sessions that look misread. A missing schedule doesn't
+    count, missing_sections asks the LLM for it.
+    """
+    items = data["assignments"] + data["tests"]
+    if not items:
+        return 0.0
+    dated = sum(1 for item in items if item.get("due_date", item.get("date")) != "N/A")
+    total = sum(item["weight"] for item in items)
+    if abs(total - 100) <= WEIGHT_TOLERANCE:
+        weight_score = 1.0
+    else:
+        weight_score = max(0.0, 1 - abs(total - 100) / 100)
+    schedule_score = _schedule_score(data["schedule"]) if data["schedule"] else 1.0
+    return round(dated / len(items) * weight_score * schedule_score, 3)
+
+
+def missing_sections(data):
+    """Sections the rules could not fill and that should come from the LLM."""
+    missing = []
+    if not data["assignments"] and not data["tests"]:
+        missing += ["assignments", "tests"]
+    if not data["schedule"]:
+        missing.append("schedule")
+    return missing
+
+
+def extract_schedule_rules(pdf_path, text):
+    """Extract syllabus data without the LLM. Returns (data, confidence)."""
+    year = infer_year(text)
+    items = _find_grading_items(pdf_path, year)
+    schedule = extract_class_schedule(text)
+    data = build_output(items, schedule, find_exam_period_start(text, year), extract_term(text, year))
+    return data, score_confidence(data)
@@ -0,0 +1,190 @@
+import json
+import os
+
+# Optional SQLite store for a student's merged course data, kept next to
+# syllabus_matched.json as course_data.sqlite. When the file exists the
+# pipeline reads and edits the course data there instead of rewriting the
+# JSON file: single entries are updated or deleted in their own transaction
+# and date ranges are looked up through an index, so edits stay cheap as the
+# history grows. `python cli.py db ROOT` creates the store from the JSON file
+# and `--export` writes the JSON back.
+#
+# Every row keeps the original JSON object in `data`; course, title and date
+# are copied into indexed columns for lookups. Rows come back in insertion
+# order, so importing and exporting gives the same JSON.
+STORE_NAME = "course_data.sqlite"
+
+# Merged JSON section -> (table, date field, title field)
+SECTIONS = {
+    "assignments": ("assignments", "due_date", "title"),
+    "tests": ("tests", "date", "title"),
+    "schedule": ("sessions", None, "name"),
+    "study_blocks": ("blocks", "date", "title"),
+}
+# Sections merge_json rebuilds from the parsed syllabi
+SYLLABUS_SECTIONS = ("assignments", "tests", "schedule")
+# Other keys it writes, kept with the key order in the meta table
+SYLLABUS_EXTRA = ("terms",)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS courses (id INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+""" + "".join(f"""
+CREATE TABLE IF NOT EXISTS {table} (
+    id INTEGER PRIMARY KEY,
+    course_id INTEGER NOT NULL REFERENCES courses(id),
+    title TEXT,
+    date TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS {table}_date ON {table}(date);
+CREATE INDEX IF NOT EXISTS {table}_course ON {table}(course_id);
+""" for table, _, _ in SECTIONS.values())
+
+
+def store_path_for(json_path):
+    """Path of the store next to a merged JSON file, or None when there is no store."""
+    path = os.path.join(os.path.dirname(json_path) or ".", STORE_NAME)
+    return path if os.path.exists(path) else None
+
+
+class CourseStore:
+    def __init__(self, path):
+        # Imported here so `import main` stays fast for students without a store
+        import sqlite3
+
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA foreign_keys = ON")
+        self.conn.executescript(SCHEMA)
+        self._course_ids = {}
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    def _course_id(self, name):
+        course_id = self._course_ids.get(name)
+        if course_id is None:
+            self.conn.execute("INSERT OR IGNORE INTO courses (name) VALUES (?)", (name,))
+            course_id = self.conn.execute("SELECT id FROM courses WHERE name = ?", (name,)).fetchone()[0]
+            self._course_ids[name] = course_id
+        return course_id
+
+    def _columns(self, section, record):
+        _, date_field, title_field = SECTIONS[section]
+        date = record.get(date_field) if date_field else None
+        return (self._course_id(record.get("course") or ""), record.get(title_field),
+                date if isinstance(date, str) else None, json.dumps(record, ensure_ascii=False))
+
+    def _insert(self, section, records):
+        table = SECTIONS[section][0]
+        self.conn.executemany(f"INSERT INTO {table} (course_id, title, date, data) VALUES (?, ?, ?, ?)",
+                              [self._columns(section, record) for record in records])
+
+    def _get_meta(self, key, default=None):
+        row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def _set_meta(self, key, value):
+        self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, json.dumps(value)))
+
+    def import_course_data(self, data):
+        """Replace everything in the store with the merged course data dict."""
+        with self.conn:
+            for table, _, _ in SECTIONS.values():
+                self.conn.execute(f"DELETE FROM {table}")
+            self.conn.execute("DELETE FROM courses")
+            self._course_ids.clear()
+            extra = {}
+            for key, value in data.items():
+                if key in SECTIONS and isinstance(value, list):
+                    self._insert(key, value)
+                else:
+                    extra[key] = value
+            # Key order and non-section keys, so export gives back the same JSON
+            self._set_meta("keys", list(data))
+            self._set_meta("extra", extra)
+
+    def export_course_data(self):
+        """The merged course data dict, as syllabus_matched.json holds it."""
+        extra = self._get_meta("extra", {})
+        data = {}
+        for key in self._get_meta("keys", list(SYLLABUS_SECTIONS)):
+            data[key] = extra[key] if key in extra else [record for _, record in self.items(key)]
+        return data
+
+    def replace_courses(self, data, courses, keep):
+        """Reload the syllabus sections of `courses` from merged data and drop courses not in `keep`."""
+        with self.conn:
+            stale = [name for (name,) in self.conn.execute("SELECT name FROM courses") if name not in keep]
+            for name in list(courses) + stale:
+                course_id = self._course_id(name)
+                for section in SYLLABUS_SECTIONS:
+                    self.conn.execute(f"DELETE FROM {SECTIONS[section][0]} WHERE course_id = ?", (course_id,))
+            for section in SYLLABUS_SECTIONS:
+                self._insert(section, [record for record in data.get(section, [])
+                                       if (record.get("course") or "") in courses])
+            keys = self._get_meta("keys", list(SYLLABUS_SECTIONS))
+            extra = self._get_meta("extra", {})
+            for key in SYLLABUS_EXTRA:
+                if key in data:
+                    extra[key] = data[key]
+                    if key not in keys:
+                        keys.append(key)
+                else:
+                    extra.pop(key, None)
+                    if key in keys:
+                        keys.remove(key)
+            self._set_meta("keys", keys)
+            self._set_meta("extra", extra)
+
+    def replace_blocks(self, blocks):
+        """Store a new set of study blocks, as merge_blocks_into_course_json does for the JSON file."""
+        with self.conn:
+            self.conn.execute("DELETE FROM blocks")
+            self._insert("study_blocks", blocks)
+            keys = self._get_meta("keys", list(SYLLABUS_SECTIONS))
+            if "study_blocks" not in keys:
+                self._set_meta("keys", keys + ["study_blocks"])
+
+    def items(self, section):
+        """[(row id, record)] of a section in stored order."""
+        table = SECTIONS[section][0]
+        return [(row_id, json.loads(data))
+                for row_id, data in self.conn.execute(f"SELECT id, data FROM {table} ORDER BY id")]
+
+    def get(self, section, row_id):
+        row = self.conn.execute(f"SELECT data FROM {SECTIONS[section][0]} WHERE id = ?", (row_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def update(self, section, row_id, **fields):
+        """Change fields of one entry in its own transaction. Returns the updated record, None if missing."""
+        table = SECTIONS[section][0]
+        with self.conn:
+            record = self.get(section, row_id)
+            if record is None:
+                return None
+            record.update(fields)
+            self.conn.execute(f"UPDATE {table} SET course_id = ?, title = ?, date = ?, data = ? WHERE id = ?",
+                              (*self._columns(section, record), row_id))
+        return record
+
+    def delete(self, section, row_id):
+        with self.conn:
+            self.conn.execute(f"DELETE FROM {SECTIONS[section][0]} WHERE id = ?", (row_id,))
+
+    def between(self, section, start, end, course=None):
+        """Records of a dated section with start <= date <= end (ISO strings), optionally for one course."""
+        table = SECTIONS[section][0]
+        query = f"SELECT data FROM {table} WHERE date BETWEEN ? AND ?"
+        params = [start, end]
+        if course is not None:
+            query += " AND course_id = (SELECT id FROM courses WHERE name = ?)"
+            params.append(course)
+        return [json.loads(data) for (data,) in self.conn.execute(query + " ORDER BY date, id", params)]
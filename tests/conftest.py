@@ -0,0 +1,48 @@
+import copy
+import json
+import os
+import sys
+from datetime import date, timedelta
+
+import pytest
+
+# The modules live at the top of the repository, not in a package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+WEEKDAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+with open(os.path.join(FIXTURES, "syllabus_matched.json"), "r", encoding="utf-8") as f:
+    _COURSE_DATA = json.load(f)
+
+
+@pytest.fixture
+def course_data():
+    """The sample merged course data (two Winter 2025 courses), a fresh copy per test."""
+    return copy.deepcopy(_COURSE_DATA)
+
+
+def make_student(rng, year=2025, days=300, unique_titles=True):
+    """Random merged course data: up to 5 courses with deadlines over `days` days from
+    early January of `year` and odd class times. Without unique_titles, items of a
+    course may share a title."""
+    data = {"assignments": [], "tests": [], "schedule": []}
+    for course in range(rng.randint(1, 5)):
+        name = f"Course{course}"
+        for i in range(rng.randint(0, 8)):
+            due = date(year, 1, 6) + timedelta(days=rng.randrange(days))
+            number = i if unique_titles else rng.randint(1, 6)
+            data["assignments"].append({"title": f"{name} A{number}", "due_date": due.isoformat(),
+                                        "weight": rng.choice([0, 5, 10, 20, 40]),
+                                        "difficulty": rng.randint(0, 10), "course": name})
+        for i in range(rng.randint(0, 3)):
+            due = date(year, 1, 6) + timedelta(days=rng.randrange(days))
+            data["tests"].append({"title": f"{name} Test {i}", "date": due.isoformat(),
+                                  "weight": rng.choice([10, 20, 30]), "course": name})
+        for i in range(rng.randint(0, 3)):
+            start = rng.randrange(8 * 60, 22 * 60, 15)
+            end = start + rng.choice([50, 80, 120, 180])
+            data["schedule"].append({"name": f"{name} Lecture {i}", "days": rng.sample(WEEKDAYS, rng.randint(1, 3)),
+                                     "time": f"{start // 60:02d}:{start % 60:02d}–{end // 60:02d}:{end % 60:02d}",
+                                     "course": name})
+    return data
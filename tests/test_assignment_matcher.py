@@ -0,0 +1,76 @@
+import itertools
+import json
+import os
+import random
+
+import assignment_matcher
+import main
+
+COURSE2 = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "user_pdfs", "Course2")
+
+
+def load_course2():
+    with open(os.path.join(COURSE2, "Syllabus", "parsed", "sample_syllabus2_parsed.json"), "r") as f:
+        syllabus = json.load(f)
+    parsed_dir = os.path.join(COURSE2, "Assignments", "parsed")
+    files = []
+    for name in sorted(os.listdir(parsed_dir)):
+        with open(os.path.join(parsed_dir, name), "r") as f:
+            files.append((name, json.load(f)))
+    return syllabus, files
+
+
+def titles(syllabus, matches):
+    return [syllabus[i]["title"] for i, _, _ in matches]
+
+
+def test_files_match_their_syllabus_entries_one_to_one():
+    syllabus, files = load_course2()
+    parsed = [data["assignment"][0] for _, data in files]
+    labels = [os.path.splitext(name)[0] for name, _ in files]
+    matches, unsure = assignment_matcher.match_assignments(syllabus["assignments"], parsed, labels)
+    assert titles(syllabus["assignments"], matches) == ["Case Study 2: Academic Integrity",
+                                                        "Case Study 1: Interdisciplinarity"]
+    assert [j for _, j, _ in matches] == [0, 1]
+    assert not unsure
+
+    # auto_match_assignments copies the parsed details over and leaves nothing to match by hand
+    assert main.auto_match_assignments(syllabus, files) == []
+    assert syllabus["assignments"][4]["title"] == parsed[0]["title"]
+
+
+def test_two_files_competing_for_one_entry():
+    syllabus = [{"title": "Reflection 1: Aging Brain", "due_date": "2025-01-24"},
+                {"title": "Literature Review", "due_date": "2025-03-03"}]
+    parsed = [{"title": "Reflection on the aging brain (draft)", "due_date": "2025-01-10"},
+              {"title": "Reflection: Aging Brain", "due_date": "2025-01-24"}]
+    matches, unsure = assignment_matcher.match_assignments(syllabus, parsed)
+    # The closer due date wins the entry; the other file gets nothing rather than a second copy
+    assert [(i, j) for i, j, _ in matches] == [(0, 1)]
+    assert not unsure
+    assert {i for i, _, _ in matches + unsure} == {0}
+
+
+def test_weak_pairs_are_left_unmatched():
+    syllabus = [{"title": "Reflection 3: EDI", "due_date": "2025-02-28"}]
+    parsed = [{"title": "Lab report: enzyme kinetics reflection", "due_date": "2025-04-02"},
+              {"title": "Poster", "due_date": "2025-02-28"}]
+    matches, unsure = assignment_matcher.match_assignments(syllabus, parsed)
+    assert not matches
+    assert [(i, j) for i, j, _ in unsure] == [(0, 0)]
+    assert unsure[0][2] < assignment_matcher.MATCH_THRESHOLD
+
+    files = [(f"file{j}_parsed.json", {"assignment": [item]}) for j, item in enumerate(parsed)]
+    assert main.auto_match_assignments({"assignments": syllabus}, files) == [1, 2]
+
+
+def test_hungarian_finds_the_cheapest_assignment():
+    rng = random.Random(17)
+    for _ in range(50):
+        n = rng.randint(1, 5)
+        m = rng.randint(n, 6)
+        cost = [[rng.random() for _ in range(m)] for _ in range(n)]
+        assignment = assignment_matcher.hungarian(cost)
+        assert len(set(assignment)) == n
+        best = min(sum(cost[i][j] for i, j in enumerate(cols)) for cols in itertools.permutations(range(m), n))
+        assert abs(sum(cost[i][j] for i, j in enumerate(assignment)) - best) < 1e-9
@@ -0,0 +1,47 @@
+import random
+from datetime import datetime, timedelta
+
+import pytest
+
+pytest.importorskip("numpy")
+
+import batch_scheduler
+import block_generator
+from conftest import make_student
+from occurrence_index import Term
+
+TERM = Term.from_dict({"start": "2025-01-13", "end": "2025-03-28",
+                       "exclusions": [{"name": "Reading week", "start": "2025-02-17", "end": "2025-02-21"},
+                                      {"name": "Holiday", "start": "2025-03-03"}]})
+
+
+def make_busy(rng):
+    intervals = []
+    for _ in range(rng.randint(0, 6)):
+        start = datetime(2024, 12, 20) + timedelta(minutes=15 * rng.randrange(4 * 24 * 110))
+        intervals.append((start, start + timedelta(minutes=rng.randint(30, 60 * 40))))
+    return sorted(intervals)
+
+
+@pytest.fixture(scope="module")
+def cohort():
+    rng = random.Random(6)
+    # Overlapping deadlines and duplicate titles
+    students = [make_student(rng, days=90, unique_titles=False) for _ in range(60)]
+    students.append({"assignments": [], "tests": [], "schedule": []})
+    return students, [make_busy(rng) for _ in students]
+
+
+@pytest.mark.parametrize("strategy", ["edf", "priority", "independent"])
+@pytest.mark.parametrize("per_hour", [False, True])
+@pytest.mark.parametrize("term", [None, TERM])
+def test_batch_matches_generate_time_blocks(cohort, strategy, per_hour, term):
+    students, busy = cohort
+    results = batch_scheduler.generate_time_blocks_batch(students, strategy, per_hour, term, busy)
+    assert len(results) == len(students)
+    for data, intervals, result in zip(students, busy, results):
+        assert result == block_generator.generate_time_blocks(data, strategy, per_hour, term, intervals)
+
+
+def test_schedule_student_matches_on_sample(course_data):
+    assert batch_scheduler.schedule_student(course_data) == block_generator.generate_time_blocks(course_data)
@@ -0,0 +1,206 @@
+import copy
+import json
+import random
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+
+import pytest
+
+import block_generator
+from conftest import make_student
+from models import as_course_data
+from occurrence_index import OccurrenceIndex
+
+# The scheduler as it was before free intervals, occupancy and terms: every
+# item on its own, stepping hour by hour and checking the weekly class times.
+# Kept verbatim in behaviour as the reference the faster code must match.
+def reference_time_blocks(json_data):
+    class_blocks = defaultdict(list)
+    for session in json_data.get("schedule", []):
+        try:
+            start_str, end_str = session.get("time", "").split("–")
+            start = datetime.strptime(start_str.strip(), "%H:%M").time()
+            end = datetime.strptime(end_str.strip(), "%H:%M").time()
+        except ValueError:
+            continue
+        for day in session.get("days", []):
+            class_blocks[day].append((start, end))
+
+    def is_class_conflict(dt):
+        return any(start <= dt.time() < end for start, end in class_blocks.get(dt.strftime("%A"), []))
+
+    def is_study_time(dt):
+        hour = dt.hour + dt.minute / 60
+        return block_generator.STUDY_HOURS_START <= hour or hour < 2
+
+    items = sorted(json_data.get("assignments", []) + json_data.get("tests", []),
+                   key=lambda x: (x.get("due_date") or x.get("date"), -x.get("weight", 0), -x.get("difficulty", 6)))
+    all_blocks = []
+    for item in items:
+        is_test = "date" in item
+        due_date_str = item.get("date" if is_test else "due_date")
+        if not due_date_str:
+            continue
+        title = item.get("title", "Untitled")
+        weight = item.get("weight", 5)
+        if is_test:
+            hours_needed = 15 if weight > 15 else 6
+        else:
+            hours_needed = int(round(block_generator.get_base_hours(weight)
+                                     * block_generator.get_multiplier(item.get("difficulty", 6))))
+        due_date = datetime.strptime(due_date_str, "%Y-%m-%d")
+        current = (due_date - timedelta(days=14)).replace(hour=block_generator.STUDY_HOURS_START)
+        daily_blocks = defaultdict(int)
+        while current <= due_date and hours_needed > 0:
+            if is_study_time(current) and not is_class_conflict(current):
+                key = (current.date(), title)
+                if (daily_blocks[key] < block_generator.MAX_BLOCKS_PER_DAY_PER_ITEM
+                        or due_date - current < timedelta(days=2)):
+                    all_blocks.append({
+                        "title": f"{'Study for ' if is_test else 'Work on '}{title}",
+                        "date": current.strftime("%Y-%m-%d"),
+                        "time": current.strftime("%H:%M"),
+                        "type": "test" if is_test else "assignment",
+                    })
+                    daily_blocks[key] += 1
+                    hours_needed -= 1
+            current += timedelta(minutes=60)
+    return {"blocks": all_blocks}
+
+
+def without_course(blocks):
+    return [{key: value for key, value in block.items() if key != "course"} for block in blocks]
+
+
+def test_independent_matches_reference_on_sample(course_data):
+    expected = reference_time_blocks(course_data)["blocks"]
+    blocks = block_generator.generate_time_blocks(course_data, "independent", per_hour=True)["blocks"]
+    assert without_course(blocks) == expected
+
+
+@pytest.mark.parametrize("year", [2025, 2027, 2031])
+def test_independent_matches_reference_on_random_students(year):
+    rng = random.Random(year)
+    for _ in range(40):
+        data = make_student(rng, year)
+        expected = reference_time_blocks(data)["blocks"]
+        blocks = block_generator.generate_time_blocks(data, "independent", per_hour=True)["blocks"]
+        assert without_course(blocks) == expected
+
+
+# Per-hour blocks of coalesced ones, written out the slow way
+def expand(blocks):
+    hours = []
+    for block in blocks:
+        start = datetime.strptime(f"{block['date']} {block['time']}", "%Y-%m-%d %H:%M")
+        for i in range(block["duration"]):
+            current = start + timedelta(hours=i)
+            hour_block = {key: value for key, value in block.items() if key != "duration"}
+            hour_block["date"] = current.strftime("%Y-%m-%d")
+            hour_block["time"] = current.strftime("%H:%M")
+            hours.append(hour_block)
+    return hours
+
+
+@pytest.mark.parametrize("strategy", ["edf", "priority", "independent"])
+def test_coalesced_blocks_cover_the_same_hours(course_data, strategy):
+    per_hour = block_generator.generate_time_blocks(course_data, strategy, per_hour=True)
+    coalesced = block_generator.generate_time_blocks(course_data, strategy)
+    assert expand(coalesced["blocks"]) == per_hour["blocks"]
+    assert coalesced["unscheduled"] == per_hour["unscheduled"]
+    assert len(coalesced["blocks"]) < len(per_hour["blocks"])
+    # Nothing back-to-back is left unmerged
+    for previous, block in zip(coalesced["blocks"], coalesced["blocks"][1:]):
+        end = (datetime.strptime(f"{previous['date']} {previous['time']}", "%Y-%m-%d %H:%M")
+               + timedelta(hours=previous["duration"]))
+        start = datetime.strptime(f"{block['date']} {block['time']}", "%Y-%m-%d %H:%M")
+        assert start != end or block["title"] != previous["title"]
+
+
+@pytest.mark.parametrize("per_hour", [False, True])
+def test_reschedule_without_edits_keeps_blocks(course_data, per_hour):
+    generated = block_generator.generate_time_blocks(course_data, per_hour=per_hour)
+    digest = block_generator.schedule_digest(course_data)
+    rescheduled = block_generator.reschedule_time_blocks(digest, course_data, generated["blocks"], per_hour=per_hour)
+    assert rescheduled == generated
+
+
+# {item key: absolute hours} of block dicts
+def hours_by_item(blocks):
+    hours = {}
+    for block in blocks:
+        hours.setdefault(block_generator.get_block_key(block), []).extend(block_generator.get_block_hours(block))
+    return hours
+
+
+def assert_no_overlaps_or_classes(blocks, data):
+    hours = [hour for item_hours in hours_by_item(blocks).values() for hour in item_hours]
+    assert len(hours) == len(set(hours))
+    occurrences = OccurrenceIndex(data)
+    assert not any(occurrences.busy_hours(date.fromordinal(hour // 24)) >> (hour % 24) & 1 for hour in hours)
+
+
+EDITED = "Reflection 2: Science Literature"
+
+
+def hours_needed(data, title):
+    item = next(item for item in as_course_data(data).assignments if item.title == title)
+    return block_generator.get_hours_needed(item)
+
+
+def edit_due_date(data):
+    item = next(item for item in data["assignments"] if item["title"] == EDITED)
+    item["due_date"] = "2025-02-14"
+    return ("assignment", item["course"], item["title"])
+
+
+def raise_hours(data):
+    item = next(item for item in data["assignments"] if item["title"] == EDITED)
+    before = hours_needed(data, EDITED)
+    item["weight"] = 40
+    assert hours_needed(data, EDITED) > before
+    return ("assignment", item["course"], item["title"])
+
+
+def delete_item(data):
+    item = next(item for item in data["assignments"] if item["title"] == "Critical Appraisal 2")
+    data["assignments"].remove(item)
+    return ("assignment", item["course"], item["title"])
+
+
+@pytest.mark.parametrize("edit", [edit_due_date, raise_hours, delete_item])
+def test_reschedule_moves_only_the_edited_item(course_data, edit):
+    old_blocks = block_generator.generate_time_blocks(course_data)["blocks"]
+    new_data = copy.deepcopy(course_data)
+    edited = edit(new_data)
+    digest = block_generator.schedule_digest(course_data)
+    rescheduled = block_generator.reschedule_time_blocks(digest, new_data, old_blocks)
+
+    before, after = hours_by_item(old_blocks), hours_by_item(rescheduled["blocks"])
+    assert {key: hours for key, hours in after.items() if key != edited} == \
+        {key: hours for key, hours in before.items() if key != edited}
+    if edit is delete_item:
+        assert edited not in after
+    else:
+        assert after[edited] != before[edited]
+    assert not rescheduled["unscheduled"]
+    assert_no_overlaps_or_classes(rescheduled["blocks"], new_data)
+
+
+def test_saved_blocks_keep_a_digest_instead_of_the_course_data(course_data, tmp_path):
+    import main
+
+    blocks_path = tmp_path / "generated_blocks.json"
+    first = main.allocate_study_blocks(course_data, str(blocks_path))
+    assert "source" not in first
+    data = as_course_data(course_data)
+    keys = {json.dumps(block_generator.get_item_key(item)) for item in data.assignments + data.tests}
+    assert set(first["digest"]["items"]) == keys
+    blocks_path.write_text(json.dumps(first), encoding="utf-8")
+
+    edited = copy.deepcopy(course_data)
+    key = edit_due_date(edited)
+    second = main.allocate_study_blocks(edited, str(blocks_path))
+    before, after = hours_by_item(first["blocks"]), hours_by_item(second["blocks"])
+    assert [item for item in after if after[item] != before.get(item)] == [key]
+    assert second["digest"]["items"] != first["digest"]["items"]
@@ -0,0 +1,73 @@
+import pytest
+
+pytest.importorskip("icalendar")
+
+from icalendar import Calendar
+
+import block_generator
+import calendar_generator
+from occurrence_index import Term
+
+TERM = Term.from_dict({"start": "2025-01-06", "end": "2025-04-08",
+                       "exclusions": [{"name": "Reading week", "start": "2025-02-17", "end": "2025-02-21"}]})
+
+
+# {uid: {property: [(serialized value, parameters)]}} of a calendar's events, without the export time
+def events_of(calendar):
+    events = {}
+    for event in calendar.walk("VEVENT"):
+        properties = {}
+        for name, value in event.property_items(recursive=False):
+            if name not in ("BEGIN", "END", "DTSTAMP"):
+                params = dict(getattr(value, "params", {}))
+                properties.setdefault(name, []).append((value.to_ical(), params))
+        events[str(event["UID"])] = properties
+    return events
+
+
+@pytest.fixture
+def full_data(course_data):
+    course_data["study_blocks"] = block_generator.generate_time_blocks(course_data)["blocks"]
+    return course_data
+
+
+@pytest.mark.parametrize("term", [None, TERM])
+@pytest.mark.parametrize("incremental", [True, False])
+def test_streaming_export_matches_built_calendar(full_data, tmp_path, term, incremental):
+    output = tmp_path / "course_calendar.ics"
+    calendar_generator.export_json_to_ics(full_data, str(output), incremental=incremental, term=term)
+    with open(output, "rb") as f:
+        streamed = events_of(Calendar.from_ical(f.read()))
+
+    built = events_of(calendar_generator.build_calendar(full_data, term))
+    assert len(built) > len(full_data["study_blocks"])
+    assert streamed == built
+
+
+def test_reexport_keeps_unchanged_events_byte_for_byte(full_data, tmp_path):
+    output = tmp_path / "course_calendar.ics"
+    calendar_generator.export_json_to_ics(full_data, str(output), term=TERM)
+    first = output.read_bytes()
+    calendar_generator.export_json_to_ics(full_data, str(output), term=TERM)
+    assert output.read_bytes() == first
+
+
+def test_classes_follow_the_syllabus_class_dates(course_data, tmp_path):
+    output = tmp_path / "course_calendar.ics"
+    calendar_generator.export_json_to_ics(course_data, str(output), incremental=False)
+    with open(output, "rb") as f:
+        classes = {str(event["SUMMARY"]): event for event in Calendar.from_ical(f.read()).walk("VEVENT")
+                   if "RRULE" in event}
+
+    # Classes begin on Monday 2025-01-06 and end on Friday 2025-04-04, reading week is February 15–23
+    expected = {
+        "MEDSCIEN 4931G: Special Topics in Medical Sciences": (b"20250107T133000", b"20250218T133000"),
+        "Physiology 4700B: Fetal Physiology": (b"20250109T143000", b"20250220T143000"),
+    }
+    assert set(classes) == set(expected)
+    for name, (dtstart, exdate) in expected.items():
+        event = classes[name]
+        assert event["DTSTART"].to_ical() == dtstart
+        assert event["DTSTART"].params["TZID"] == calendar_generator.TIMEZONE
+        assert event["RRULE"]["UNTIL"][0].strftime("%Y%m%dT%H%M%S") == "20250405T000000"
+        assert event["EXDATE"].to_ical() == exdate
@@ -0,0 +1,52 @@
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import chunked_extraction
+import llm_client
+import main
+
+SCHEMA = {"type": "object", "properties": {"items": {"type": "array", "items": {"type": "object"}}}}
+
+
+def test_split_text_terminates_with_a_stricter_tokenizer(monkeypatch):
+    # One token per character, four times what the estimate assumes (like digits or CJK text)
+    monkeypatch.setattr(chunked_extraction, "count_tokens", len)
+    text = "8" * 5000 + "\n\n" + "中" * 3001
+    chunks = chunked_extraction.split_text(text, max_tokens=100)
+    assert "".join(chunks) == text
+    assert all(len(chunk) <= 100 for chunk in chunks)
+    # Pieces are packed back together, close to the 81 chunks the text needs
+    assert len(chunks) <= 85
+
+
+def test_split_text_keeps_an_unsplittable_character(monkeypatch):
+    monkeypatch.setattr(chunked_extraction, "count_tokens", lambda text: 5 * len(text))
+    assert chunked_extraction.split_text("abc", max_tokens=2) == ["a", "b", "c"]
+
+
+def test_requests_stay_within_the_shared_limit(monkeypatch):
+    monkeypatch.setattr(llm_client, "_slots", llm_client._slots)
+    llm_client.set_max_requests(3)
+    lock = threading.Lock()
+    in_flight = 0
+    peak = 0
+
+    def extract(chunk, timeout=None):
+        nonlocal in_flight, peak
+        with lock:
+            in_flight += 1
+            peak = max(peak, in_flight)
+        time.sleep(0.01)
+        with lock:
+            in_flight -= 1
+        return json.dumps({"items": [{"title": chunk.split()[1]}]})
+
+    # Five documents at once, each split into four chunks extracted in its own pool
+    documents = ["\n\n".join(f"doc{doc} part{part} " * 20 for part in range(4)) for doc in range(5)]
+    with ThreadPoolExecutor(max_workers=5) as pool:
+        results = list(pool.map(lambda text: main.run_llm(extract, text, SCHEMA, max_tokens=60), documents))
+
+    assert all(len(result["items"]) == 4 for result in results)
+    assert peak == 3
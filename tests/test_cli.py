@@ -0,0 +1,13 @@
+import json
+
+import cli
+
+
+def test_free_marks_slots_ending_the_next_day(tmp_path, course_data, capsys):
+    (tmp_path / "Course1" / "Syllabus").mkdir(parents=True)
+    (tmp_path / cli.MATCHED_NAME).write_text(json.dumps(course_data), encoding="utf-8")
+    # Tuesday's class is 13:30–15:30; the window ends at midnight after Wednesday
+    assert cli.main(["free", str(tmp_path), "--start", "2025-02-04", "--days", "2"]) == 0
+    lines = capsys.readouterr().out.splitlines()
+    assert lines[1].split("free ")[1] == "00:00–02:00, 09:00–13:30, 15:30–02:00+1"
+    assert lines[2].split("free ")[1] == "09:00–24:00"
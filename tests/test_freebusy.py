@@ -0,0 +1,85 @@
+import random
+from datetime import date, datetime, time, timedelta
+
+from freebusy import FreeBusy
+
+DAY = timedelta(days=1)
+
+
+def random_busy(rng, first_day, days, count):
+    busy = []
+    for _ in range(count):
+        start = datetime.combine(first_day, time()) + timedelta(minutes=30 * rng.randrange(days * 48))
+        # Mostly short events, some lasting several days
+        length = timedelta(hours=rng.randint(1, 3)) if rng.random() < 0.8 else timedelta(hours=rng.randint(20, 120))
+        busy.append((start, start + length))
+    return busy
+
+
+# Minutes of [start, end) covered by any interval, for comparing split and unsplit intervals
+def covered(intervals, start, end):
+    minutes = set()
+    for busy_start, busy_end in intervals:
+        lo, hi = max(busy_start, start), min(busy_end, end)
+        minute = lo
+        while minute < hi:
+            minutes.add(minute)
+            minute += timedelta(minutes=30)
+    return minutes
+
+
+def test_long_busy_events_do_not_widen_lookups(course_data):
+    week_long = (datetime(2025, 2, 3, 8), datetime(2025, 2, 10, 8))
+    index = FreeBusy(course_data, busy=[week_long])
+    assert index.longest <= DAY
+    # The pieces of the event cover the week without gaps
+    pieces = [(start, end) for start, end, kind, _ in index.intervals if kind == "busy"]
+    assert pieces[0][0] == week_long[0] and pieces[-1][1] == week_long[1]
+    assert all(end == next_start for (_, end), (next_start, _) in zip(pieces, pieces[1:]))
+    assert [kind for _, _, kind, _ in index.busy_at(datetime(2025, 2, 6, 3))] == ["busy"]
+
+
+def test_split_intervals_give_the_same_answers(course_data):
+    rng = random.Random(24)
+    first_day = date(2025, 1, 20)
+    busy = random_busy(rng, first_day, 28, 60)
+    index = FreeBusy(course_data, busy=busy)
+    everything = [(start, end) for start, end, _, _ in index.intervals]
+    for _ in range(200):
+        start = datetime.combine(first_day, time()) + timedelta(minutes=30 * rng.randrange(28 * 48))
+        end = start + timedelta(minutes=30 * rng.randint(1, 200))
+        found = index.between(start, end)
+        assert covered([(s, e) for s, e, _, _ in found], start, end) == covered(everything, start, end)
+        assert all(s < end and e > start for s, e, _, _ in found)
+        moment = start + timedelta(minutes=15)
+        assert bool(index.busy_at(moment)) == any(s <= moment < e for s, e in busy + everything)
+
+    # Free slots are the complement of the busy time, pieces that touch at midnight give no gap
+    start, end = datetime.combine(first_day, time()), datetime.combine(first_day + 28 * DAY, time())
+    free = covered(index.free_slots(start, end), start, end)
+    busy_minutes = covered(busy, start, end) | covered(everything, start, end)
+    assert free | busy_minutes == covered([(start, end)], start, end)
+    assert not free & busy_minutes
+    assert all(end - start >= timedelta(hours=1) for start, end in index.free_slots(start, end, timedelta(hours=1)))
+
+
+def test_load_per_day_counts_multi_day_events(course_data):
+    index = FreeBusy(course_data, busy=[(datetime(2025, 3, 1, 18), datetime(2025, 3, 4, 6))])
+    load = index.load_per_day(date(2025, 3, 1), date(2025, 3, 4))
+    assert load[date(2025, 3, 2)] == load[date(2025, 3, 3)] == 24
+    assert load[date(2025, 3, 1)] >= 6
+    assert load[date(2025, 3, 4)] >= 6
+
+
+def test_blocks_spanning_midnight_can_be_added_and_removed(course_data):
+    index = FreeBusy(course_data)
+    before = list(index.intervals)
+    block = {"title": "Late study", "date": "2025-02-12", "time": "23:00", "duration": 2}
+    interval = index.add_block(block)
+    assert interval == (datetime(2025, 2, 12, 23), datetime(2025, 2, 13, 1), "study", "Late study")
+    assert len(index) == len(before) + 2
+    assert index.busy_at(datetime(2025, 2, 13, 0, 30))
+    assert index.remove_block(block)
+    assert index.intervals == before
+    assert index.starts == [start for start, _, _, _ in before]
+    assert not index.remove_block(block)
@@ -0,0 +1,55 @@
+from datetime import datetime
+
+from ics_import import read_busy
+
+HORIZON = (datetime(2025, 2, 1), datetime(2025, 3, 1))
+
+
+def write_calendar(tmp_path, *events):
+    lines = ["BEGIN:VCALENDAR", "VERSION:2.0"]
+    for event in events:
+        lines += ["BEGIN:VEVENT", *event, "END:VEVENT"]
+    lines.append("END:VCALENDAR")
+    path = tmp_path / "personal.ics"
+    path.write_text("\r\n".join(lines) + "\r\n", encoding="utf-8")
+    return str(path)
+
+
+# Every Monday 18:00–20:00 local time through February
+WEEKLY_SHIFT = ["UID:shift@example.com", "DTSTART;TZID=America/Toronto:20250203T180000",
+                "DTEND;TZID=America/Toronto:20250203T200000", "RRULE:FREQ=WEEKLY;UNTIL=20250224T235959"]
+
+
+def override(recurrence_id, new_start, new_end):
+    return ["UID:shift@example.com", f"RECURRENCE-ID;TZID=America/Toronto:{recurrence_id}",
+            f"DTSTART;TZID=America/Toronto:{new_start}", f"DTEND;TZID=America/Toronto:{new_end}"]
+
+
+def starts(intervals):
+    return [start for start, _ in intervals]
+
+
+def test_weekly_series(tmp_path):
+    path = write_calendar(tmp_path, WEEKLY_SHIFT)
+    assert starts(read_busy(path, *HORIZON)) == [datetime(2025, 2, day, 18) for day in (3, 10, 17, 24)]
+
+
+def test_override_inside_horizon_replaces_the_instance(tmp_path):
+    path = write_calendar(tmp_path, WEEKLY_SHIFT, override("20250210T180000", "20250211T090000", "20250211T110000"))
+    assert starts(read_busy(path, *HORIZON)) == [datetime(2025, 2, 3, 18), datetime(2025, 2, 11, 9),
+                                                 datetime(2025, 2, 17, 18), datetime(2025, 2, 24, 18)]
+
+
+def test_override_moved_out_of_horizon_frees_the_instance(tmp_path):
+    moved_away = override("20250217T180000", "20250601T180000", "20250601T200000")
+    path = write_calendar(tmp_path, moved_away, WEEKLY_SHIFT)
+    assert starts(read_busy(path, *HORIZON)) == [datetime(2025, 2, day, 18) for day in (3, 10, 24)]
+
+
+def test_override_moved_into_horizon_is_busy(tmp_path):
+    series = ["UID:trip@example.com", "DTSTART;TZID=America/Toronto:20250401T100000",
+              "DTEND;TZID=America/Toronto:20250401T120000", "RRULE:FREQ=WEEKLY;COUNT=3"]
+    moved_in = ["UID:trip@example.com", "RECURRENCE-ID;TZID=America/Toronto:20250408T100000",
+                "DTSTART;TZID=America/Toronto:20250214T100000", "DTEND;TZID=America/Toronto:20250214T120000"]
+    path = write_calendar(tmp_path, series, moved_in)
+    assert read_busy(path, *HORIZON) == [(datetime(2025, 2, 14, 10), datetime(2025, 2, 14, 12))]
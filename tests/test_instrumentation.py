@@ -0,0 +1,41 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+
+import instrumentation
+import pdf_parser
+
+SYLLABUS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                        "data", "user_pdfs", "Course1", "Syllabus", "sample_syllabus.pdf")
+
+
+@pytest.fixture
+def metrics_only(tmp_path, monkeypatch):
+    monkeypatch.delenv(instrumentation.TRACE_ENV, raising=False)
+    metrics_path = str(tmp_path / "metrics.prom")
+    instrumentation.enable(None, metrics_path)
+    yield metrics_path
+    instrumentation.disable()
+
+
+def test_spawned_workers_count_towards_metrics(metrics_only):
+    # spawn is the default start method on macOS and Windows; workers only see the environment
+    with ProcessPoolExecutor(max_workers=2, mp_context=multiprocessing.get_context("spawn")) as pool:
+        texts = list(pool.map(pdf_parser.extract_text_from_pdf, [SYLLABUS, SYLLABUS]))
+    assert all(texts)
+
+    instrumentation.write_metrics()
+    with open(metrics_only, "r", encoding="utf-8") as f:
+        metrics = f.read()
+    assert 'course_pipeline_span_calls_total{span="extract_text_from_pdf"} 2' in metrics
+    # The scratch trace is gone once the metrics are written
+    assert not os.path.exists(metrics_only + instrumentation.SCRATCH_TRACE_SUFFIX)
+
+
+def test_disable_clears_the_worker_setting(metrics_only):
+    assert os.environ[instrumentation.TRACE_ENV] == metrics_only + instrumentation.SCRATCH_TRACE_SUFFIX
+    assert instrumentation.METRICS_ENV not in os.environ
+    instrumentation.disable()
+    assert instrumentation.TRACE_ENV not in os.environ
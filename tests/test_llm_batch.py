@@ -0,0 +1,88 @@
+import json
+import os
+
+import pytest
+
+import instrumentation
+import main
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+# Recorded batch output: a success, a server error and a line cut short
+BATCH_OUTPUT = os.path.join(FIXTURES, "batch_output.jsonl")
+
+# Assignment text per PDF, the batch custom_ids are the cache keys of these.
+# Re-record the fixture when the assignment PROMPT_VERSION or MODEL changes.
+TEXTS = {
+    "integrity.pdf": "Case Study 1: Academic Integrity\nDue 2025-02-14 at 23:59.",
+    "interdisciplinarity.pdf": "Case Study 2: Interdisciplinarity\nDue 2025-03-07.",
+    "ethics.pdf": "Case Study 3: Research Ethics\nDue 2025-03-28 at 17:00.",
+}
+
+
+@pytest.fixture
+def student(tmp_path, monkeypatch):
+    assignments = tmp_path / "user_pdfs" / "Course1" / "Assignments"
+    assignments.mkdir(parents=True)
+    for name in TEXTS:
+        (assignments / name).write_bytes(b"")
+    # Keep the relative LLM cache and batch folders inside the test directory
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(main, "read_pdf_text", lambda pdf_path, pdf_type, workers=None: TEXTS[os.path.basename(pdf_path)])
+    retried = []
+    monkeypatch.setattr(main, "process_pdf", lambda pdf_path, pdf_type, **kwargs: retried.append(pdf_path) or "failed")
+    return assignments, retried
+
+
+def test_parse_results_skips_errors_and_malformed_lines():
+    with open(BATCH_OUTPUT, "r", encoding="utf-8") as f:
+        results = main.llm_batch.parse_results(f)
+    assert list(results) == [main.get_cache_key(TEXTS["integrity.pdf"], "assignment")]
+
+
+def test_process_directory_batch_from_recorded_results(student, tmp_path):
+    assignments, retried = student
+    trace_path = str(tmp_path / "trace.jsonl")
+    instrumentation.enable(trace_path)
+    try:
+        main.process_directory_batch(str(tmp_path / "user_pdfs"), results_path=BATCH_OUTPUT)
+    finally:
+        instrumentation.disable()
+
+    with open(assignments / "parsed" / "integrity_parsed.json", "r", encoding="utf-8") as f:
+        assert json.load(f) == {"assignment": [{
+            "title": "Case Study 1: Academic Integrity", "due_date": "2025-02-14",
+            "due_time": "23:59", "difficulty": 4,
+        }]}
+    assert sorted(os.listdir(assignments / "parsed")) == ["integrity_parsed.json"]
+    # The failed and malformed requests go to direct calls, nothing else is re-sent
+    assert sorted(os.path.basename(path) for path in retried) == ["ethics.pdf", "interdisciplinarity.pdf"]
+
+    [batch] = [entry for entry in instrumentation.read_trace(trace_path) if entry["span"] == "llm_batch_results"]
+    assert batch["requests"] == 1
+    assert batch["failed"] == 2
+    assert batch["prompt_tokens"] == 1000
+    assert batch["completion_tokens"] == 200
+    # gpt-4o-mini at half price: (1000 * 0.15 + 200 * 0.60) / 1M / 2
+    assert batch["cost_usd"] == pytest.approx(0.000135)
+
+
+def test_parse_results_drops_cut_off_responses():
+    line = {"custom_id": "cut", "response": {"status_code": 200, "body": {
+        "model": "gpt-4o-mini", "usage": {"prompt_tokens": 10, "completion_tokens": 16384},
+        "choices": [{"finish_reason": "length", "message": {"content": '{"assignment": [{"title": "A'}}],
+    }}}
+    assert main.llm_batch.parse_results([json.dumps(line)]) == {}
+
+
+def test_parse_results_counts_empty_responses_as_failed(tmp_path):
+    lines = [{"custom_id": "no-choices", "response": {"status_code": 200, "body": {"choices": []}}},
+             {"custom_id": "refused", "response": {"status_code": 200, "body": {
+                 "choices": [{"finish_reason": "stop", "message": {"content": None, "refusal": "No."}}]}}}]
+    trace_path = str(tmp_path / "trace.jsonl")
+    instrumentation.enable(trace_path)
+    try:
+        assert main.llm_batch.parse_results([json.dumps(line) for line in lines]) == {}
+    finally:
+        instrumentation.disable()
+    [batch] = instrumentation.read_trace(trace_path)
+    assert (batch["requests"], batch["failed"]) == (0, 2)
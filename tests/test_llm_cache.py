@@ -0,0 +1,52 @@
+import os
+
+import llm_cache
+
+ENTRY = {"assignments": [{"title": "Essay", "notes": "x" * 200}]}
+
+
+def test_key_changes_with_prompt_version_model_and_pdf_type():
+    key = llm_cache.cache_key("syllabus text", "3", "gpt-4o-mini", "syllabus")
+    assert key == llm_cache.cache_key("syllabus text", "3", "gpt-4o-mini", "syllabus")
+    assert len({
+        key,
+        llm_cache.cache_key("syllabus text", "4", "gpt-4o-mini", "syllabus"),
+        llm_cache.cache_key("syllabus text", "3", "gpt-4o", "syllabus"),
+        llm_cache.cache_key("syllabus text", "3", "gpt-4o-mini", "assignment"),
+        llm_cache.cache_key("syllabus text!", "3", "gpt-4o-mini", "syllabus"),
+        # Parts are separated, so moving text between them gives another key
+        llm_cache.cache_key("syllabus text", "3gpt-4o-mini", "", "syllabus"),
+    }) == 6
+
+
+def test_store_and_get(tmp_path):
+    key = llm_cache.cache_key("text", "1", "model")
+    assert llm_cache.get_cached(key, str(tmp_path)) is None
+    llm_cache.store(key, ENTRY, str(tmp_path))
+    assert llm_cache.get_cached(key, str(tmp_path)) == ENTRY
+    assert os.listdir(tmp_path) == [key + ".json"]
+
+
+def test_least_recently_used_entries_are_evicted_over_the_cap(tmp_path):
+    cache_dir = str(tmp_path)
+    keys = [llm_cache.cache_key(f"pdf {i}", "1", "model") for i in range(4)]
+    for i, key in enumerate(keys[:3]):
+        llm_cache.store(key, ENTRY, cache_dir)
+        # Distinct, increasing last-use times regardless of the filesystem's timestamp resolution
+        path = os.path.join(cache_dir, key + ".json")
+        os.utime(path, (1_000_000 + i, 1_000_000 + i))
+    size = os.path.getsize(os.path.join(cache_dir, keys[0] + ".json"))
+
+    # Reading the oldest entry makes it the most recently used
+    assert llm_cache.get_cached(keys[0], cache_dir) == ENTRY
+
+    # Room for three entries: storing a fourth drops the least recently used one
+    llm_cache.store(keys[3], ENTRY, cache_dir, max_bytes=3 * size)
+    assert sorted(os.listdir(cache_dir)) == sorted(key + ".json" for key in (keys[0], keys[2], keys[3]))
+    assert llm_cache.get_cached(keys[1], cache_dir) is None
+
+    # Under the cap nothing goes
+    llm_cache.evict(cache_dir, max_bytes=3 * size)
+    assert len(os.listdir(cache_dir)) == 3
+    llm_cache.evict(cache_dir, max_bytes=size)
+    assert len(os.listdir(cache_dir)) == 1
@@ -0,0 +1,67 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+
+import llm_assignment_parser
+import llm_cache
+import llm_json
+import main
+
+SCHEMA = llm_assignment_parser.RESPONSE_SCHEMA
+ITEMS = [{"title": f"Assignment {i}", "due_date": f"2025-02-{i:02d}", "due_time": "23:59", "difficulty": 3}
+         for i in range(1, 5)]
+COMPLETE = json.dumps({"assignment": ITEMS})
+# Cut off in the middle of the third item
+TRUNCATED = COMPLETE[:COMPLETE.index("Assignment 3") + 5]
+
+
+def completion(content, finish_reason):
+    message = SimpleNamespace(content=content)
+    return SimpleNamespace(choices=[SimpleNamespace(message=message, finish_reason=finish_reason)])
+
+
+def test_repairs_hand_formatted_json():
+    assert llm_json.parse_llm_json("```json\n{'a': [1, 2,], 'b': True}\n```") == {"a": [1, 2], "b": True}
+
+
+def test_truncated_response_is_an_error_not_a_shorter_result():
+    with pytest.raises(llm_json.TruncatedResponseError):
+        llm_json.parse_llm_json(TRUNCATED)
+    # Existing JSONDecodeError handlers still catch it
+    with pytest.raises(json.JSONDecodeError):
+        llm_json.load_response(TRUNCATED, SCHEMA)
+
+
+def test_response_content_flags_length_finish():
+    assert llm_json.response_content(completion(COMPLETE, "stop")) == COMPLETE
+    with pytest.raises(llm_json.TruncatedResponseError):
+        # Complete-looking JSON is still refused when the model hit its limit
+        llm_json.response_content(completion(COMPLETE, "length"))
+
+
+def test_truncated_result_is_not_cached(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    pdf_path = str(tmp_path / "Assignments" / "a1.pdf")
+    assert main.save_parsed_output(pdf_path, TRUNCATED, "key") == "failed"
+    assert llm_cache.get_cached("key") is None
+
+
+def test_run_llm_rechunks_cut_off_text(monkeypatch):
+    monkeypatch.setattr(main, "MIN_CHUNK_TOKENS", 1)
+    monkeypatch.setattr(main.chunked_extraction, "count_tokens", lambda text: text.count("Assignment") * 100)
+    text = "\n\n".join(item["title"] for item in ITEMS)
+    schema = {"type": "object", "properties": {"items": SCHEMA["properties"]["assignment"]}}
+    calls = []
+
+    # Behaves like a model that runs out of output tokens on more than two items
+    def extract(chunk, timeout=None):
+        calls.append(chunk)
+        items = [item for item in ITEMS if item["title"] in chunk]
+        if len(items) > 2:
+            return TRUNCATED
+        return json.dumps({"items": items})
+
+    assert main.run_llm(extract, text, schema) == {"items": ITEMS}
+    # The whole text once, then two halves
+    assert len(calls) == 3
@@ -0,0 +1,119 @@
+import json
+import os
+
+import cli
+import main
+import manifest
+
+
+def write_pdf(path, content):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(content)
+    return str(path)
+
+
+def touch(path, mtime_ns):
+    os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+def test_changed_files_are_found_by_size_mtime_and_hash(tmp_path):
+    pdf = write_pdf(tmp_path / "Course1" / "Assignments" / "essay.pdf", b"%PDF essay v1")
+    parsed = main.get_parsed_output_path(pdf)
+    os.makedirs(os.path.dirname(parsed))
+    open(parsed, "w").close()
+    state = manifest.load_manifest(str(tmp_path))
+    touch(pdf, 1_000_000_000)
+    manifest.record_pdf(str(tmp_path), state, pdf, "assignment", parsed)
+
+    def scan():
+        return manifest.scan_pdfs(str(tmp_path), [(pdf, "assignment")], state, main.get_parsed_output_path)
+
+    assert scan() == ([], [])
+    # Copied over with the same content: only the mtime moved, the hash says unchanged
+    touch(pdf, 2_000_000_000)
+    assert scan() == ([], [])
+    assert state["pdfs"][os.path.join("Course1", "Assignments", "essay.pdf")]["mtime_ns"] == 2_000_000_000
+    # Same size, new mtime and different content
+    write_pdf(tmp_path / "Course1" / "Assignments" / "essay.pdf", b"%PDF essay v2")
+    touch(pdf, 3_000_000_000)
+    assert scan() == ([(pdf, "assignment")], [])
+    # A different size is a change without hashing
+    write_pdf(tmp_path / "Course1" / "Assignments" / "essay.pdf", b"%PDF essay, longer")
+    touch(pdf, 1_000_000_000)
+    assert scan() == ([(pdf, "assignment")], [])
+    # So is a missing parsed output
+    manifest.record_pdf(str(tmp_path), state, pdf, "assignment", parsed)
+    os.remove(parsed)
+    assert scan() == ([(pdf, "assignment")], [])
+
+
+def fake_process_pdf(calls):
+    def process_pdf(pdf_path, pdf_type, timeout=None, retries=0):
+        calls.append(os.path.basename(pdf_path))
+        output = main.get_parsed_output_path(pdf_path)
+        os.makedirs(os.path.dirname(output), exist_ok=True)
+        with open(output, "w") as f:
+            json.dump({"assignment": [{"title": pdf_path}]}, f)
+        return "processed"
+    return process_pdf
+
+
+def test_deleted_pdfs_lose_their_parsed_output(tmp_path, monkeypatch):
+    calls = []
+    monkeypatch.setattr(main, "process_pdf", fake_process_pdf(calls))
+    essay = write_pdf(tmp_path / "Course1" / "Assignments" / "essay.pdf", b"%PDF essay")
+    write_pdf(tmp_path / "Course1" / "Assignments" / "poster.pdf", b"%PDF poster")
+
+    assert main.process_directory(str(tmp_path))["processed"] == 2
+    assert main.process_directory(str(tmp_path)) == {"processed": 0, "cached": 0, "failed": 0, "unchanged": 2}
+    assert calls == ["essay.pdf", "poster.pdf"]
+
+    os.remove(essay)
+    main.process_directory(str(tmp_path))
+    assert not os.path.exists(main.get_parsed_output_path(essay))
+    assert list(manifest.load_manifest(str(tmp_path))["pdfs"]) == [os.path.join("Course1", "Assignments", "poster.pdf")]
+    assert calls == ["essay.pdf", "poster.pdf"]
+
+
+def write_parsed_syllabus(tmp_path, course, title, weight):
+    parsed = tmp_path / course / "Syllabus" / "parsed" / "syllabus_parsed.json"
+    parsed.parent.mkdir(parents=True, exist_ok=True)
+    parsed.write_text(json.dumps({
+        "assignments": [{"title": title, "due_date": "2025-02-03", "weight": weight, "difficulty": 6}],
+        "tests": [], "schedule": [],
+    }), encoding="utf-8")
+    return parsed
+
+
+def test_merge_only_rereads_changed_courses(tmp_path, capsys, monkeypatch):
+    for course in ("CourseA", "CourseB", "CourseC"):
+        write_parsed_syllabus(tmp_path, course, f"{course} essay", 10)
+    assert cli.main(["merge", str(tmp_path)]) == 0
+    matched = tmp_path / cli.MATCHED_NAME
+    first = json.loads(matched.read_text(encoding="utf-8"))
+
+    # Nothing changed: the output is not rewritten
+    capsys.readouterr()
+    assert cli.main(["merge", str(tmp_path)]) == 0
+    assert "Merged syllabus is up to date" in capsys.readouterr().out
+
+    # CourseC's file can't be read any more, so it must come from the previous output
+    opened = []
+    real_open = open
+
+    def tracking_open(path, *args, **kwargs):
+        opened.append(os.path.relpath(str(path), str(tmp_path)))
+        return real_open(path, *args, **kwargs)
+
+    write_parsed_syllabus(tmp_path, "CourseA", "CourseA essay", 20)
+    write_parsed_syllabus(tmp_path, "CourseB", "CourseB report", 15)
+    monkeypatch.setattr("builtins.open", tracking_open)
+    assert cli.main(["merge", str(tmp_path)]) == 0
+    monkeypatch.undo()
+    assert "Updated 2 changed course(s): CourseA, CourseB" in capsys.readouterr().out
+    assert not any(path.startswith("CourseC") for path in opened)
+
+    merged = json.loads(matched.read_text(encoding="utf-8"))
+    assert [(item["course"], item["title"], item["weight"]) for item in merged["assignments"]] == [
+        ("CourseA", "CourseA essay", 20), ("CourseB", "CourseB report", 15), ("CourseC", "CourseC essay", 10)]
+    assert merged["assignments"][2] == first["assignments"][2]
@@ -0,0 +1,63 @@
+import json
+import os
+from datetime import date, time
+
+from models import CourseData, as_course_data, iter_records
+
+SAMPLE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                      "data", "user_pdfs", "syllabus_matched.json")
+
+# Values the typed fields must carry through untouched even though they don't parse
+ODD = {
+    "assignments": [
+        {"due_date": "N/A", "title": "Reordered keys", "weight": 0, "difficulty": None},
+        {"title": "Loose date", "due_date": "2025-1-5", "due_time": "9:30", "course": "C", "notes": ["kept"]},
+        {"title": "ISO week date", "due_date": "2025-W03-1", "due_time": "24:00"},
+        {"title": "No fields"},
+    ],
+    "tests": [{"title": "Midterm", "date": "2025-02-30", "time": "N/A", "weight": 22.5}],
+    "schedule": [
+        {"name": "Lab", "days": ["Monday", "Funday"], "time": "13:30–15:30", "location": "N/A"},
+        {"name": "Seminar", "days": [], "time": "13:30 – 15:30"},
+        {"name": "Tutorial", "days": "Friday", "time": "TBA"},
+    ],
+    "study_blocks": [{"title": "Work on X", "date": "2025-01-10", "time": "23:00", "duration": 3,
+                      "type": "assignment", "course": "C", "pinned": True}],
+    "term_note": {"anything": [1, 2]},
+}
+
+
+def assert_round_trip(data):
+    restored = as_course_data(data).to_dict()
+    assert restored == data
+    # Same key order, so the file written back is the same text
+    assert json.dumps(restored, ensure_ascii=False) == json.dumps(data, ensure_ascii=False)
+
+
+def test_round_trip_fixture(course_data):
+    assert_round_trip(course_data)
+
+
+def test_round_trip_sample_with_study_blocks():
+    with open(SAMPLE, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    assert data["study_blocks"]
+    assert_round_trip(data)
+
+
+def test_round_trip_unparsed_values():
+    assert_round_trip(ODD)
+
+
+def test_round_trip_missing_and_non_list_sections():
+    assert_round_trip({})
+    assert_round_trip({"tests": None, "assignments": []})
+
+
+def test_values_are_parsed_once(course_data):
+    data = CourseData.from_dict(course_data)
+    assert isinstance(data.assignments[0].due_date, date)
+    assert data.schedule[0].time == (time(13, 30), time(15, 30))
+    loose = list(iter_records(ODD, "assignments"))[1]
+    assert loose.due_date == "2025-1-5" and loose.due_time == "9:30"
+    assert loose.extra == {"notes": ["kept"]}
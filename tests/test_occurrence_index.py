@@ -0,0 +1,159 @@
+import json
+from datetime import date, datetime, timedelta
+
+import pytest
+import pytz
+
+import batch_scheduler
+import block_generator
+import calendar_generator
+from conftest import WEEKDAYS
+from freebusy import FreeBusy
+from occurrence_index import OccurrenceIndex, Term, infer_term, load_term, syllabus_term
+
+DAILY_CLASS = {"name": "Daily lab", "days": WEEKDAYS, "time": "09:00–13:00", "location": "N/A", "course": "Course1"}
+
+
+def shift_date(value, days):
+    return (date.fromisoformat(value) + timedelta(days=days)).isoformat()
+
+
+# The course data moved by whole weeks, so classes still meet on the same weekdays
+def shifted(data, days):
+    for assignment in data["assignments"]:
+        assignment["due_date"] = shift_date(assignment["due_date"], days)
+    for test in data["tests"]:
+        test["date"] = shift_date(test["date"], days)
+    for term in data.get("terms", {}).values():
+        term["start"] = shift_date(term["start"], days)
+        term["end"] = shift_date(term["end"], days)
+        for exclusion in term["exclusions"]:
+            exclusion["start"] = shift_date(exclusion["start"], days)
+            exclusion["end"] = shift_date(exclusion["end"], days)
+    return data
+
+
+# Course data as parsed from syllabi that don't print their class dates
+def without_class_dates(data):
+    del data["terms"]
+    return data
+
+
+def shifted_blocks(blocks, days):
+    return [{**block, "date": shift_date(block["date"], days)} for block in blocks]
+
+
+# Blocks during the daily lab, on the days it meets
+def in_class(blocks, data):
+    term = infer_term(data)
+    return [block for block in blocks if 9 <= int(block["time"][:2]) < 13
+            and term.start <= date.fromisoformat(block["date"]) <= term.end
+            and not term.excluded(date.fromisoformat(block["date"]))]
+
+
+def test_missing_term_json_gives_no_term(tmp_path):
+    assert load_term(str(tmp_path / "syllabus_matched.json")) is None
+
+
+def test_syllabus_class_dates_come_first(course_data):
+    term = Term(date(2025, 1, 6), date(2025, 4, 4), ((date(2025, 2, 15), date(2025, 2, 23), "Reading week"),))
+    assert syllabus_term(course_data) == term
+    assert infer_term(course_data) == term
+
+
+def test_course_terms_are_merged(course_data):
+    terms = course_data["terms"]
+    terms["Course1"]["end"] = "2025-04-10"
+    terms["Course2"]["exclusions"].append({"name": "Good Friday", "start": "2025-04-18", "end": "2025-04-18"})
+    terms["Course3"] = {"start": "N/A", "end": "N/A", "exclusions": []}
+    term = syllabus_term(course_data)
+    # Only breaks both courses have stay excluded, unreadable dates are skipped
+    assert term == Term(date(2025, 1, 6), date(2025, 4, 10), ((date(2025, 2, 15), date(2025, 2, 23), "Reading week"),))
+
+
+def test_term_is_inferred_from_deadlines(course_data):
+    term = infer_term(without_class_dates(course_data))
+    # Two weeks before the first assignment (2025-01-14) to the final exam
+    assert term == Term(date(2024, 12, 31), date(2025, 4, 7))
+    assert infer_term({"assignments": [], "tests": [], "schedule": course_data["schedule"]}) is None
+
+
+@pytest.mark.parametrize("days", [245, 364])
+@pytest.mark.parametrize("strategy", ["edf", "priority", "independent"])
+@pytest.mark.parametrize("class_dates", [True, False])
+def test_classes_block_study_time_outside_2025(course_data, days, strategy, class_dates):
+    course_data["schedule"].append(DAILY_CLASS)
+    if not class_dates:
+        without_class_dates(course_data)
+    expected = block_generator.generate_time_blocks(course_data, strategy, per_hour=True)["blocks"]
+    data = shifted(course_data, days)
+
+    blocks = block_generator.generate_time_blocks(data, strategy, per_hour=True)["blocks"]
+    assert blocks and not in_class(blocks, data)
+    assert blocks == shifted_blocks(expected, days)
+    assert batch_scheduler.schedule_student(data, strategy, per_hour=True)["blocks"] == blocks
+
+
+@pytest.mark.parametrize("days", [245, 364])
+def test_reschedule_blocks_classes_outside_2025(course_data, days):
+    course_data["schedule"].append(DAILY_CLASS)
+    data = shifted(course_data, days)
+    old_blocks = block_generator.generate_time_blocks(data, per_hour=True)["blocks"]
+    edited = shifted(shifted(course_data, -days), days)
+    edited["assignments"][0]["weight"] = 40
+    digest = block_generator.schedule_digest(data)
+    blocks = block_generator.reschedule_time_blocks(digest, edited, old_blocks, per_hour=True)["blocks"]
+    assert blocks and not in_class(blocks, edited)
+
+
+@pytest.mark.parametrize("days", [245, 364])
+def test_free_busy_and_export_follow_the_course_dates(course_data, days):
+    course_data["schedule"].append(DAILY_CLASS)
+    data = shifted(course_data, days)
+    first_due = min(date.fromisoformat(a["due_date"]) for a in data["assignments"])
+
+    index = FreeBusy(data)
+    assert [kind for _, _, kind, _ in index.busy_at(datetime.combine(first_due, datetime.min.time()) + timedelta(hours=10))] == ["class"]
+
+    tz = pytz.timezone(calendar_generator.TIMEZONE)
+    lab = [spec for spec in calendar_generator.iter_event_specs(data, tz) if spec["summary"] == "Daily lab"]
+    assert len(lab) == 1
+    term = OccurrenceIndex(data).term
+    assert lab[0]["dtstart"].date() == term.start
+    assert lab[0]["rrule"]["UNTIL"].date() == term.end + timedelta(days=1)
+
+
+def test_export_without_class_dates_leaves_classes_out(course_data, capsys):
+    data = without_class_dates(course_data)
+    tz = pytz.timezone(calendar_generator.TIMEZONE)
+    specs = list(calendar_generator.iter_event_specs(data, tz))
+    # Deadlines are exported, classes aren't guessed from them
+    assert len(specs) == len(data["assignments"]) + len(data["tests"])
+    assert not any("rrule" in spec for spec in specs)
+    assert "class meetings are left out" in capsys.readouterr().out
+
+
+def test_merge_keeps_each_courses_class_dates(course_data, tmp_path):
+    import main
+
+    for course in ("Course1", "Course2"):
+        parsed = tmp_path / course / "Syllabus" / "parsed"
+        parsed.mkdir(parents=True)
+        syllabus = {key: [entry for entry in course_data[key] if entry["course"] == course]
+                    for key in ("assignments", "tests", "schedule")}
+        syllabus["term"] = course_data["terms"][course]
+        (parsed / "syllabus_parsed.json").write_text(json.dumps(syllabus), encoding="utf-8")
+    output = tmp_path / "syllabus_matched.json"
+    main.merge_json(str(tmp_path), str(output))
+    assert json.loads(output.read_text(encoding="utf-8"))["terms"] == course_data["terms"]
+
+    # Only Course2 changed, Course1 keeps its class dates from the previous output
+    changed = tmp_path / "Course2" / "Syllabus" / "parsed" / "syllabus_parsed.json"
+    syllabus = json.loads(changed.read_text(encoding="utf-8"))
+    syllabus["term"]["end"] = "2025-04-08"
+    changed.write_text(json.dumps(syllabus, indent=1), encoding="utf-8")
+    main.merge_json(str(tmp_path), str(output))
+    terms = json.loads(output.read_text(encoding="utf-8"))["terms"]
+    assert terms["Course1"] == course_data["terms"]["Course1"]
+    assert terms["Course2"]["end"] == "2025-04-08"
+    assert syllabus_term({"terms": terms}).end == date(2025, 4, 8)
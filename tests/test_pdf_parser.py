@@ -0,0 +1,30 @@
+import os
+
+import pytest
+
+pytest.importorskip("fitz")
+
+from pdf_parser import extract_pages_from_pdf, prune_pages
+from rule_based_parser import extract_class_schedule, extract_term
+
+SAMPLES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "user_pdfs")
+HEADER = "Winter 2025\nLast updated: 8 January 2025\n"
+
+
+def test_headers_and_bare_keywords_do_not_keep_a_page():
+    pages = [HEADER + "Course outline\n",
+             HEADER + "Assignments are submitted on the course site every Monday in March.\n",
+             HEADER + "Essay due February 3, 11:59 pm\n",
+             HEADER + "Grading: essay 40%, final exam 60%\n"]
+    assert prune_pages(pages) == [pages[0], pages[2], pages[3]]
+    assert prune_pages(pages, "sections")[1:] == pages[2:]
+
+
+def test_pruned_sample_syllabus_keeps_classes_and_term():
+    path = os.path.join(SAMPLES, "Course2", "Syllabus", "sample_syllabus2.pdf")
+    pages = extract_pages_from_pdf(path)
+    kept = prune_pages(pages)
+    assert len(kept) < len(pages)
+    full, pruned = "".join(pages), "".join(kept)
+    assert extract_class_schedule(pruned) == extract_class_schedule(full)
+    assert extract_term(pruned, 2025) == extract_term(full, 2025)
@@ -0,0 +1,77 @@
+import os
+
+import pytest
+
+pytest.importorskip("fitz")
+
+import main
+from rule_based_parser import extract_class_schedule, extract_schedule_rules, extract_term, score_confidence
+
+SAMPLES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "user_pdfs")
+
+READING_WEEK = [{"name": "Reading week", "start": "2025-02-15", "end": "2025-02-23"}]
+
+
+def test_term_from_a_table_read_column_by_column():
+    # How PyMuPDF reads the "Important dates" table of sample_syllabus.pdf
+    text = ("Laptop or computer\nClasses Begin\t\nReading Week\tClasses End\t\nStudy day(s)\t\nExam Period \n"
+            "January 6\t\nFebruary 15–23\tApril 4\t April 5–6\t\nApril 7–30 \n"
+            "March 31, 2025: Last day to withdraw from second-term half course without academic \npenalty \n")
+    assert extract_term(text, 2025) == {"start": "2025-01-06", "end": "2025-04-04", "exclusions": READING_WEEK}
+
+
+def test_term_skips_labels_without_dates():
+    text = "Term \nClasses Start \nReading Week \nClasses End \nExams \nWinter \nJanuary 6 \nFebruary 15 – 23 \nApril 4 \nApril 7 - 30 \n"
+    assert extract_term(text, 2025) == {"start": "2025-01-06", "end": "2025-04-04", "exclusions": READING_WEEK}
+
+
+def test_term_from_inline_dates():
+    text = "Fall 2024\nClasses start: September 4\nReading week: November 4-8\nClasses end: December 6\n"
+    assert extract_term(text, 2024) == {
+        "start": "2024-09-04", "end": "2024-12-06",
+        "exclusions": [{"name": "Reading week", "start": "2024-11-04", "end": "2024-11-08"}],
+    }
+
+
+def test_term_ignores_prose_and_schedule_rows():
+    text = ("Classes End\n" + "Late assignments lose five percent per day unless an extension is granted.\n"
+            "7\nFeb 17–23\nReading Week (starts February 15th)\nN/A\n8\nFeb 24–Mar 2\n")
+    assert extract_term(text, 2025) is None
+
+
+# (path, class times, number of assignments, number of tests)
+SAMPLE_SYLLABI = [
+    (os.path.join(SAMPLES, "Course1", "Syllabus", "sample_syllabus.pdf"), [(["Thursday"], "14:30–16:30")], 1, 5),
+    (os.path.join(SAMPLES, "Course2", "Syllabus", "sample_syllabus2.pdf"), [(["Tuesday"], "13:30–15:30")], 12, 1),
+]
+
+
+@pytest.mark.parametrize("path, classes, assignments, tests", SAMPLE_SYLLABI)
+def test_sample_syllabi(path, classes, assignments, tests):
+    data, confidence = extract_schedule_rules(path, main.read_pdf_text(path, "syllabus"))
+    assert [(entry["days"], entry["time"]) for entry in data["schedule"]] == classes
+    assert (len(data["assignments"]), len(data["tests"])) == (assignments, tests)
+    assert data["term"] == {"start": "2025-01-06", "end": "2025-04-04", "exclusions": READING_WEEK}
+    assert confidence >= main.RULES_CONFIDENCE
+    assert main.apply_rules(path, None, (data, confidence)) == (data, [])
+
+
+def test_office_hours_are_not_classes():
+    text = ("Lectures: Tuesday 1:30-3:30pm, Room 1200\n"
+            "Office hours: Wed 2:00–3:00pm\n"
+            "TA hours\nFriday 10:00-11:00am\n")
+    assert [(entry["days"], entry["time"]) for entry in extract_class_schedule(text)] == [(["Tuesday"], "13:30–15:30")]
+
+
+def test_misread_schedule_falls_back_to_the_llm():
+    items = [{"title": "Essay", "due_date": "2025-02-03", "weight": 40},
+             {"title": "Final exam", "date": "2025-04-10", "weight": 60}]
+    # A 20-minute "class" and two sessions overlapping on Monday
+    schedule = [{"name": "N/A", "days": ["Monday"], "time": "09:00–09:20", "location": "N/A"},
+                {"name": "N/A", "days": ["Monday", "Wednesday"], "time": "10:00–11:30", "location": "N/A"},
+                {"name": "N/A", "days": ["Monday"], "time": "11:00–12:00", "location": "N/A"}]
+    data = {"assignments": items[:1], "tests": items[1:], "schedule": schedule}
+    assert score_confidence(data) == 0
+    assert score_confidence(dict(data, schedule=[])) == 1.0
+    assert score_confidence(dict(data, schedule=schedule[1:2])) == 1.0
+    assert main.apply_rules("syllabus.pdf", None, (data, score_confidence(data))) == (None, None)
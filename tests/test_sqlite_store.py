@@ -0,0 +1,97 @@
+import copy
+import json
+
+import pytest
+
+import block_generator
+import cli
+import main
+from sqlite_store import STORE_NAME, CourseStore
+
+
+@pytest.fixture
+def student(tmp_path, course_data):
+    """A student directory with syllabus_matched.json moved into a store by `cli.py db`."""
+    (tmp_path / "Course1" / "Syllabus").mkdir(parents=True)
+    matched = tmp_path / cli.MATCHED_NAME
+    matched.write_text(json.dumps(course_data, indent=4, ensure_ascii=False), encoding="utf-8")
+    assert cli.main(["db", str(tmp_path)]) == 0
+    return tmp_path
+
+
+def test_json_store_json_round_trip(student, course_data):
+    matched = student / cli.MATCHED_NAME
+    matched.unlink()
+    assert cli.main(["db", str(student), "--export"]) == 0
+    assert json.loads(matched.read_text(encoding="utf-8")) == course_data
+    # Key order is kept too, so the exported file diffs cleanly against the input
+    assert list(json.loads(matched.read_text(encoding="utf-8"))) == list(course_data)
+    assert main.load_course_data(str(matched)) == course_data
+
+
+def test_update_and_delete_one_entry(student, course_data):
+    with CourseStore(str(student / STORE_NAME)) as store:
+        rows = store.items("assignments")
+        row_id, record = rows[3]
+        updated = store.update("assignments", row_id, due_date="2025-02-10", weight=15)
+        assert updated == dict(record, due_date="2025-02-10", weight=15)
+        assert store.between("assignments", "2025-02-10", "2025-02-10") == [updated]
+        store.delete("assignments", rows[0][0])
+        assert store.update("assignments", rows[0][0], weight=1) is None
+        exported = store.export_course_data()
+
+    expected = copy.deepcopy(course_data)
+    expected["assignments"][3].update(due_date="2025-02-10", weight=15)
+    del expected["assignments"][0]
+    assert exported == expected
+
+
+def test_failed_update_rolls_back(student, course_data):
+    with CourseStore(str(student / STORE_NAME)) as store:
+        row_id, _ = store.items("assignments")[0]
+        with pytest.raises(TypeError):
+            store.update("assignments", row_id, due_date=object())
+        # A course reload that fails halfway keeps the rows it had deleted
+        broken = copy.deepcopy(course_data)
+        broken["tests"][0]["weight"] = object()
+        with pytest.raises(TypeError):
+            store.replace_courses(broken, {"Course1", "Course2"}, keep={"Course1", "Course2"})
+        assert store.export_course_data() == course_data
+
+
+def test_replace_courses_only_touches_changed_courses(student, course_data):
+    edited = copy.deepcopy(course_data)
+    edited["assignments"] = [item for item in edited["assignments"] if item["course"] != "Course1"]
+    for item in edited["assignments"]:
+        item["weight"] += 1
+    with CourseStore(str(student / STORE_NAME)) as store:
+        course1 = [row for row in store.items("tests") if row[1]["course"] == "Course1"]
+        store.replace_courses(edited, {"Course2"}, keep={"Course1", "Course2"})
+        # Rows of the unchanged course keep their ids
+        assert [row for row in store.items("tests") if row[1]["course"] == "Course1"] == course1
+        exported = store.export_course_data()
+    assert [item["weight"] for item in exported["assignments"] if item["course"] == "Course2"] == \
+        [item["weight"] for item in edited["assignments"]]
+    assert [item for item in exported["assignments"] if item["course"] == "Course1"] == \
+        [item for item in course_data["assignments"] if item["course"] == "Course1"]
+
+
+def test_study_blocks_are_merged_into_the_store(student, course_data):
+    matched = student / cli.MATCHED_NAME
+    blocks_path = student / cli.BLOCKS_NAME
+    blocks = block_generator.generate_time_blocks(course_data)
+    blocks_path.write_text(json.dumps(blocks), encoding="utf-8")
+    before = matched.read_text(encoding="utf-8")
+
+    main.merge_blocks_into_course_json(str(matched), str(blocks_path))
+    # The JSON file is left alone, the store holds the blocks
+    assert matched.read_text(encoding="utf-8") == before
+    merged = main.load_course_data(str(matched))
+    assert merged == dict(course_data, study_blocks=blocks["blocks"])
+
+    # Merging again replaces the blocks instead of adding to them
+    main.merge_blocks_into_course_json(str(matched), str(blocks_path))
+    assert main.load_course_data(str(matched)) == merged
+    with CourseStore(str(student / STORE_NAME)) as store:
+        first = blocks["blocks"][0]
+        assert first in store.between("study_blocks", first["date"], first["date"], course=first["course"])